@@ -0,0 +1,123 @@
+# benchmarks/embed_compare.py
+"""
+Check a quantized/ONNX query encoder against the fp32 one it replaces.
+
+Each backend runs in its own process so RSS is measured in isolation. The
+process loads the encoder, embeds every benchmark question one at a time (the
+bot's shape), records RSS and only then opens the index to search with its
+own vectors. Reported against the fp32 "torch" reference:
+
+  cosine drift    - 1 - cos(fp32 vector, candidate vector) per question
+  recall@k        - share of the fp32 dense top-k also in the candidate's top-k
+  mmr_overlap@k   - the same for the MMR results the bot actually uses
+  latency / RSS   - per-query encode time and process RSS after encoding
+
+    python -m benchmarks.embed_compare [--backends int8 onnx] [--threads 4]
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import time
+
+import numpy as np
+
+from src import config
+
+from benchmarks.questions import BENCHMARK_QUESTIONS
+from benchmarks.stats import format_summary, summarize
+
+
+def _rss_mb() -> float:
+    import psutil
+
+    return psutil.Process().memory_info().rss / 2**20
+
+
+def _run_backend(backend: str, threads: int | None, k: int, out) -> None:
+    from src.retrieval import get_embedding_model, get_retriever
+
+    rss_start = _rss_mb()
+    t0 = time.perf_counter()
+    model = get_embedding_model(backend=backend, threads=threads)
+    load_ms = (time.perf_counter() - t0) * 1000
+
+    for question in BENCHMARK_QUESTIONS[:2]:  # warm-up, untimed
+        model.embed_query(question)
+    vectors, latencies = [], []
+    for question in BENCHMARK_QUESTIONS:
+        t0 = time.perf_counter()
+        vectors.append(model.embed_query(question))
+        latencies.append((time.perf_counter() - t0) * 1000)
+    rss_mb = _rss_mb()
+
+    retriever, _ = get_retriever(embedding_model=model)
+    store = retriever.vectorstore
+    dense, mmr = [], []
+    for vector in vectors:
+        dense.append([d.metadata["_id"] for d in store.similarity_search_by_vector(vector, k=k)])
+        mmr.append(
+            [d.metadata["_id"] for d in store.max_marginal_relevance_search_by_vector(vector, k=k)]
+        )
+
+    out.send(
+        {
+            "vectors": np.asarray(vectors, dtype=np.float32),
+            "latency_ms": latencies,
+            "load_ms": load_ms,
+            "rss_mb": rss_mb,
+            "model_rss_mb": rss_mb - rss_start,
+            "dense": dense,
+            "mmr": mmr,
+        }
+    )
+
+
+def run_backend(backend: str, threads: int | None, k: int) -> dict:
+    ctx = mp.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_run_backend, args=(backend, threads, k, child))
+    proc.start()
+    result = parent.recv()
+    proc.join()
+    return result
+
+
+def _overlap(ref: list, got: list) -> float:
+    return len(set(ref) & set(got)) / max(1, len(ref))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--backends", nargs="+", default=["int8", "onnx"])
+    parser.add_argument("--threads", type=int, default=config.EMBEDDING_THREADS)
+    parser.add_argument("-k", type=int, default=config.RETRIEVAL_MMR_K)
+    args = parser.parse_args()
+
+    results = {"torch": run_backend("torch", args.threads, args.k)}
+    for backend in args.backends:
+        results[backend] = run_backend(backend, args.threads, args.k)
+
+    ref = results["torch"]
+    print(f"\n=== QUERY ENCODER COMPARISON ({config.EMBEDDING_MODEL_NAME}, threads={args.threads}) ===")
+    for backend, res in results.items():
+        print(f"\n[{backend}] load_ms={res['load_ms']:.0f} rss_mb={res['rss_mb']:.0f} "
+              f"model_rss_mb={res['model_rss_mb']:.0f}")
+        print(format_summary("latency_ms", summarize(res["latency_ms"])))
+        if backend == "torch":
+            continue
+        cos = np.sum(ref["vectors"] * res["vectors"], axis=1)
+        drift = 1.0 - cos
+        recall = [_overlap(r, g) for r, g in zip(ref["dense"], res["dense"])]
+        mmr = [_overlap(r, g) for r, g in zip(ref["mmr"], res["mmr"])]
+        print(f"cosine_drift_mean: {drift.mean():.6f}  max: {drift.max():.6f}")
+        print(f"recall@{args.k}_mean: {np.mean(recall):.3f}  min: {np.min(recall):.3f}")
+        print(f"mmr_overlap@{args.k}_mean: {np.mean(mmr):.3f}  min: {np.min(mmr):.3f}")
+        speedup = np.median(ref["latency_ms"]) / np.median(res["latency_ms"])
+        print(f"p50_speedup_vs_fp32: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
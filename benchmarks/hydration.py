@@ -0,0 +1,67 @@
+# benchmarks/hydration.py
+"""
+Measure payload hydration strategies for the first retrieval stage.
+
+  legacy  - MMR search, then enrich_with_payload (second Qdrant round trip)
+  store   - MMR search, then PayloadStore.hydrate (in-memory ID lookup)
+  inline  - MMR search that returns payloads inline (no second call)
+
+All three get the same query embedding, so the differences are search +
+hydration only.
+
+    python -m benchmarks.hydration
+"""
+from __future__ import annotations
+
+import time
+from statistics import mean, median
+
+from src import config
+from src.retrieval import (
+    enrich_with_payload,
+    get_embedding_model,
+    get_payload_store,
+    get_qdrant_client,
+    get_vector_store,
+)
+
+from benchmarks.questions import BENCHMARK_QUESTIONS
+
+
+def main() -> None:
+    client = get_qdrant_client()
+    embedder = get_embedding_model()
+    plain = get_vector_store(client=client, embedding_model=embedder)
+    inline = get_vector_store(client=client, embedding_model=embedder, inline_payload=True)
+
+    t0 = time.perf_counter()
+    store = get_payload_store(client=client)
+    print(f"payload store: {len(store)} chunks loaded in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    k = config.RETRIEVAL_MMR_K
+    paths = {
+        "legacy": lambda e: enrich_with_payload(
+            client, plain.max_marginal_relevance_search_by_vector(e, k=k)
+        ),
+        "store": lambda e: store.hydrate(plain.max_marginal_relevance_search_by_vector(e, k=k)),
+        "inline": lambda e: inline.max_marginal_relevance_search_by_vector(e, k=k),
+    }
+    timings = {name: [] for name in paths}
+
+    for question in BENCHMARK_QUESTIONS:
+        embedding = embedder.embed_query(question)
+        for name, run in paths.items():
+            run(embedding)  # warm
+            t0 = time.perf_counter()
+            docs = run(embedding)
+            timings[name].append((time.perf_counter() - t0) * 1000)
+            assert all("title" in d.metadata for d in docs), name
+
+    print("\n=== SEARCH + HYDRATION ===")
+    print("questions:", len(BENCHMARK_QUESTIONS))
+    for name, values in timings.items():
+        print(f"{name}_ms: mean={mean(values):.2f} p50={median(values):.2f}")
+
+
+if __name__ == "__main__":
+    main()
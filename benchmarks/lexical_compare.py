@@ -0,0 +1,78 @@
+# benchmarks/lexical_compare.py
+"""
+First-stage retrieval per RETRIEVAL_MODE, against pure dense MMR.
+
+Each mode runs `generate._search` the way the pipeline does, query
+embedding included (that is the cost the lexical path avoids), over the
+natural-language benchmark questions and a set of bare keyword queries.
+Reported per mode and question set:
+
+  latency         - embed + search (+ BM25 + fusion) per question
+  recall@k        - share of the dense MMR candidates also returned
+  lexical_only    - share of questions that skipped the embedding
+
+    python -m src.export_bm25        # once, to build the index
+    python -m benchmarks.lexical_compare [--modes hybrid auto lexical]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from src import config
+from src import generate as g
+
+from benchmarks.questions import BENCHMARK_QUESTIONS, KEYWORD_QUESTIONS
+from benchmarks.stats import format_summary, summarize
+
+QUESTION_SETS = {"questions": BENCHMARK_QUESTIONS, "keywords": KEYWORD_QUESTIONS}
+
+
+def run_mode(mode: str, questions: list) -> dict:
+    config.RETRIEVAL_MODE = mode
+    g.pipeline.__dict__.pop("lexical", None)  # reopen for the new mode
+    g.pipeline.lexical
+    g._search(questions[0])  # warm-up, untimed
+
+    ids, latency, lexical = [], [], 0
+    for question in questions:
+        lexical += g.lexical_only(question)
+        t0 = time.perf_counter()
+        hits = g._search(question)
+        latency.append((time.perf_counter() - t0) * 1000)
+        ids.append([d.metadata.get("_id") for d, _ in hits])
+    return {"ids": ids, "latency_ms": latency, "lexical_only": lexical / len(questions)}
+
+
+def _recall(ref: list, got: list) -> float:
+    return len(set(ref) & set(got)) / max(1, len(ref))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--modes", nargs="+", default=["hybrid", "auto", "lexical"])
+    args = parser.parse_args()
+
+    g.pipeline._retrieval  # load the retriever + embedding model before timing anything
+    k = config.RETRIEVAL_MMR_K
+    for name, questions in QUESTION_SETS.items():
+        ref = run_mode("dense", questions)
+        print(f"\n=== {name.upper()} ({len(questions)}), first stage vs dense MMR, k={k} ===")
+        print("\n[dense]")
+        print(format_summary("latency_ms", summarize(ref["latency_ms"])))
+        for mode in args.modes:
+            res = run_mode(mode, questions)
+            recall = [_recall(r, got) for r, got in zip(ref["ids"], res["ids"])]
+            speedup = np.median(ref["latency_ms"]) / np.median(res["latency_ms"])
+            print(f"\n[{mode}] lexical_only={res['lexical_only']:.2f}")
+            print(format_summary("latency_ms", summarize(res["latency_ms"])))
+            print(f"recall@{k}_mean: {np.mean(recall):.3f}  min: {np.min(recall):.3f}")
+            print(f"p50_speedup_vs_dense: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# benchmarks/mmap_parity.py
+"""
+Compare the mmap/NumPy MMR retriever against the LangChain Qdrant path.
+
+Both searches get the same query embedding, so the numbers isolate vector
+search + MMR. Parity is reported as exact order match and set overlap of the
+RETRIEVAL_MMR_K point IDs.
+
+    python -m src.export_mmap          # once, to build the index
+    python -m benchmarks.mmap_parity
+"""
+from __future__ import annotations
+
+import time
+from statistics import mean, median
+
+from src import config
+from src.retrieval import (
+    MmapIndex,
+    MmapVectorStore,
+    get_embedding_model,
+    get_qdrant_client,
+    get_vector_store,
+)
+
+from benchmarks.questions import BENCHMARK_QUESTIONS
+
+
+def timed_ids(store, embedding, runs: int = 5):
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        docs = store.max_marginal_relevance_search_by_vector(embedding, k=config.RETRIEVAL_MMR_K)
+        times.append((time.perf_counter() - t0) * 1000)
+    return [d.metadata["_id"] for d in docs], median(times)
+
+
+def main() -> None:
+    embedder = get_embedding_model()
+    qdrant_store = get_vector_store(client=get_qdrant_client(), embedding_model=embedder)
+    mmap_store = MmapVectorStore(MmapIndex(config.MMAP_INDEX_PATH), embedder)
+    print(f"mmap index: {config.MMAP_INDEX_PATH} ({mmap_store.index.meta})")
+
+    qdrant_ms, mmap_ms, exact, overlap = [], [], [], []
+    for question in BENCHMARK_QUESTIONS:
+        embedding = embedder.embed_query(question)
+        ref, q_ms = timed_ids(qdrant_store, embedding)
+        got, m_ms = timed_ids(mmap_store, embedding)
+        qdrant_ms.append(q_ms)
+        mmap_ms.append(m_ms)
+        exact.append(float(ref == got))
+        overlap.append(len(set(ref) & set(got)) / max(1, len(ref)))
+
+    print("\n=== MMAP vs QDRANT (search + MMR) ===")
+    print("questions:", len(BENCHMARK_QUESTIONS))
+    print(f"qdrant_ms: mean={mean(qdrant_ms):.2f} p50={median(qdrant_ms):.2f}")
+    print(f"mmap_ms:   mean={mean(mmap_ms):.2f} p50={median(mmap_ms):.2f}")
+    print(f"exact_order_match_rate: {mean(exact):.3f}")
+    print(f"id_overlap_mean: {mean(overlap):.3f}")
+
+
+if __name__ == "__main__":
+    main()
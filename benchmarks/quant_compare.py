@@ -0,0 +1,129 @@
+# benchmarks/quant_compare.py
+"""
+Compare quantized first-pass search over the mmap index with the exact scan.
+
+The benchmark questions are embedded once; then each mode ("none" = float
+scan, "int8", "binary") runs in its own process so RSS is measured in
+isolation. Reported per mode:
+
+  first_pass_mb   - bytes scanned per query (float vectors or codes)
+  rss_mb          - process RSS after all queries (mapped pages included)
+  latency         - top-k search and MMR search per query
+  recall@k        - share of the exact top-k also returned by the mode
+  mmr_overlap@k   - the same for the MMR results the bot actually uses
+
+    python -m benchmarks.quant_compare [--modes int8 binary] [--oversampling 2 4 8]
+
+Build the codes first: python -m src.export_mmap --no-export --quantize int8 binary
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import time
+
+import numpy as np
+
+from src import config
+
+from benchmarks.questions import BENCHMARK_QUESTIONS
+from benchmarks.stats import format_summary, summarize
+
+
+def _rss_mb() -> float:
+    import psutil
+
+    return psutil.Process().memory_info().rss / 2**20
+
+
+def _run_mode(mode: str, oversampling: float, vectors: np.ndarray, k: int, out) -> None:
+    from src.retrieval import MmapIndex, MmapVectorStore
+
+    index = MmapIndex(
+        config.MMAP_INDEX_PATH,
+        quantization=None if mode == "none" else mode,
+        oversampling=oversampling,
+    )
+    store = MmapVectorStore(index, embedding=None)
+    first_pass_mb = (index.vectors.nbytes if index.codes is None else index.codes.nbytes) / 2**20
+
+    for vector in vectors[:2]:  # warm-up (page in the scanned file), untimed
+        store.similarity_search_with_score_by_vector(vector, k=k)
+    dense, mmr, dense_ms, mmr_ms = [], [], [], []
+    for vector in vectors:
+        t0 = time.perf_counter()
+        hits = store.similarity_search_with_score_by_vector(vector, k=k)
+        dense_ms.append((time.perf_counter() - t0) * 1000)
+        t0 = time.perf_counter()
+        picks = store.max_marginal_relevance_search_by_vector(vector, k=k)
+        mmr_ms.append((time.perf_counter() - t0) * 1000)
+        dense.append([d.metadata["_id"] for d, _ in hits])
+        mmr.append([d.metadata["_id"] for d in picks])
+
+    out.send(
+        {
+            "first_pass_mb": first_pass_mb,
+            "rss_mb": _rss_mb(),
+            "dense_ms": dense_ms,
+            "mmr_ms": mmr_ms,
+            "dense": dense,
+            "mmr": mmr,
+        }
+    )
+
+
+def run_mode(mode: str, oversampling: float, vectors: np.ndarray, k: int) -> dict:
+    ctx = mp.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_run_mode, args=(mode, oversampling, vectors, k, child))
+    proc.start()
+    result = parent.recv()
+    proc.join()
+    return result
+
+
+def _overlap(ref: list, got: list) -> float:
+    return len(set(ref) & set(got)) / max(1, len(ref))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--modes", nargs="+", default=["int8", "binary"])
+    parser.add_argument(
+        "--oversampling", type=float, nargs="+", default=[config.MMAP_QUANT_OVERSAMPLING]
+    )
+    parser.add_argument("-k", type=int, default=config.RETRIEVAL_MMR_K)
+    args = parser.parse_args()
+
+    from src.retrieval import get_embedding_model
+
+    model = get_embedding_model()
+    vectors = np.asarray([model.embed_query(q) for q in BENCHMARK_QUESTIONS], dtype=np.float32)
+    del model
+
+    ref = run_mode("none", 1.0, vectors, args.k)
+    results = {("none", 1.0): ref}
+    for mode in args.modes:
+        for oversampling in args.oversampling:
+            results[(mode, oversampling)] = run_mode(mode, oversampling, vectors, args.k)
+
+    print(f"\n=== QUANTIZED SEARCH vs EXACT ({len(vectors)} questions, k={args.k}) ===")
+    for (mode, oversampling), res in results.items():
+        label = mode if mode == "none" else f"{mode} x{oversampling:g}"
+        print(f"\n[{label}] first_pass_mb={res['first_pass_mb']:.1f} rss_mb={res['rss_mb']:.0f}")
+        print(format_summary("topk_ms", summarize(res["dense_ms"])))
+        print(format_summary("mmr_ms", summarize(res["mmr_ms"])))
+        if mode == "none":
+            continue
+        recall = [_overlap(r, g) for r, g in zip(ref["dense"], res["dense"])]
+        mmr = [_overlap(r, g) for r, g in zip(ref["mmr"], res["mmr"])]
+        print(f"recall@{args.k}_mean: {np.mean(recall):.3f}  min: {np.min(recall):.3f}")
+        print(f"mmr_overlap@{args.k}_mean: {np.mean(mmr):.3f}  min: {np.min(mmr):.3f}")
+        speedup = np.median(ref["mmr_ms"]) / np.median(res["mmr_ms"])
+        print(f"p50_mmr_speedup_vs_exact: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
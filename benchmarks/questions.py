@@ -0,0 +1,73 @@
+# benchmarks/questions.py
+"""Shared question set for the latency and quality benchmarks."""
+
+BENCHMARK_QUESTIONS = [
+    "Why do some authors call data feminism a form of justice work?",
+    "How does data feminism redefine what counts as evidence?",
+    "What role does intersectionality play in data science critiques?",
+    "How do feminist scholars argue that power shows up in datasets?",
+    "What is the relationship between care ethics and algorithm design?",
+    "Why do feminist theorists emphasize context in data interpretation?",
+    "How do feminist principles apply to machine learning workflows?",
+    "What does design justice mean for AI systems?",
+    "How can feminist thinking reduce model bias?",
+    "Why is abstraction sometimes harmful according to data feminism?",
+    "How does data feminism critique the idea of objectivity?",
+    "What does standpoint theory contribute to algorithmic audits?",
+    "How can we apply intersectional thinking to model evaluation?",
+    "Why do feminist frameworks prioritize lived experience in analysis?",
+    "How can care ethics improve responsible AI practices?",
+    "What injustices arise when datasets erase marginalized groups?",
+    "How does data feminism connect personal experience and computation?",
+    "What does feminist epistemology say about who gets to produce knowledge?",
+    "How can feminist critiques help redesign data collection practices?",
+    "Why is transparency central to feminist approaches to AI?",
+    "How does data feminism encourage rethinking default classifications?",
+    "Why does data feminism critique scale as a value?",
+    "How do feminist thinkers approach uncertainty in models?",
+    "What strategies exist for resisting bias in algorithmic systems?",
+    "How can feminist methods transform RAG pipelines ethically?",
+    "Why do some feminist scholars reject 'neutral' model outputs?",
+    "How is emotional labor relevant to data science teams?",
+    "What does relationality mean in feminist data theory?",
+    "How does data feminism intersect with abolitionist ethics?",
+    "What feminist critiques exist of predictive policing algorithms?",
+    "How can feminist theory illuminate hidden assumptions in NLP datasets?",
+    "How do feminist thinkers critique quantification culture?",
+    "What does 'data is never raw' mean in feminist STS?",
+    "How does data feminism rethink what counts as 'the user'?",
+    "Why do feminist scholars analyze absence as well as presence in datasets?",
+    "How can design justice principles be applied to vector search systems?",
+    "What does situated knowledge imply for model fine-tuning decisions?",
+    "How does intersectionality apply to embedding bias?",
+    "What feminist insights apply to explainability in AI?",
+    "How can feminist critique help evaluate retrieval quality?",
+    "How do feminist scholars argue against one-size-fits-all models?",
+    "What does data feminism argue about power and default settings?",
+    "How can feminist principles inform dataset documentation?",
+    "Why do feminist thinkers analyze infrastructure in AI systems?",
+    "How does data feminism challenge optimization-centric thinking?",
+    "What are feminist critiques of benchmark-driven research cultures?",
+    "How can feminist ethics guide the design of evaluation metrics?",
+    "Why does data feminism argue for expanded notions of expertise?",
+    "How can feminist theory inform responsible model deployment?",
+]
+
+# Bare names and terms, the kind of query RETRIEVAL_MODE = "auto" answers lexically.
+KEYWORD_QUESTIONS = [
+    "simone de beauvoir",
+    "bell hooks",
+    "intersectionality",
+    "the second sex",
+    "data feminism",
+    "standpoint theory",
+    "patriarchy",
+    "care ethics",
+    "design justice",
+    "kimberlé crenshaw",
+    "audre lorde",
+    "situated knowledges",
+    "emotional labor",
+    "donna haraway",
+    "judith butler",
+]
@@ -0,0 +1,77 @@
+# benchmarks/rerank_compare.py
+"""
+Compare the local cross-encoder reranker against the Cohere API.
+
+For every benchmark question the same MMR candidates are reranked by both
+backends; we report per-call latency and how well the local top-k agrees
+with Cohere's (set overlap and top-1 match).
+
+    python -m benchmarks.rerank_compare [--execution torch|int8|onnx]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from statistics import mean
+
+from src import config
+from src.rerank import CohereReranker, CrossEncoderReranker
+from src.retrieval import enrich_with_payload, get_retriever
+
+from benchmarks.questions import BENCHMARK_QUESTIONS
+from benchmarks.stats import format_summary, summarize
+
+
+def timed_rerank(reranker, question: str, texts: list[str], top_n: int):
+    t0 = time.perf_counter()
+    results = reranker.rerank(question, texts, top_n=top_n)
+    return [r.index for r in results], (time.perf_counter() - t0) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--execution", default=config.CROSS_ENCODER_EXECUTION)
+    parser.add_argument("--top-n", type=int, default=config.RERANK_FINAL_K)
+    args = parser.parse_args()
+
+    retriever, client = get_retriever()
+    cohere_rr = CohereReranker()
+    local_rr = CrossEncoderReranker(execution=args.execution)
+    print(f"Cohere: {config.COHERE_RERANK_MODEL}")
+    print(f"Local:  {config.CROSS_ENCODER_MODEL_NAME} ({args.execution})")
+
+    # Warm both paths (model load / TLS handshake) outside the timed loop.
+    warm_docs = enrich_with_payload(
+        client, retriever.get_relevant_documents(BENCHMARK_QUESTIONS[0])
+    )
+    warm_texts = [d.page_content for d in warm_docs]
+    cohere_rr.rerank(BENCHMARK_QUESTIONS[0], warm_texts, top_n=args.top_n)
+    local_rr.rerank(BENCHMARK_QUESTIONS[0], warm_texts, top_n=args.top_n)
+
+    cohere_ms, local_ms, overlaps, top1 = [], [], [], []
+    for question in BENCHMARK_QUESTIONS:
+        docs = enrich_with_payload(client, retriever.get_relevant_documents(question))
+        texts = [d.page_content for d in docs]
+
+        ref, c_ms = timed_rerank(cohere_rr, question, texts, args.top_n)
+        got, l_ms = timed_rerank(local_rr, question, texts, args.top_n)
+
+        cohere_ms.append(c_ms)
+        local_ms.append(l_ms)
+        overlaps.append(len(set(ref) & set(got)) / max(1, len(ref)))
+        top1.append(float(bool(ref) and bool(got) and ref[0] == got[0]))
+        print(
+            f"{question[:60]!r:64} cohere={c_ms:7.1f}ms local={l_ms:7.1f}ms "
+            f"overlap@{args.top_n}={overlaps[-1]:.2f}"
+        )
+
+    print("\n=== RERANK COMPARISON ===")
+    print("questions:", len(BENCHMARK_QUESTIONS))
+    for name, values in (("cohere_ms", cohere_ms), ("local_ms", local_ms)):
+        print(format_summary(name, summarize(values)))
+    print(f"top{args.top_n}_agreement_mean: {mean(overlaps):.3f}")
+    print(f"top1_match_rate: {mean(top1):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# benchmarks/rerank_policy.py
+"""
+Evaluate the adaptive rerank policy against always reranking.
+
+For every benchmark question the same MMR candidates (with dense scores) go
+through both paths: a full rerank of all candidates (the reference) and the
+adaptive plan (skip / rerank the tail / full). Reports how often each branch
+fires, the rerank latency saved and how well the adaptive top-k agrees with
+the reference (set overlap and top-1 match), overall and per branch.
+
+    python -m benchmarks.rerank_policy [--offline] [--min-top-score 0.8 ...]
+
+Threshold flags override the RERANK_* settings in config.py for this run,
+so a sweep doesn't need code edits.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from collections import defaultdict
+from statistics import mean
+
+from src import config
+
+from benchmarks.questions import BENCHMARK_QUESTIONS
+from benchmarks.stats import format_summary, summarize
+
+THRESHOLDS = {
+    "min_top_score": "RERANK_SKIP_MIN_TOP_SCORE",
+    "min_margin": "RERANK_SKIP_MIN_MARGIN",
+    "min_source_share": "RERANK_SKIP_MIN_SOURCE_SHARE",
+    "head_min_gap": "RERANK_HEAD_MIN_GAP",
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--offline", action="store_true", help="use the fake reranker")
+    for flag, name in THRESHOLDS.items():
+        parser.add_argument(f"--{flag.replace('_', '-')}", type=float, default=getattr(config, name))
+    parser.add_argument("--tail-candidates", type=int, default=config.RERANK_TAIL_CANDIDATES)
+    args = parser.parse_args()
+
+    if args.offline:
+        config.RERANKER_BACKEND = "fake"
+    for flag, name in THRESHOLDS.items():
+        setattr(config, name, getattr(args, flag))
+    config.RERANK_TAIL_CANDIDATES = args.tail_candidates
+
+    from src import generate
+    from src.rerank import plan_rerank
+
+    pipeline = generate.pipeline
+    reranker = pipeline.reranker
+    k = config.RERANK_FINAL_K
+
+    # Warm the reranker (model load / TLS handshake) outside the timed loop.
+    warm = generate._hydrate([d for d, _ in generate._search(BENCHMARK_QUESTIONS[0])])
+    reranker.rerank(BENCHMARK_QUESTIONS[0], [d.page_content for d in warm], top_n=k)
+
+    full_ms, adaptive_ms, saved_ms = [], [], []
+    overlap, top1 = [], []
+    by_branch: dict = defaultdict(lambda: {"n": 0, "overlap": [], "saved_ms": []})
+
+    for question in BENCHMARK_QUESTIONS:
+        candidates = generate._search(question)
+        docs = generate._hydrate([d for d, _ in candidates])
+        texts = [d.page_content for d in docs]
+
+        t0 = time.perf_counter()
+        ref = [r.index for r in reranker.rerank(question, texts, top_n=k)]
+        f_ms = (time.perf_counter() - t0) * 1000
+
+        plan = plan_rerank(
+            [score for _, score in candidates], [d.metadata.get("title", "") for d in docs], k
+        )
+        t0 = time.perf_counter()
+        results = []
+        if plan.tail:
+            results = reranker.rerank(question, [texts[i] for i in plan.tail], top_n=plan.top_n)
+        a_ms = (time.perf_counter() - t0) * 1000
+        got = plan.head + [plan.tail[r.index] for r in results]
+
+        full_ms.append(f_ms)
+        adaptive_ms.append(a_ms)
+        saved_ms.append(f_ms - a_ms)
+        overlap.append(len(set(ref) & set(got)) / max(1, len(ref)))
+        top1.append(float(bool(ref) and bool(got) and ref[0] == got[0]))
+        stats = by_branch[plan.branch]
+        stats["n"] += 1
+        stats["overlap"].append(overlap[-1])
+        stats["saved_ms"].append(f_ms - a_ms)
+        print(
+            f"{question[:60]!r:64} {plan.branch:5} head={len(plan.head)} "
+            f"tail={len(plan.tail):2} saved={f_ms - a_ms:7.1f}ms overlap@{k}={overlap[-1]:.2f}"
+        )
+
+    n = len(BENCHMARK_QUESTIONS)
+    print("\n=== ADAPTIVE RERANK vs ALWAYS-RERANK ===")
+    print("thresholds:", {name: getattr(config, name) for name in THRESHOLDS.values()})
+    print(format_summary("full_rerank_ms", summarize(full_ms)))
+    print(format_summary("adaptive_rerank_ms", summarize(adaptive_ms)))
+    print(f"mean_saved_ms: {mean(saved_ms):.1f}")
+    print(f"top{k}_agreement_mean: {mean(overlap):.3f}")
+    print(f"top1_match_rate: {mean(top1):.3f}")
+    for branch in ("skip", "tail", "full"):
+        stats = by_branch.get(branch)
+        if not stats:
+            print(f"{branch}: 0/{n}")
+            continue
+        print(
+            f"{branch}: {stats['n']}/{n} ({stats['n'] / n:.0%}) "
+            f"agreement={mean(stats['overlap']):.3f} saved_ms={mean(stats['saved_ms']):.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# benchmarks/startup.py
+"""
+Measure startup costs separately from steady-state query latency.
+
+Reports:
+  import_ms       - `import src.generate` (should do no model/client work)
+  warmup_ms       - RAGPipeline.warmup(), broken down per step
+  first_query_ms  - first real question after startup
+  warm_query_ms   - a second, different question
+
+    python -m benchmarks.startup [--no-warmup]
+
+With --no-warmup the first query absorbs all cold costs, which is what the
+bot's first user would see without a warm-up phase.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from benchmarks.questions import BENCHMARK_QUESTIONS
+
+
+def _ms(t0: float) -> float:
+    return (time.perf_counter() - t0) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--no-warmup", action="store_true")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    from src import generate
+    import_ms = _ms(t0)
+
+    warmup = {}
+    if not args.no_warmup:
+        warmup = generate.pipeline.warmup()
+
+    # Bypass the semantic cache so both queries run the full graph.
+    t0 = time.perf_counter()
+    generate.pipeline.graph.invoke({"question": BENCHMARK_QUESTIONS[0]})
+    first_query_ms = _ms(t0)
+
+    t0 = time.perf_counter()
+    generate.pipeline.graph.invoke({"question": BENCHMARK_QUESTIONS[1]})
+    warm_query_ms = _ms(t0)
+
+    print("=== STARTUP PROFILE ===")
+    print(f"import_ms: {import_ms:.2f}")
+    for k, v in warmup.items():
+        print(f"warmup.{k}: {v:.2f}")
+    print(f"cold_start_ms: {import_ms + warmup.get('total_ms', 0.0):.2f}")
+    print(f"first_query_ms: {first_query_ms:.2f}")
+    print(f"warm_query_ms: {warm_query_ms:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# benchmarks/stats.py
+"""Percentile summaries shared by the benchmark scripts."""
+from __future__ import annotations
+
+from statistics import mean
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Linear-interpolated percentile, q in [0, 1]."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    pos = q * (len(ordered) - 1)
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def summarize(values: list[float]) -> dict:
+    """mean / p50 / p90 / p99 / min / max / n for a list of timings."""
+    if not values:
+        return {"n": 0}
+    return {
+        "n": len(values),
+        "mean": mean(values),
+        "p50": percentile(values, 0.50),
+        "p90": percentile(values, 0.90),
+        "p99": percentile(values, 0.99),
+        "min": min(values),
+        "max": max(values),
+    }
+
+
+def format_summary(name: str, summary: dict) -> str:
+    if not summary.get("n"):
+        return f"{name}: (no samples)"
+    return (
+        f"{name}: mean={summary['mean']:.1f} p50={summary['p50']:.1f} "
+        f"p90={summary['p90']:.1f} p99={summary['p99']:.1f} (n={summary['n']})"
+    )
@@ -0,0 +1,249 @@
+# benchmarks/suite.py
+"""
+RAG benchmark suite: per-substage latency percentiles, a concurrent load
+generator, JSON results and a regression check against a saved baseline.
+
+    # per-stage profile over the benchmark questions, fully offline
+    python -m benchmarks.suite --offline --runs 3 --out results.json
+
+    # add a load test: 200 requests at 4 QPS, at most 8 in flight
+    python -m benchmarks.suite --load-requests 200 --qps 4 --concurrency 8
+
+    # fail (exit 1) if any stage's p50/p90/p99 regressed >10% vs a baseline
+    python -m benchmarks.suite --offline --baseline baseline.json
+
+Stages: embed, search, hydrate, rerank, prompt, ttft, generate (time from
+first token to last) and total. --offline swaps in the deterministic fake
+LLM and reranker from src/fakes.py, so only the local index and embedding
+model are needed. The semantic cache is bypassed throughout.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+from src import config
+
+from benchmarks.questions import BENCHMARK_QUESTIONS
+from benchmarks.stats import format_summary, summarize
+
+STAGES = ("embed", "search", "hydrate", "rerank", "prompt", "ttft", "generate", "total")
+
+
+def profile_question(question: str) -> dict:
+    """Run one question stage by stage; returns ms per stage."""
+    from src import generate
+
+    pipeline = generate.pipeline
+    timings: dict = {}
+    t_start = t0 = time.perf_counter()
+
+    def lap(name: str) -> None:
+        nonlocal t0
+        now = time.perf_counter()
+        timings[name] = (now - t0) * 1000
+        t0 = now
+
+    embedding = pipeline.embedder.embed_query(question)
+    lap("embed")
+
+    retriever = pipeline.retriever
+    docs = retriever.vectorstore.max_marginal_relevance_search_by_vector(
+        embedding, **retriever.search_kwargs
+    )
+    lap("search")
+
+    docs = generate._hydrate(docs)
+    lap("hydrate")
+
+    results = pipeline.reranker.rerank(
+        question, [d.page_content for d in docs], top_n=config.RERANK_FINAL_K
+    )
+    context = [docs[r.index] for r in results]
+    lap("rerank")
+
+    message = generate._build_message({"question": question, "context": context})
+    lap("prompt")
+
+    ttft = None
+    for chunk in pipeline.llm.stream(message):  # bypasses the dispatcher: one request at a time
+        if ttft is None and chunk.content:
+            lap("ttft")
+            ttft = True
+    if ttft is None:
+        lap("ttft")
+    lap("generate")
+
+    timings["total"] = (time.perf_counter() - t_start) * 1000
+    return timings
+
+
+def run_profile(questions: list[str], runs: int, warmup: int) -> dict:
+    for question in questions[:warmup]:
+        profile_question(question)
+
+    samples = {stage: [] for stage in STAGES}
+    for _ in range(runs):
+        for question in questions:
+            for stage, ms in profile_question(question).items():
+                samples[stage].append(ms)
+    return {stage: summarize(values) for stage, values in samples.items()}
+
+
+async def run_load(
+    questions: list[str], requests: int, concurrency: int, qps: float | None
+) -> dict:
+    """
+    Fire `requests` questions through graph.ainvoke. With `qps` set the
+    arrivals are open-loop at that rate (latency includes queueing behind
+    `concurrency`); otherwise `concurrency` workers run closed-loop.
+    """
+    from src import generate
+
+    graph = generate.pipeline.graph
+    slots = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def one(question: str) -> None:
+        nonlocal errors
+        arrived = time.perf_counter()
+        async with slots:
+            # Open loop: latency counts from arrival, so queueing is included. Closed
+            # loop: every task is created up front, so the clock starts once a slot
+            # picks the question up.
+            t0 = arrived if qps else time.perf_counter()
+            try:
+                await graph.ainvoke({"question": question})
+            except Exception:
+                errors += 1
+                return
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    tasks = []
+    for i in range(requests):
+        tasks.append(asyncio.create_task(one(questions[i % len(questions)])))
+        if qps:
+            await asyncio.sleep(1 / qps)
+    await asyncio.gather(*tasks)
+    wall_s = time.perf_counter() - t0
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "concurrency": concurrency,
+        "target_qps": qps,
+        "wall_s": wall_s,
+        "throughput_rps": len(latencies) / wall_s if wall_s else 0.0,
+        "latency_ms": summarize(latencies),
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list[str]:
+    """Stage percentiles that got slower than baseline by more than `tolerance`."""
+    regressions = []
+    sections = [("stages", current.get("stages", {}), baseline.get("stages", {}))]
+    if "load" in current and "load" in baseline:
+        sections.append(
+            ("load", {"latency": current["load"]["latency_ms"]},
+             {"latency": baseline["load"]["latency_ms"]})
+        )
+    for section, cur, base in sections:
+        for stage, base_summary in base.items():
+            cur_summary = cur.get(stage, {})
+            for p in ("p50", "p90", "p99"):
+                if p not in base_summary or p not in cur_summary:
+                    continue
+                b, c = base_summary[p], cur_summary[p]
+                if c > b * (1 + tolerance) and c - b > min_delta_ms:
+                    regressions.append(
+                        f"{section}.{stage}.{p}: {b:.1f} -> {c:.1f} ms (+{(c / b - 1) * 100:.0f}%)"
+                    )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--offline", action="store_true", help="use fake LLM + reranker")
+    parser.add_argument("--runs", type=int, default=1, help="passes over the question set")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed warm-up questions")
+    parser.add_argument("--questions", type=int, default=len(BENCHMARK_QUESTIONS))
+    parser.add_argument("--load-requests", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--qps", type=float, default=None)
+    parser.add_argument("--out", help="write JSON results here")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--min-delta-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    if args.offline:
+        config.LLM_BACKEND = "fake"
+        config.RERANKER_BACKEND = "fake"
+
+    from src import generate
+
+    questions = BENCHMARK_QUESTIONS[: args.questions]
+    warmup = generate.pipeline.warmup()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "llm_backend": config.LLM_BACKEND,
+            "llm_model": config.OLLAMA_MODEL_NAME,
+            "reranker_backend": config.RERANKER_BACKEND,
+            "retriever_backend": config.RETRIEVER_BACKEND,
+            "embedding_model": config.EMBEDDING_MODEL_NAME,
+            "mmr_k": config.RETRIEVAL_MMR_K,
+            "rerank_k": config.RERANK_FINAL_K,
+            "questions": len(questions),
+            "runs": args.runs,
+        },
+        "warmup_ms": warmup,
+        "stages": run_profile(questions, args.runs, args.warmup),
+    }
+    print("\n=== STAGE LATENCY (ms) ===")
+    for stage in STAGES:
+        print(format_summary(stage, results["stages"][stage]))
+
+    if args.load_requests:
+        results["load"] = asyncio.run(
+            run_load(questions, args.load_requests, args.concurrency, args.qps)
+        )
+        load = results["load"]
+        print("\n=== LOAD ===")
+        print(
+            f"requests={load['requests']} errors={load['errors']} "
+            f"concurrency={load['concurrency']} target_qps={load['target_qps']} "
+            f"throughput_rps={load['throughput_rps']:.2f}"
+        )
+        print(format_summary("latency", load["latency_ms"]))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nwrote {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        print("\n=== REGRESSION CHECK ===")
+        if regressions:
+            for line in regressions:
+                print("REGRESSION", line)
+            sys.exit(1)
+        print(f"ok: no percentile slower than baseline by >{args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
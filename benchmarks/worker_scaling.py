@@ -0,0 +1,101 @@
+# benchmarks/worker_scaling.py
+"""
+Throughput of the RAG worker pool as the number of worker processes grows.
+
+For each pool size a fresh `WorkerPool` is started (model load + warm-up,
+not timed), then `--requests` questions are fired closed-loop with
+`--concurrency` in flight, the way the Discord front end submits them.
+Reports throughput, latency percentiles and how evenly least-loaded
+dispatch spread the work.
+
+    python -m benchmarks.worker_scaling --offline --workers 1 2 4 --requests 200
+
+Needs the exported mmap index (RETRIEVER_BACKEND = "mmap" is forced here:
+local Qdrant can't be opened by more than one process). --offline uses the
+fake LLM and reranker, so the numbers show the pipeline's own scaling; with
+a real backend throughput levels off at its capacity (LLM_MAX_IN_FLIGHT per
+worker). The semantic cache is off and every question is made unique so
+neither it nor single-flight hides any work.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from src import config
+from src.workers import WorkerPool
+
+from benchmarks.questions import BENCHMARK_QUESTIONS
+from benchmarks.stats import format_summary, summarize
+
+
+async def run_pool(workers: int, requests: int, concurrency: int, overrides: dict) -> dict:
+    pool = WorkerPool(workers, overrides=overrides)
+    t0 = time.perf_counter()
+    await pool.start()
+    start_s = time.perf_counter() - t0
+
+    slots = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        question = f"{BENCHMARK_QUESTIONS[i % len(BENCHMARK_QUESTIONS)]} [{i}]"
+        async with slots:
+            t0 = time.perf_counter()
+            try:
+                await pool.aanswer(question)
+            except Exception:
+                errors += 1
+                return
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall_s = time.perf_counter() - t0
+    stats = pool.stats()
+    await pool.stop()
+    return {
+        "workers": workers,
+        "start_s": start_s,
+        "wall_s": wall_s,
+        "errors": errors,
+        "throughput_rps": len(latencies) / wall_s if wall_s else 0.0,
+        "latency_ms": summarize(latencies),
+        "completed_per_worker": [w["completed"] for w in stats],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--offline", action="store_true", help="use fake LLM + reranker")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    overrides = {"RETRIEVER_BACKEND": "mmap", "SEMANTIC_CACHE_ENABLED": False}
+    if args.offline:
+        overrides.update(LLM_BACKEND="fake", RERANKER_BACKEND="fake")
+
+    results = [
+        asyncio.run(run_pool(n, args.requests, args.concurrency, overrides)) for n in args.workers
+    ]
+
+    print(f"\n=== WORKER SCALING (requests={args.requests}, concurrency={args.concurrency}) ===")
+    base = results[0]["throughput_rps"] or 1.0
+    for res in results:
+        print(
+            f"\n[{res['workers']} workers] start_s={res['start_s']:.1f} errors={res['errors']} "
+            f"throughput_rps={res['throughput_rps']:.2f} ({res['throughput_rps'] / base:.2f}x) "
+            f"per_worker={res['completed_per_worker']}"
+        )
+        print(format_summary("latency_ms", res["latency_ms"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+# src/feminism_rag/batch.py
+"""
+Answer a JSONL file of questions with the stages overlapped, for throughput.
+
+    python -m src.batch questions.jsonl answers.jsonl [--offline] [--limit N]
+
+Input lines are `{"id": ..., "question": ...}` (`id` defaults to the line
+number; other fields are copied to the output). Each question flows through
+
+    embed (batches of BATCH_EMBED_SIZE, one forward pass)
+      -> search + hydrate (back to back on one thread)
+      -> rerank (groups of BATCH_RERANK_GROUP in one grouped call)
+      -> generate (BATCH_GENERATE_CONCURRENCY in flight)
+      -> write
+
+with bounded queues in between, so every stage works on different questions
+at the same time. Each item has one deadline (BATCH_ITEM_TIMEOUT_S) from
+the moment it is read, checked by every stage. Each answer is appended to the output as soon as it is
+done, with its chunk IDs, scores and per-stage timings. Re-running with the
+same output file skips questions already answered (failed ones are retried),
+so an interrupted run resumes where it stopped. The semantic cache is not
+used.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from statistics import median
+from typing import Any, List as TypingList
+
+from . import config
+from . import deadline as dl
+from .deadline import Deadline
+
+logger = logging.getLogger(__name__)
+
+_DONE = None  # end-of-stream marker passed down the queues
+
+
+@dataclass(eq=False)
+class BatchItem:
+    id: Any
+    question: str
+    extra: dict
+    started: float = 0.0
+    deadline: Deadline | None = None  # whole-item budget, set when the item is read
+    timings: dict = field(default_factory=dict)
+    embedding: TypingList[float] | None = None
+    candidates: list = field(default_factory=list)
+    docs: list = field(default_factory=list)
+    plan: Any = None
+    context: list = field(default_factory=list)
+    scores: TypingList[float] = field(default_factory=list)
+    degradations: TypingList[str] = field(default_factory=list)
+    answer: str = ""
+    prompt_tokens_saved: int = 0
+    error: str | None = None
+
+    def record(self) -> dict:
+        out = {**self.extra, "id": self.id, "question": self.question}
+        if self.error is not None:
+            return {**out, "error": self.error, "timings_ms": self.timings}
+        return {
+            **out,
+            "answer": self.answer,
+            "doc_ids": [d.metadata.get("_id") for d in self.context],
+            "scores": self.scores,
+            "degradations": self.degradations,
+            "prompt_tokens_saved": self.prompt_tokens_saved,
+            "timings_ms": self.timings,
+        }
+
+
+def answered_ids(path: Path) -> set:
+    """IDs already answered in `path`; a torn last line (killed mid-write) is cut off."""
+    if not path.exists():
+        return set()
+    done = set()
+    with open(path, "rb+") as f:
+        good_end = 0
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            good_end += len(line)
+            if "error" not in record:
+                done.add(record["id"])
+        f.truncate(good_end)
+    return done
+
+
+def read_questions(path: Path, skip: set, limit: int | None = None):
+    """Yield BatchItems from a JSONL file, leaving out IDs in `skip`."""
+    n = 0
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            raw = json.loads(line)
+            item_id = raw.pop("id", lineno)
+            question = raw.pop("question")
+            if item_id in skip:
+                continue
+            if limit is not None and n >= limit:
+                return
+            n += 1
+            yield BatchItem(item_id, question, raw)
+
+
+class BatchRunner:
+    """The stage pipeline for one run; `run` returns summary counters."""
+
+    def __init__(
+        self,
+        embed_batch: int = config.BATCH_EMBED_SIZE,
+        rerank_group: int = config.BATCH_RERANK_GROUP,
+        generate_concurrency: int = config.BATCH_GENERATE_CONCURRENCY,
+        queue_size: int = config.BATCH_QUEUE_SIZE,
+    ):
+        from . import generate
+
+        self.g = generate
+        self.pipeline = generate.pipeline
+        self.embed_batch = embed_batch
+        self.rerank_group = rerank_group
+        self.generate_concurrency = generate_concurrency
+        self.queue_size = queue_size
+        # One thread each, so embedding and search overlap instead of queueing together.
+        self._embed_pool = ThreadPoolExecutor(1, thread_name_prefix="batch-embed")
+        self._search_pool = ThreadPoolExecutor(1, thread_name_prefix="batch-search")
+        self.done = 0
+        self.failed = 0
+        self.stage_ms: dict = {}
+
+    # ---- stages ----
+    async def _take(self, queue: asyncio.Queue, n: int) -> TypingList[BatchItem] | None:
+        """Up to `n` items: waits for the first, then takes what is already queued."""
+        first = await queue.get()
+        if first is _DONE:
+            return None
+        items = [first]
+        while len(items) < n:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if item is _DONE:
+                queue.put_nowait(_DONE)  # leave it for the next take
+                break
+            items.append(item)
+        return items
+
+    @staticmethod
+    def _live(item: BatchItem, stage: str) -> bool:
+        """Whether `item` should go through `stage`; fails it once its deadline has passed."""
+        if item.error is None and item.deadline.remaining() <= 0:
+            item.error = f"{stage}: item deadline of {config.BATCH_ITEM_TIMEOUT_S:g}s exceeded"
+        return item.error is None
+
+    def _lap(self, item: BatchItem, stage: str, ms: float) -> None:
+        item.timings[stage] = round(ms, 1)
+        self.stage_ms.setdefault(stage, []).append(ms)
+
+    async def _read(self, items, out: asyncio.Queue) -> None:
+        for item in items:
+            item.started = time.perf_counter()
+            item.deadline = Deadline(config.BATCH_ITEM_TIMEOUT_S, budgets={})
+            await out.put(item)
+        await out.put(_DONE)
+
+    async def _embed(self, inp: asyncio.Queue, out: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        embedder = self.pipeline.embedder
+        while (items := await self._take(inp, self.embed_batch)) is not None:
+            live = [i for i in items if self._live(i, "embed")]
+            if live:
+                t0 = time.perf_counter()
+                try:
+                    vectors = await asyncio.wait_for(
+                        loop.run_in_executor(
+                            self._embed_pool, embedder.embed_documents, [i.question for i in live]
+                        ),
+                        timeout=max(i.deadline.remaining() for i in live),
+                    )
+                except Exception as e:
+                    vectors = [None] * len(live)
+                    for item in live:
+                        item.error = f"embed: {type(e).__name__}: {e}"
+                ms = (time.perf_counter() - t0) * 1000
+                for item, vector in zip(live, vectors):
+                    item.embedding = vector
+                    self._lap(item, "embed", ms)
+            for item in items:
+                await out.put(item)
+        await out.put(_DONE)
+
+    def _search_one(self, item: BatchItem) -> None:
+        item.candidates = self.g._search(item.question, item.embedding)
+        item.docs, item.plan = self.g._plan_rerank(item.candidates)
+
+    async def _search(self, inp: asyncio.Queue, out: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while (item := await inp.get()) is not _DONE:
+            if self._live(item, "search"):
+                t0 = time.perf_counter()
+                try:
+                    await asyncio.wait_for(
+                        loop.run_in_executor(self._search_pool, self._search_one, item),
+                        timeout=item.deadline.remaining(),
+                    )
+                except Exception as e:
+                    item.error = f"search: {type(e).__name__}: {e}"
+                self._lap(item, "search", (time.perf_counter() - t0) * 1000)
+            await out.put(item)
+        await out.put(_DONE)
+
+    async def _rerank(self, inp: asyncio.Queue, out: asyncio.Queue) -> None:
+        reranker = self.pipeline.reranker
+        while (items := await self._take(inp, self.rerank_group)) is not None:
+            todo = [i for i in items if self._live(i, "rerank") and i.plan.tail]
+            t0 = time.perf_counter()
+            fallback = dl.RERANK_ERROR
+            try:
+                results = []
+                if todo:
+                    results = await asyncio.wait_for(
+                        reranker.arerank_many(
+                            [
+                                (i.question, [i.docs[j].page_content for j in i.plan.tail], i.plan.top_n)
+                                for i in todo
+                            ]
+                        ),
+                        timeout=max(i.deadline.remaining() for i in todo),
+                    )
+            except (TimeoutError, asyncio.TimeoutError):
+                logger.warning("grouped rerank hit the item deadline, dense order used")
+                results, fallback = [None] * len(todo), dl.RERANK_TIMEOUT
+            except Exception as e:
+                logger.warning("grouped rerank failed, dense order used: %s", e)
+                results = [None] * len(todo)
+            ms = (time.perf_counter() - t0) * 1000
+            reranked = {id(i): r for i, r in zip(todo, results)}
+            for item in items:
+                if item.error is None:
+                    dense = [score for _, score in item.candidates]
+                    grouped = id(item) in reranked
+                    ranked = reranked.get(id(item), [])
+                    if ranked is None:
+                        ranked = self.g._dense_fallback(item.plan, dense)
+                        item.degradations.append(fallback)
+                    item.context, item.scores = self.g._apply_plan(item.docs, dense, item.plan, ranked)
+                    item.docs = item.candidates = []  # done with them; keep the queues light
+                    self._lap(item, "rerank", ms if grouped else 0.0)
+                await out.put(item)
+        await out.put(_DONE)
+
+    async def _generate(self, inp: asyncio.Queue, out: asyncio.Queue) -> None:
+        async def worker() -> None:
+            while (item := await inp.get()) is not _DONE:
+                if self._live(item, "generate"):
+                    t0 = time.perf_counter()
+                    state = {
+                        "question": item.question,
+                        "context": item.context,
+                        "deadline": item.deadline,
+                    }
+                    try:
+                        result = await self.g.agenerate(state)
+                        item.answer = result["answer"]
+                        item.degradations += result.get("degradations", [])
+                        item.prompt_tokens_saved = result.get("prompt_tokens_saved", 0)
+                    except Exception as e:
+                        item.error = f"generate: {type(e).__name__}: {e}"
+                    self._lap(item, "generate", (time.perf_counter() - t0) * 1000)
+                await out.put(item)
+            inp.put_nowait(_DONE)  # let the sibling workers see it too
+
+        await asyncio.gather(*(worker() for _ in range(self.generate_concurrency)))
+        await out.put(_DONE)
+
+    async def _write(self, inp: asyncio.Queue, path: Path, t_start: float) -> None:
+        with open(path, "a", encoding="utf-8") as f:
+            while (item := await inp.get()) is not _DONE:
+                item.timings["total"] = round((time.perf_counter() - item.started) * 1000, 1)
+                f.write(json.dumps(item.record(), ensure_ascii=False) + "\n")
+                f.flush()
+                if item.error is None:
+                    self.done += 1
+                else:
+                    self.failed += 1
+                    logger.warning("item %s failed: %s", item.id, item.error)
+                n = self.done + self.failed
+                if n % 25 == 0:
+                    elapsed = time.perf_counter() - t_start
+                    logger.info("%d answered, %.0f questions/hour", n, self.done / elapsed * 3600)
+
+    # ---- driver ----
+    async def run(self, items, out_path: Path) -> dict:
+        t_start = time.perf_counter()
+        queues = [asyncio.Queue(self.queue_size) for _ in range(5)]
+        await asyncio.gather(
+            self._read(items, queues[0]),
+            self._embed(queues[0], queues[1]),
+            self._search(queues[1], queues[2]),
+            self._rerank(queues[2], queues[3]),
+            self._generate(queues[3], queues[4]),
+            self._write(queues[4], out_path, t_start),
+        )
+        wall_s = time.perf_counter() - t_start
+        return {
+            "answered": self.done,
+            "failed": self.failed,
+            "wall_s": round(wall_s, 1),
+            "questions_per_hour": round(self.done / wall_s * 3600, 1) if wall_s else 0.0,
+            "median_stage_ms": {k: round(median(v), 1) for k, v in self.stage_ms.items()},
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("questions", type=Path, help="input JSONL")
+    parser.add_argument("answers", type=Path, help="output JSONL (appended to; resumes)")
+    parser.add_argument("--offline", action="store_true", help="use the fake LLM and reranker")
+    parser.add_argument("--limit", type=int, default=None, help="answer at most N new questions")
+    parser.add_argument("--embed-batch", type=int, default=config.BATCH_EMBED_SIZE)
+    parser.add_argument("--rerank-group", type=int, default=config.BATCH_RERANK_GROUP)
+    parser.add_argument(
+        "--generate-concurrency", type=int, default=config.BATCH_GENERATE_CONCURRENCY
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    if args.offline:
+        config.LLM_BACKEND = "fake"
+        config.RERANKER_BACKEND = "fake"
+    # Enough generation slots for the requested parallelism.
+    config.LLM_MAX_IN_FLIGHT = max(config.LLM_MAX_IN_FLIGHT, args.generate_concurrency)
+
+    skip = answered_ids(args.answers)
+    if skip:
+        print(f"resuming: {len(skip)} questions already answered in {args.answers}")
+    runner = BatchRunner(args.embed_batch, args.rerank_group, args.generate_concurrency)
+    summary = asyncio.run(
+        runner.run(read_questions(args.questions, skip, args.limit), args.answers)
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -21,9 +21,11 @@ load_dotenv(PROJECT_ROOT / ".env")
 # EXTERNAL CREDENTIALS + INFRA (must come from environment)
 # ============================================================
 
-# Cohere (used for reranking retrieved docs)
+# Cohere (used for reranking retrieved docs when RERANKER_BACKEND == "cohere")
 COHERE_API_KEY: str | None = os.getenv("COHERE_API_KEY")
 COHERE_RERANK_MODEL: str = os.getenv("COHERE_RERANK_MODEL", "rerank-english-v3.0")
+# Cohere-compatible rerank endpoint (e.g. `python -m src.fakes` for offline tests); None = Cohere's API
+COHERE_BASE_URL: str | None = os.getenv("COHERE_BASE_URL")
 
 # Discord bot token (for running the bot)
 DISCORD_BOT_TOKEN: str | None = os.getenv("DISCORD_BOT_TOKEN")
@@ -32,6 +34,11 @@ DISCORD_BOT_TOKEN: str | None = os.getenv("DISCORD_BOT_TOKEN")
 OLLAMA_MODEL_NAME: str = os.getenv("OLLAMA_MODEL_NAME", "hf.co/Qwen/Qwen2.5-3B-Instruct-GGUF:Q4_0")#"qwen2.5:7b-instruct")
 OLLAMA_BASE_URL: str = os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434")
 
+# OpenAI-compatible generation server (vLLM, llama.cpp server) for LLM_BACKEND = "openai"
+OPENAI_COMPAT_BASE_URL: str = os.getenv("OPENAI_COMPAT_BASE_URL", "http://127.0.0.1:8000/v1")
+OPENAI_COMPAT_MODEL: str = os.getenv("OPENAI_COMPAT_MODEL", "Qwen/Qwen2.5-3B-Instruct")
+OPENAI_COMPAT_API_KEY: str | None = os.getenv("OPENAI_COMPAT_API_KEY")
+
 # Qdrant vector DB (location + collection name for your experiment-9 index)
 QDRANT_PATH: str = os.getenv("QDRANT_PATH", str(PROJECT_ROOT / "qdrant_index"))
 QDRANT_COLLECTION: str = os.getenv(
@@ -42,6 +49,22 @@ QDRANT_COLLECTION: str = os.getenv(
 
 HF_CACHE: str | None = os.getenv("HF_CACHE")
 
+# Exported memory-mapped copy of the collection (see src/export_mmap.py)
+MMAP_INDEX_PATH: str = os.getenv("MMAP_INDEX_PATH") or str(PROJECT_ROOT / "mmap_index")
+
+# BM25 inverted index over the collection's chunk texts (see src/export_bm25.py)
+BM25_INDEX_PATH: str = os.getenv("BM25_INDEX_PATH") or str(PROJECT_ROOT / "bm25_index")
+
+# Where the semantic answer cache is persisted between bot restarts
+SEMANTIC_CACHE_PATH: str = os.getenv("SEMANTIC_CACHE_PATH") or str(
+    PROJECT_ROOT / "cache" / "semantic_cache.npz"
+)
+
+# Where answers' 🔍 context (question, answer, chunk IDs, scores) is kept, by Discord message ID
+CONTEXT_STORE_PATH: str = os.getenv("CONTEXT_STORE_PATH") or str(
+    PROJECT_ROOT / "cache" / "contexts.sqlite3"
+)
+
 
 
 # ============================================================
@@ -52,10 +75,164 @@ HF_CACHE: str | None = os.getenv("HF_CACHE")
 EMBEDDING_MODEL_NAME: str = "BAAI/bge-large-en-v1.5"
 QDRANT_VECTOR_NAME: str | None = "fast-bge-large-en-v1.5"
 
+# Generation backend — "ollama", "openai" (OpenAI-compatible server: vLLM, llama.cpp)
+# or "fake" (offline stand-in, see src/fakes.py)
+LLM_BACKEND: str = "ollama"
+LLM_MAX_IN_FLIGHT: int = 4          # concurrent generation requests sent to the backend
+LLM_HTTP_KEEPALIVE_S: float = 60.0  # idle keep-alive for pooled connections ("openai")
+LLM_HTTP_TIMEOUT_S: float = 120.0
+
 # Local LLM hyperparameters — deliberate design choices
 OLLAMA_TEMPERATURE: float = 0.2
 OLLAMA_NUM_CTX: int = 8192
 
+# Keep the model resident: every request asks Ollama to hold it for OLLAMA_KEEP_ALIVE, and
+# during OLLAMA_ACTIVE_HOURS (local [start, end) hours; None = always) a heartbeat re-arms it
+OLLAMA_KEEP_ALIVE: str = "30m"
+OLLAMA_HEARTBEAT_ENABLED: bool = True
+OLLAMA_HEARTBEAT_INTERVAL_S: float = 240.0
+OLLAMA_ACTIVE_HOURS: tuple[int, int] | None = (8, 24)
+OLLAMA_COLD_LOAD_WARN_MS: float = 500.0  # log a warning when a request paid a model load
+
+# Prompt context packing — overlapping/adjacent chunks are merged, then packed in rerank
+# order up to the token budget (default: OLLAMA_NUM_CTX minus the answer reserve and the
+# rest of the prompt), counted with the generation model's tokenizer
+CONTEXT_PACKING_ENABLED: bool = True
+LLM_TOKENIZER_NAME: str | None = "Qwen/Qwen2.5-3B-Instruct"  # HF tokenizer matching OLLAMA_MODEL_NAME
+CONTEXT_ANSWER_RESERVE_TOKENS: int = 1024
+CONTEXT_TOKEN_BUDGET: int | None = None  # fixed override
+CONTEXT_MIN_TEXT_OVERLAP: int = 32       # chars; text-overlap merge when payloads lack start_index
+CONTEXT_MIN_PASSAGE_TOKENS: int = 64     # don't truncate a passage below this
+
 # Retrieval parameters — these should be reviewable in PRs
 RETRIEVAL_MMR_K: int = 15
 RERANK_FINAL_K: int = 5
+
+# Vector search backend — "qdrant" (LangChain wrapper over local-mode Qdrant) or
+# "mmap" (NumPy top-N + MMR over the exported memory-mapped index)
+RETRIEVER_BACKEND: str = "qdrant"
+MMAP_INDEX_DTYPE: str = "float32"  # "float16" halves the file; scores are computed in float32
+MMAP_FETCH_K: int = 20             # MMR candidate pool, same as LangChain's default
+MMAP_MMR_LAMBDA: float = 0.5
+# Quantized first pass — None scans the float vectors; "int8" (4x smaller) or "binary"
+# (32x smaller, Hamming distance) scans codes built by `python -m src.export_mmap --quantize`,
+# then rescores the best fetch_k * oversampling rows with the float vectors
+MMAP_QUANTIZATION: str | None = None
+MMAP_QUANT_OVERSAMPLING: float = 4.0
+MMAP_QUANT_INT8_QUANTILE: float = 0.999  # |value| quantile mapped to ±127; larger values clip
+
+# Lexical retrieval — "dense" (vector MMR only), "hybrid" (dense MMR and BM25 fused by
+# reciprocal rank), "auto" (hybrid, but keyword-only questions such as "bell hooks" skip the
+# query embedding and the semantic cache and go BM25-only) or "lexical" (BM25 only).
+# Non-dense modes need `python -m src.export_bm25`; their candidates are always fully
+# reranked, since the adaptive rerank thresholds are calibrated on cosine scores
+RETRIEVAL_MODE: str = "dense"
+BM25_K1: float = 1.2
+BM25_B: float = 0.75
+BM25_FETCH_K: int = 20   # lexical candidates fed into the fusion
+RRF_K: int = 60          # rank damping constant of reciprocal rank fusion
+LEXICAL_MAX_TERMS: int = 3  # longest query (in words) that can take the lexical-only path
+
+# Payload hydration — True: all chunk payloads held in memory, hits hydrated by ID lookup;
+# False: the vector search returns payloads inline (no separate retrieve call either way)
+PAYLOAD_STORE_ENABLED: bool = True
+
+# Reranking backend — "cohere" (hosted API), "cross-encoder" (local CPU model, no network)
+# or "fake" (offline stand-in, see src/fakes.py)
+RERANKER_BACKEND: str = "cohere"
+CROSS_ENCODER_MODEL_NAME: str = "BAAI/bge-reranker-base"
+CROSS_ENCODER_EXECUTION: str = "torch"      # "torch" | "int8" (dynamic quantization) | "onnx"
+CROSS_ENCODER_ONNX_FILE: str | None = None  # e.g. "onnx/model_qint8_avx512_vnni.onnx" for the onnx runtime
+CROSS_ENCODER_BATCH_SIZE: int = 16          # RETRIEVAL_MMR_K candidates fit in one forward pass
+CROSS_ENCODER_MAX_LENGTH: int = 512
+
+# Adaptive reranking — skip the rerank call, or rerank only the ambiguous tail, when the
+# dense (cosine) scores are confident. Off until tuned with benchmarks/rerank_policy.py
+RERANK_ADAPTIVE_ENABLED: bool = False
+RERANK_SKIP_MIN_TOP_SCORE: float = 0.80    # best candidate at least this similar
+RERANK_SKIP_MIN_MARGIN: float = 0.05       # k-th vs (k+1)-th score gap needed to skip
+RERANK_SKIP_MIN_SOURCE_SHARE: float = 0.8  # share of the top k from one book needed to skip
+RERANK_HEAD_MIN_GAP: float = 0.03          # score gap that makes the candidates above it "confident"
+RERANK_TAIL_CANDIDATES: int = 8            # candidates reranked after a confident head
+
+# Latency budgets — a request that runs out of time degrades (dense order instead of the
+# reranker's, a truncated or "still thinking" answer) instead of hanging; see src/deadline.py
+REQUEST_DEADLINE_S: float = 60.0
+STAGE_BUDGETS_S: dict = {"retrieve": 5.0, "rerank": 3.0, "generate": 45.0}
+COHERE_TIMEOUT_S: float = 10.0  # per HTTP call; the rerank budget usually cuts in first
+
+# Hedged rerank calls — when the first call is slower than the recent p95, fire a second
+# identical call and take whichever answers first
+RERANK_HEDGE_ENABLED: bool = True
+RERANK_HEDGE_PERCENTILE: float = 0.95
+RERANK_HEDGE_WINDOW: int = 200           # recent call latencies the percentile is taken over
+RERANK_HEDGE_MIN_SAMPLES: int = 20       # below this, hedge after the default delay
+RERANK_HEDGE_DEFAULT_DELAY_S: float = 1.0
+RERANK_HEDGE_MIN_DELAY_S: float = 0.2    # never hedge sooner, even when calls are fast
+RERANK_HEDGE_POOL_SIZE: int = 16         # threads for sync attempts; abandoned ones hold a thread until they finish
+
+# Async serving — bounds on concurrent work inside the bot process
+MAX_CONCURRENT_QUESTIONS: int = 4    # questions allowed through the RAG graph at once
+RETRIEVAL_EXECUTOR_WORKERS: int = 8  # threads for embedding + Qdrant search (mostly waiting on the embed batcher)
+
+# Worker processes — 0 runs the pipeline inside the bot process; N > 0 makes the bot a thin
+# Discord front end that dispatches questions to N spawned workers (see src/workers.py), each
+# loading the models once. MAX_CONCURRENT_QUESTIONS and LLM_MAX_IN_FLIGHT then apply per
+# worker. More than one worker needs RETRIEVER_BACKEND = "mmap" (local Qdrant is single-process)
+RAG_WORKERS: int = 0
+RAG_WORKER_START_TIMEOUT_S: float = 300.0   # model load + warm-up, all workers in parallel
+RAG_WORKER_HEALTH_INTERVAL_S: float = 5.0   # ping period
+RAG_WORKER_HEALTH_TIMEOUT_S: float = 15.0   # no pong for this long: stop dispatching to it
+
+# Query encoder runtime — "torch" (fp32), "int8" (dynamic quantization) or "onnx"
+# (onnxruntime); same weights, so vectors stay compatible with the fp32-built index
+EMBEDDING_BACKEND: str = "torch"
+EMBEDDING_ONNX_FILE: str | None = None  # e.g. "onnx/model_qint8_avx512_vnni.onnx"; None = exported fp32 model.onnx
+EMBEDDING_THREADS: int | None = None    # intra-op threads for the encoder; None = runtime default
+
+# Query embedding micro-batching — concurrent questions share one bge forward pass
+EMBED_MAX_BATCH_SIZE: int = 8   # also the sentence-transformers encode batch size
+EMBED_MAX_WAIT_MS: float = 5.0  # how long the first query in a batch waits for company
+
+# Single-flight — concurrent identical questions (and identical candidate sets at rerank)
+# share one in-flight execution instead of each running the pipeline
+SINGLE_FLIGHT_ENABLED: bool = True
+
+# Metrics — Prometheus text endpoint started with the bot (src/metrics.py)
+METRICS_ENABLED: bool = True
+METRICS_HOST: str = "127.0.0.1"
+METRICS_PORT: int = 9464
+
+# Semantic answer cache — near-duplicate questions reuse a prior answer
+SEMANTIC_CACHE_ENABLED: bool = True
+SEMANTIC_CACHE_THRESHOLD: float = 0.95      # cosine similarity of normalized bge query vectors
+SEMANTIC_CACHE_MAX_ENTRIES: int = 2048      # memory cap: ~8 MB of 1024-d float32 vectors
+SEMANTIC_CACHE_TTL_S: float = 7 * 24 * 3600
+SEMANTIC_CACHE_SAVE_DELAY_S: float = 5.0     # stores within this window share one disk write
+
+# 🔍 context history — SQLite rows of chunk IDs (a few hundred bytes each), text rehydrated on click
+CONTEXT_STORE_LRU_SIZE: int = 512            # most recent entries also held in memory
+CONTEXT_STORE_RETENTION_S: float = 60 * 24 * 3600
+
+# Discord streaming — answers are edited into place as tokens arrive
+DISCORD_STREAMING: bool = True
+DISCORD_STREAM_EDIT_INTERVAL_S: float = 1.0  # at most one message edit per interval (rate limits)
+
+# Ingestion (src/ingest.py) — chunking must match the collection name (…_1024_128_…)
+INGEST_CHUNK_SIZE: int = 1024
+INGEST_CHUNK_OVERLAP: int = 128
+INGEST_BATCH_SIZE: int = 128                         # chunks per embed call and per Qdrant upsert
+INGEST_WORKERS: int = max(1, (os.cpu_count() or 2) // 4)  # embedding processes (each loads bge-large)
+
+# Batch answering (src/batch.py) — JSONL in, JSONL out, stages overlapped for throughput
+BATCH_EMBED_SIZE: int = 32              # questions per embedding forward pass
+BATCH_RERANK_GROUP: int = 8             # questions per grouped rerank call
+BATCH_GENERATE_CONCURRENCY: int = LLM_MAX_IN_FLIGHT  # generations kept in flight
+BATCH_QUEUE_SIZE: int = 64              # items buffered between stages (backpressure)
+BATCH_ITEM_TIMEOUT_S: float = 600.0     # whole-item deadline; no per-stage caps in batch mode
+
+# Offline fakes (src/fakes.py) — simulated latencies for benchmarks without Ollama/Cohere
+FAKE_LLM_TTFT_MS: float = 150.0
+FAKE_LLM_MS_PER_TOKEN: float = 20.0
+FAKE_LLM_MAX_TOKENS: int = 120
+FAKE_RERANK_MS: float = 120.0
@@ -0,0 +1,292 @@
+# src/feminism_rag/context_pack.py
+"""
+Token-budgeted context assembly.
+
+Reranked chunks often come from the same stretch of a book, and neighbouring
+chunks share INGEST_CHUNK_OVERLAP characters of text. Before prompting we
+merge chunks that overlap or are adjacent in their source (by payload
+position when available, otherwise by matching text), then pack the merged
+passages in rerank order until the token budget is spent.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List as TypingList
+
+from langchain_core.documents import Document
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+PASSAGE_SEPARATOR = "\n\n"
+
+
+# ---- Token counting ----
+class TokenCounter:
+    """
+    Counts tokens with the generation model's tokenizer (HF `tokenizers`).
+
+    If the tokenizer cannot be loaded (no network, no cache) it falls back to
+    a ~4 characters/token estimate and says so once in the log.
+    """
+
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, tokenizer_name: str | None = config.LLM_TOKENIZER_NAME):
+        self.tokenizer = None
+        if tokenizer_name:
+            try:
+                from tokenizers import Tokenizer
+
+                self.tokenizer = Tokenizer.from_pretrained(tokenizer_name)
+            except Exception as e:
+                logger.warning(
+                    "tokenizer %s unavailable (%s); estimating %d chars/token",
+                    tokenizer_name, e, self.CHARS_PER_TOKEN,
+                )
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.tokenizer is None:
+            return -(-len(text) // self.CHARS_PER_TOKEN)
+        return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """The longest prefix of `text` that fits in `max_tokens`."""
+        if max_tokens <= 0:
+            return ""
+        if self.tokenizer is None:
+            return text[: max_tokens * self.CHARS_PER_TOKEN]
+        encoding = self.tokenizer.encode(text, add_special_tokens=False)
+        if len(encoding.ids) <= max_tokens:
+            return text
+        return text[: encoding.offsets[max_tokens - 1][1]]
+
+
+_counter_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _token_counter() -> TokenCounter:
+    return TokenCounter()
+
+
+def get_token_counter() -> TokenCounter:
+    with _counter_lock:
+        return _token_counter()
+
+
+def context_token_budget(fixed_tokens: int = 0) -> int:
+    """
+    Tokens available for context: CONTEXT_TOKEN_BUDGET if set, otherwise
+    OLLAMA_NUM_CTX minus the answer reserve and the rest of the prompt
+    (`fixed_tokens`: template + question).
+    """
+    if config.CONTEXT_TOKEN_BUDGET is not None:
+        return config.CONTEXT_TOKEN_BUDGET
+    return max(0, config.OLLAMA_NUM_CTX - config.CONTEXT_ANSWER_RESERVE_TOKENS - fixed_tokens)
+
+
+# ---- Merging ----
+@dataclass
+class Passage:
+    """A run of one or more merged chunks from the same source."""
+
+    text: str
+    source: str
+    rank: int                 # best rerank position among its chunks
+    start: int | None = None  # character span in the source, when known
+    end: int | None = None
+    first_chunk: int | None = None
+    last_chunk: int | None = None
+    chunks: int = 1
+
+
+def _source_key(doc: Document) -> str:
+    meta = doc.metadata
+    return str(meta.get("source") or meta.get("title") or "")
+
+
+def _int_or_none(value) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _text_overlap(left: str, right: str, min_overlap: int) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right`."""
+    limit = min(len(left), len(right))
+    if limit < min_overlap:
+        return 0
+    # The splitter's overlap is at most INGEST_CHUNK_OVERLAP (plus a word),
+    # so only the tail of `left` needs searching.
+    window = left[-min(limit, 2 * config.INGEST_CHUNK_OVERLAP + min_overlap):]
+    probe = right[:min_overlap]
+    pos = window.find(probe)
+    while pos != -1:
+        if right.startswith(window[pos:]):
+            return len(window) - pos
+        pos = window.find(probe, pos + 1)
+    return 0
+
+
+def _try_merge(a: Passage, b: Passage) -> Passage | None:
+    """Merge `b` into `a` if they overlap or touch in the source; `a` comes first."""
+    if a.source != b.source:
+        return None
+
+    if a.start is not None and b.start is not None:
+        if b.start < a.start:
+            a, b = b, a
+        if b.start > a.end:
+            return None
+        if b.end <= a.end:  # b is contained in a
+            text = a.text
+        else:
+            text = a.text + b.text[a.end - b.start:]
+        end = max(a.end, b.end)
+    elif a.first_chunk is not None and b.first_chunk is not None:
+        if b.first_chunk < a.first_chunk:
+            a, b = b, a
+        if b.first_chunk != a.last_chunk + 1:
+            return None
+        overlap = _text_overlap(a.text, b.text, config.CONTEXT_MIN_TEXT_OVERLAP)
+        text = a.text + (b.text[overlap:] if overlap else " " + b.text)
+        end = None
+    else:
+        # No positions (e.g. payloads with only document/title/author): merge on a
+        # shared stretch of text, whichever chunk comes first.
+        overlap = _text_overlap(a.text, b.text, config.CONTEXT_MIN_TEXT_OVERLAP)
+        if not overlap:
+            overlap = _text_overlap(b.text, a.text, config.CONTEXT_MIN_TEXT_OVERLAP)
+            if not overlap:
+                return None
+            a, b = b, a
+        return Passage(
+            text=a.text + b.text[overlap:],
+            source=a.source,
+            rank=min(a.rank, b.rank),
+            chunks=a.chunks + b.chunks,
+        )
+
+    return Passage(
+        text=text,
+        source=a.source,
+        rank=min(a.rank, b.rank),
+        start=a.start,
+        end=end,
+        first_chunk=a.first_chunk,
+        last_chunk=b.last_chunk if b.last_chunk is not None else a.last_chunk,
+        chunks=a.chunks + b.chunks,
+    )
+
+
+def merge_chunks(docs: TypingList[Document]) -> TypingList[Passage]:
+    """Collapse overlapping/adjacent chunks; passages come back in rerank order."""
+    passages: TypingList[Passage] = []
+    for rank, doc in enumerate(docs):
+        start = _int_or_none(doc.metadata.get("start_index"))
+        index = _int_or_none(doc.metadata.get("chunk_index"))
+        if start is not None and start < 0:
+            start = None
+        passage = Passage(
+            text=doc.page_content,
+            source=_source_key(doc),
+            rank=rank,
+            start=start,
+            end=start + len(doc.page_content) if start is not None else None,
+            first_chunk=index,
+            last_chunk=index,
+        )
+        # A new chunk can bridge two existing passages, so keep merging.
+        merged = True
+        while merged:
+            merged = False
+            for i, other in enumerate(passages):
+                combined = _try_merge(other, passage)
+                if combined is not None:
+                    passages.pop(i)
+                    passage = combined
+                    merged = True
+                    break
+        passages.append(passage)
+    passages.sort(key=lambda p: p.rank)
+    return passages
+
+
+# ---- Packing ----
+@dataclass
+class PackedContext:
+    text: str
+    passages: TypingList[Passage] = field(default_factory=list)
+    chunks: int = 0
+    raw_tokens: int = 0     # tokens of the chunks joined verbatim
+    tokens: int = 0         # tokens actually sent
+    budget: int = 0
+    truncated: bool = False
+    dropped_passages: int = 0
+    fixed_tokens: int = 0   # rest of the prompt (template + question)
+
+    @property
+    def saved_tokens(self) -> int:
+        return max(0, self.raw_tokens - self.tokens)
+
+    @property
+    def prompt_tokens(self) -> int:
+        return self.fixed_tokens + self.tokens
+
+
+def pack_context(
+    docs: TypingList[Document],
+    budget: int | None = None,
+    counter: TokenCounter | None = None,
+    fixed_tokens: int = 0,
+) -> PackedContext:
+    """
+    Merge `docs` (in rerank order) and pack them into `budget` tokens
+    (default: derived from OLLAMA_NUM_CTX less `fixed_tokens`).
+    """
+    counter = counter or get_token_counter()
+    budget = context_token_budget(fixed_tokens) if budget is None else budget
+    raw_tokens = counter.count(PASSAGE_SEPARATOR.join(d.page_content for d in docs))
+
+    sep_tokens = counter.count(PASSAGE_SEPARATOR)
+    packed: TypingList[Passage] = []
+    texts: TypingList[str] = []
+    used = 0
+    truncated = False
+    passages = merge_chunks(docs)
+    for passage in passages:
+        cost = counter.count(passage.text) + (sep_tokens if texts else 0)
+        if used + cost <= budget:
+            texts.append(passage.text)
+            packed.append(passage)
+            used += cost
+            continue
+        # Keep the head of the first passage that doesn't fit rather than
+        # leaving the budget unused, then stop: later passages rank lower.
+        room = budget - used - (sep_tokens if texts else 0)
+        if room >= config.CONTEXT_MIN_PASSAGE_TOKENS:
+            texts.append(counter.truncate(passage.text, room))
+            packed.append(passage)
+            truncated = True
+        break
+
+    text = PASSAGE_SEPARATOR.join(texts)
+    return PackedContext(
+        text=text,
+        passages=packed,
+        chunks=len(docs),
+        raw_tokens=raw_tokens,
+        tokens=counter.count(text),
+        budget=budget,
+        truncated=truncated,
+        dropped_passages=len(passages) - len(packed),
+        fixed_tokens=fixed_tokens,
+    )
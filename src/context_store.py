@@ -0,0 +1,157 @@
+# src/feminism_rag/context_store.py
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List as TypingList
+
+
+@dataclass
+class StoredContext:
+    """What the 🔍 view needs for one answer; chunk text is rehydrated by ID."""
+
+    message_id: int
+    question: str
+    answer: str
+    doc_ids: TypingList[int | str]  # Qdrant point IDs, context order
+    scores: TypingList[float] = field(default_factory=list)  # parallel to doc_ids; empty for cache hits
+    degradations: TypingList[str] = field(default_factory=list)
+    created_at: float = 0.0
+
+    @classmethod
+    def from_result(cls, message_id: int, result: dict) -> "StoredContext":
+        """Compact a pipeline result (`answer` / `AnswerStream.result`)."""
+        return cls(
+            message_id=message_id,
+            question=result.get("question", ""),
+            answer=result.get("answer", ""),
+            doc_ids=[d.metadata.get("_id") for d in result.get("context", [])],
+            scores=[float(s) for s in result.get("scores") or []],
+            degradations=list(result.get("degradations") or []),
+            created_at=time.time(),
+        )
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contexts (
+    message_id   INTEGER PRIMARY KEY,
+    question     TEXT NOT NULL,
+    answer       TEXT NOT NULL,
+    doc_ids      TEXT NOT NULL,  -- JSON list
+    scores       TEXT NOT NULL,  -- JSON list
+    degradations TEXT NOT NULL,  -- JSON list
+    created_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS contexts_created_at ON contexts (created_at);
+"""
+
+
+class ContextStore:
+    """
+    Message ID -> `StoredContext`, persisted in SQLite.
+
+    The most recently used `lru_size` entries are also held in memory, so a
+    🔍 on a fresh answer never touches the disk. Rows older than
+    `retention_s` are deleted on open. With `path=None` the database lives
+    in memory (nothing survives a restart).
+    """
+
+    def __init__(self, path: str | Path | None, lru_size: int, retention_s: float):
+        self.path = Path(path) if path else None
+        self.lru_size = lru_size
+        self.retention_s = retention_s
+        self.hits = 0    # served from the LRU
+        self.reads = 0   # served from SQLite
+        self.misses = 0  # unknown / expired message
+
+        self._lru: OrderedDict[int, StoredContext] = OrderedDict()  # oldest first
+        self._lock = threading.Lock()
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(
+            str(self.path) if self.path else ":memory:", check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self.prune()
+
+    # ---- put / get ----
+    def put(self, entry: StoredContext) -> None:
+        row = (
+            entry.message_id,
+            entry.question,
+            entry.answer,
+            json.dumps(entry.doc_ids),
+            json.dumps(entry.scores),
+            json.dumps(entry.degradations),
+            entry.created_at,
+        )
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO contexts VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+            self._db.commit()
+            self._remember(entry)
+
+    def get(self, message_id: int) -> StoredContext | None:
+        with self._lock:
+            entry = self._lru.get(message_id)
+            if entry is not None:
+                self._lru.move_to_end(message_id)
+                self.hits += 1
+                return entry
+            row = self._db.execute(
+                "SELECT message_id, question, answer, doc_ids, scores, degradations, created_at "
+                "FROM contexts WHERE message_id = ? AND created_at >= ?",
+                (message_id, time.time() - self.retention_s),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.reads += 1
+            entry = StoredContext(
+                message_id=row[0],
+                question=row[1],
+                answer=row[2],
+                doc_ids=json.loads(row[3]),
+                scores=json.loads(row[4]),
+                degradations=json.loads(row[5]),
+                created_at=row[6],
+            )
+            self._remember(entry)
+            return entry
+
+    def prune(self) -> int:
+        """Delete rows past retention; returns how many went."""
+        with self._lock:
+            cur = self._db.execute(
+                "DELETE FROM contexts WHERE created_at < ?", (time.time() - self.retention_s,)
+            )
+            self._db.commit()
+            return cur.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            (rows,) = self._db.execute("SELECT COUNT(*) FROM contexts").fetchone()
+        return {
+            "rows": rows,
+            "lru": len(self._lru),
+            "lru_hits": self.hits,
+            "sqlite_reads": self.reads,
+            "misses": self.misses,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # ---- internals (caller holds the lock) ----
+    def _remember(self, entry: StoredContext) -> None:
+        self._lru[entry.message_id] = entry
+        self._lru.move_to_end(entry.message_id)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
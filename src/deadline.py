@@ -0,0 +1,58 @@
+# src/feminism_rag/deadline.py
+"""
+Per-request latency budgets.
+
+A `Deadline` is created when a question arrives (REQUEST_DEADLINE_S) and
+travels in the graph state. Each stage asks it for its budget: the stage's
+own cap from STAGE_BUDGETS_S, clipped to whatever is left of the request.
+Stages that run out degrade instead of failing, and say so in the state's
+`degradations` list.
+"""
+from __future__ import annotations
+
+import time
+
+from . import config
+
+# Degradation tags, shown in the 🔍 context view and counted in metrics.
+RETRIEVE_TIMEOUT = "retrieve_timeout"    # no candidates in time; answered without context
+RERANK_TIMEOUT = "rerank_timeout"        # dense MMR order used instead of the reranker's
+RERANK_ERROR = "rerank_error"            # ditto, after both hedged attempts failed
+GENERATE_TRUNCATED = "generate_truncated"  # answer cut off at the generation cap
+GENERATE_TIMEOUT = "generate_timeout"    # nothing generated in time; "still thinking" reply
+
+DESCRIPTIONS = {
+    RETRIEVE_TIMEOUT: "search timed out, answered without context",
+    RERANK_TIMEOUT: "reranker timed out, dense retrieval order used",
+    RERANK_ERROR: "reranker failed, dense retrieval order used",
+    GENERATE_TRUNCATED: "answer cut off at the time limit",
+    GENERATE_TIMEOUT: "model did not answer in time",
+}
+
+# What the user sees when generation hits its cap.
+TRUNCATED_SUFFIX = "\n\n_(cut off: the answer hit its time limit)_"
+STILL_THINKING_MESSAGE = (
+    "Still thinking — the model didn't answer in time. Please try again in a moment."
+)
+
+
+class Deadline:
+    """
+    Monotonic expiry time for one request. `budgets` replaces STAGE_BUDGETS_S
+    (e.g. `{}` in batch mode: only the total applies).
+    """
+
+    def __init__(self, total_s: float | None = None, budgets: dict | None = None):
+        self.total_s = total_s if total_s is not None else config.REQUEST_DEADLINE_S
+        self.budgets = budgets if budgets is not None else config.STAGE_BUDGETS_S
+        self.expires_at = time.monotonic() + self.total_s
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def budget(self, stage: str) -> float:
+        """Seconds `stage` may take: its own cap, clipped to the time left."""
+        return min(self.budgets.get(stage, self.total_s), self.remaining())
+
+    def __repr__(self) -> str:
+        return f"Deadline(total_s={self.total_s}, remaining={self.remaining():.2f})"
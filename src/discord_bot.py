@@ -1,37 +1,88 @@
 # src/feminism_rag/discord_bot.py
 from __future__ import annotations
 
+import asyncio
+import logging
+
 import discord
 from discord.ext import commands
 
-from .generate import graph
-from . import config
+from .context_store import ContextStore, StoredContext
+from .deadline import DESCRIPTIONS
+from .workers import WorkerPool
+from . import config, metrics
 
 MAG = "🔍"
 RECYCLE = "♻️"
+DISCORD_MAX_CHARS = 2000
+CURSOR = "▌"
+
+logger = logging.getLogger(__name__)
+
+
+# 🔍 history: message ID -> question, answer, chunk IDs and scores (text rehydrated on click).
+# Opened in main(), so importing this module touches no files.
+contexts: ContextStore | None = None
+
+
+class InflightLimiter:
+    """Caps concurrent RAG runs and tracks how many questions are queued."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.waiting = 0   # queue depth: questions waiting for a slot
+        self.running = 0
+        self._sem = asyncio.Semaphore(limit)
+
+    async def __aenter__(self):
+        self.waiting += 1
+        try:
+            await self._sem.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        logger.info(
+            "rag slot acquired: running=%d/%d queued=%d",
+            self.running, self.limit, self.waiting,
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        self.running -= 1
+        self._sem.release()
+        return False
+
 
+limiter = InflightLimiter(config.MAX_CONCURRENT_QUESTIONS)
 
-class DictQueue(dict):
-    """Very small queue-like cache for (message_id -> response) pairs."""
+# Set in main() when RAG_WORKERS > 0; otherwise the pipeline runs in this process
+# (imported lazily, so a front-end-only bot never loads torch or the index).
+workers: WorkerPool | None = None
 
-    def __init__(self, maxlen: int = 5):
-        self.list = []
-        self.maxlen = maxlen
 
-    def __getitem__(self, message_id: int):
-        for mid, resp in self.list:
-            if mid == message_id:
-                return resp
-        return {}
+async def _aanswer(text: str) -> dict:
+    if workers is not None:
+        return await workers.aanswer(text)
+    from .generate import aanswer
 
-    def __setitem__(self, message_id: int, response: dict):
-        # push to front, drop the oldest (end) if > maxlen
-        self.list.insert(0, (message_id, response))
-        if len(self.list) > self.maxlen:
-            self.list.pop()
+    return await aanswer(text)
 
 
-cache = DictQueue(maxlen=5)
+async def _hydrate_ids(doc_ids: list) -> list:
+    if workers is not None:
+        return await workers.hydrate_ids(doc_ids)
+    from .generate import hydrate_ids, pipeline
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pipeline.retrieval_executor, hydrate_ids, doc_ids)
+
+
+def _answer_stream(text: str):
+    if workers is not None:
+        return workers.stream(text)
+    from .generate import AnswerStream
+
+    return AnswerStream(text)
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -41,28 +92,120 @@ intents.reactions = True
 bot = commands.Bot(command_prefix="!", intents=intents)
 
 
+class StreamingReply:
+    """
+    Progressively edits Discord messages as answer text streams in.
+
+    Edits are throttled to one per `interval_s` to stay inside Discord's rate
+    limits; text beyond the 2000-char message limit spills into follow-up
+    messages. `messages[0]` is the message the answer is anchored to.
+    """
+
+    PREFIX = "**Answer:** "
+
+    def __init__(self, ctx, interval_s: float = config.DISCORD_STREAM_EDIT_INTERVAL_S):
+        self.ctx = ctx
+        self.interval_s = interval_s
+        self.text = self.PREFIX
+        self.messages: list = []
+        self._shown: list[str] = []
+        self._last_flush = 0.0
+
+    async def start(self) -> None:
+        await self._render(cursor=True)
+
+    async def append(self, delta: str) -> None:
+        self.text += delta
+        now = asyncio.get_running_loop().time()
+        if now - self._last_flush >= self.interval_s:
+            await self._render(cursor=True)
+
+    async def finish(self) -> None:
+        await self._render(cursor=False)
+
+    async def fail(self, error: Exception) -> None:
+        """Turn the reply into the error report, keeping any partial answer above it."""
+        if self.text == self.PREFIX:
+            self.text = f"backend error: {error}"
+        else:
+            self.text += f"\n\n_(backend error: {error})_"
+        await self._render(cursor=False)
+
+    async def _render(self, cursor: bool) -> None:
+        # Pages are cut from the text alone, with room left for the cursor on the
+        # last one, so the cursor never gets a message of its own.
+        self._last_flush = asyncio.get_running_loop().time()
+        page = DISCORD_MAX_CHARS - len(CURSOR)
+        pages = [self.text[i:i + page] for i in range(0, len(self.text), page)] or [""]
+        if cursor:
+            pages[-1] += CURSOR
+        for i, chunk in enumerate(pages):
+            if i >= len(self.messages):
+                self.messages.append(await self.ctx.send(chunk))
+                self._shown.append(chunk)
+            elif self._shown[i] != chunk:
+                await self.messages[i].edit(content=chunk)
+                self._shown[i] = chunk
+        while len(self.messages) > max(1, len(pages)):  # the text got shorter (fail)
+            self._shown.pop()
+            await self.messages.pop().delete()
+
+
+async def _stream_answer(reply: StreamingReply, text: str):
+    """
+    Stream the answer into `reply`; returns (anchor message, result). On an
+    error the caller still holds `reply`, to turn it into the error report.
+    """
+    await reply.start()
+    stream = _answer_stream(text)
+    async for delta in stream.deltas():
+        await reply.append(delta)
+    await reply.finish()
+    return reply.messages[0], stream.result
+
+
 @bot.command(name="askchima")
 async def askchima(ctx, *, text: str):
     """Usage: !askchima <your question>"""
 
+    reply = None
     try:
-        result = graph.invoke({"question": text})
+        async with limiter:
+            if config.DISCORD_STREAMING:
+                reply = StreamingReply(ctx)
+                msg, result = await _stream_answer(reply, text)
+            else:
+                result = await _aanswer(text)
+                msg = None
     except Exception as e:
-        msg = await ctx.send(f"backend error: {e}")
+        msg = None
+        if reply is not None and reply.messages:
+            # Replace the half-streamed placeholder (and its cursor) with the error.
+            try:
+                await reply.fail(e)
+                msg = reply.messages[0]
+            except Exception:
+                logger.exception("could not edit the reply into an error report")
+        if msg is None:
+            msg = await ctx.send(f"backend error: {e}")
         try:
             await msg.add_reaction(RECYCLE)
         except Exception:
             pass
         return
 
-    answer = result.get("answer", "(no answer)")
-    msg = await ctx.send(f"**Answer:** {answer}")
+    if msg is None:
+        answer = result.get("answer", "(no answer)")
+        msg = await ctx.send(f"**Answer:** {answer}")
     try:
         await msg.add_reaction(MAG)
     except Exception:
         pass
 
-    cache[msg.id] = result  # store full response (incl. context)
+    try:
+        await asyncio.to_thread(contexts.put, StoredContext.from_result(msg.id, result))
+    except Exception:
+        logger.exception("could not store the context for message %s", msg.id)
 
 
 @bot.command(name="chimahelp")
@@ -106,27 +249,43 @@ This bot talks about:
 
 
 @bot.event
-async def on_reaction_add(reaction, user):
-    if user.bot:
+async def on_raw_reaction_add(payload):
+    # Raw event: fires for messages outside the client's message cache too,
+    # so 🔍 keeps working on old answers and across restarts.
+    if str(payload.emoji) not in (MAG, RECYCLE):
         return
-    if str(reaction.emoji) not in (MAG, RECYCLE):
+    user = payload.member or bot.get_user(payload.user_id)
+    if payload.user_id == bot.user.id or (user is not None and user.bot):
         return
 
-    msg = reaction.message
+    try:
+        channel = bot.get_channel(payload.channel_id) or await bot.fetch_channel(payload.channel_id)
+        msg = await channel.fetch_message(payload.message_id)
+    except discord.HTTPException:
+        return
     if msg.author.id != bot.user.id:
         return
 
-    if str(reaction.emoji) == MAG:
-        data = cache[msg.id]
-        if not data:
+    if str(payload.emoji) == MAG:
+        stored = await asyncio.to_thread(contexts.get, msg.id)
+        if stored is None:
             await msg.channel.send(
                 "sorry, that message is too old. please ask the question again and react with a mag for context. thanks!",
                 reference=msg,
             )
             return
 
-        docs = data.get("context", [])
+        try:
+            docs = await _hydrate_ids(stored.doc_ids)
+        except Exception as e:
+            await msg.channel.send(f"backend error: {e}", reference=msg)
+            return
+        scores = stored.scores if len(stored.scores) == len(docs) else []
         lines = [f"{MAG} **Context for message ID `{msg.id}`**"]
+        if stored.degradations:
+            lines.append(
+                "⚠️ degraded: " + "; ".join(DESCRIPTIONS.get(d, d) for d in stored.degradations)
+            )
         for i, doc in enumerate(docs, 1):
             try:
                 source = doc.metadata["title"] + " - " + doc.metadata["author"]
@@ -139,8 +298,9 @@ async def on_reaction_add(reaction, user):
                 page = getattr(doc, "page_content", "")
             except Exception:
                 page = "error! oops!"
+            score = f" (score {scores[i - 1]:.2f})" if scores else ""
             lines.append(
-                f"\n**[{i}] Source:** `{source}`\n**Page content:**\n{page}"[:380]
+                f"\n**[{i}] Source:** `{source}`{score}\n**Page content:**\n{page}"[:380]
                 + "..."
             )
 
@@ -152,7 +312,7 @@ async def on_reaction_add(reaction, user):
             await output.add_reaction(RECYCLE)
         except Exception:
             pass
-    elif str(reaction.emoji) == RECYCLE:
+    elif str(payload.emoji) == RECYCLE:
         await msg.delete()
 
 
@@ -162,7 +322,49 @@ def main() -> None:
         raise SystemExit(
             "DISCORD_BOT_TOKEN is not set. Add it to your .env before running."
         )
-    bot.run(config.DISCORD_BOT_TOKEN)
+    global contexts
+
+    discord.utils.setup_logging(root=True)
+    contexts = ContextStore(
+        config.CONTEXT_STORE_PATH,
+        lru_size=config.CONTEXT_STORE_LRU_SIZE,
+        retention_s=config.CONTEXT_STORE_RETENTION_S,
+    )
+    metrics.start_server()
+
+    metrics.gauge("rag_queue_depth", "Questions waiting for a RAG slot", lambda: limiter.waiting)
+    metrics.gauge("rag_questions_running", "Questions in the RAG pipeline", lambda: limiter.running)
+    if config.RAG_WORKERS > 0:
+        asyncio.run(_run_with_workers())
+        return
+
+    from .generate import pipeline
+
+    # Load models and open backend connections before we connect to the
+    # gateway, so the first !askchima doesn't pay the cold start.
+    pipeline.warmup()
+
+    metrics.gauge("rag_llm_in_flight", "Generation requests at the backend", lambda: pipeline.generator.in_flight)
+    metrics.gauge("rag_llm_waiting", "Generation requests waiting for a slot", lambda: pipeline.generator.waiting)
+    if pipeline.heartbeat is not None:
+        pipeline.heartbeat.start()
+    bot.run(config.DISCORD_BOT_TOKEN, log_handler=None)
+
+
+async def _run_with_workers() -> None:
+    """Front-end mode: start the worker pool (each worker warms up), then the gateway."""
+    global workers, limiter
+
+    workers = WorkerPool(config.RAG_WORKERS)
+    limiter = InflightLimiter(config.MAX_CONCURRENT_QUESTIONS * config.RAG_WORKERS)
+    await workers.start()
+    metrics.gauge("rag_workers_healthy", "RAG worker processes answering pings", lambda: workers.healthy)
+    metrics.gauge("rag_worker_outstanding", "Questions dispatched to RAG workers", lambda: workers.outstanding)
+    try:
+        async with bot:
+            await bot.start(config.DISCORD_BOT_TOKEN)
+    finally:
+        await workers.stop()
 
 
 if __name__ == "__main__":
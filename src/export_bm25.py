@@ -0,0 +1,34 @@
+# src/feminism_rag/export_bm25.py
+"""
+Build the BM25 inverted index over QDRANT_COLLECTION's chunk texts, used
+when RETRIEVAL_MODE is "hybrid", "auto" or "lexical".
+
+    python -m src.export_bm25 [--out DIR] [--from-mmap]
+
+--from-mmap reads the chunks from the exported mmap index instead of
+opening Qdrant (same collection, same point IDs).
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from . import config
+from .retrieval import MmapIndex, build_bm25_index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--out", default=config.BM25_INDEX_PATH)
+    parser.add_argument("--from-mmap", action="store_true", help=f"read {config.MMAP_INDEX_PATH}")
+    args = parser.parse_args()
+
+    index = MmapIndex(config.MMAP_INDEX_PATH) if args.from_mmap else None
+    t0 = time.perf_counter()
+    out = build_bm25_index(index=index, out_dir=args.out)
+    print(f"indexed {config.QDRANT_COLLECTION} -> {out} in {time.perf_counter() - t0:.1f}s")
+    print((out / "meta.json").read_text())
+
+
+if __name__ == "__main__":
+    main()
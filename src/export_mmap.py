@@ -0,0 +1,45 @@
+# src/feminism_rag/export_mmap.py
+"""
+Export QDRANT_COLLECTION to the memory-mapped index used when
+RETRIEVER_BACKEND == "mmap", optionally with quantized first-pass codes
+(MMAP_QUANTIZATION).
+
+    python -m src.export_mmap [--out DIR] [--dtype float32|float16] [--quantize int8 binary]
+    python -m src.export_mmap --no-export --quantize binary   # add codes to an existing export
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from . import config
+from .retrieval import QUANTIZATION_KINDS, export_mmap_index, quantize_mmap_index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--out", default=config.MMAP_INDEX_PATH)
+    parser.add_argument("--dtype", default=config.MMAP_INDEX_DTYPE, choices=["float32", "float16"])
+    parser.add_argument("--quantize", nargs="*", default=[], choices=QUANTIZATION_KINDS)
+    parser.add_argument("--no-export", action="store_true", help="only (re)build quantized codes")
+    args = parser.parse_args()
+
+    out = Path(args.out)
+    if not args.no_export:
+        t0 = time.perf_counter()
+        out = export_mmap_index(out_dir=args.out, dtype=args.dtype)
+        print(f"exported {config.QDRANT_COLLECTION} -> {out} in {time.perf_counter() - t0:.1f}s")
+        print((out / "meta.json").read_text())
+
+    for kind in args.quantize:
+        t0 = time.perf_counter()
+        quantize_mmap_index(out, kind)
+        params = json.loads((out / "quantization.json").read_text())[kind]
+        size_mb = (out / params["file"]).stat().st_size / 2**20
+        print(f"{kind} codes -> {out / params['file']} ({size_mb:.1f} MB) in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
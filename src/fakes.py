@@ -0,0 +1,240 @@
+# src/feminism_rag/fakes.py
+"""
+Deterministic offline stand-ins for the external backends.
+
+Selected with LLM_BACKEND = "fake" / RERANKER_BACKEND = "fake" so the
+benchmarks (and anything else) can run the full pipeline with no Ollama and
+no Cohere. Outputs depend only on their inputs; latency is simulated with
+the FAKE_* settings in config.py.
+
+`FakeRerankServer` serves the fake reranker over a Cohere-compatible HTTP
+API with injectable slowness and failures, to exercise the real Cohere
+client, hedging and deadline fallbacks:
+
+    python -m src.fakes --port 8081 --slow-rate 0.2 --slow-ms 5000 --fail-rate 0.05
+    COHERE_BASE_URL=http://127.0.0.1:8081 COHERE_API_KEY=fake python -m src.discord_bot
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncIterator, Iterator, List as TypingList
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from . import config
+from .rerank import Reranker, RerankResult
+
+_WORD = re.compile(r"\w+")
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that "answers" by echoing words from its prompt.
+
+    The answer is a digest of the full prompt followed by up to `max_tokens`
+    prompt words, streamed one token per chunk after `ttft_ms`, then
+    `ms_per_token` per token.
+    """
+
+    ttft_ms: float = config.FAKE_LLM_TTFT_MS
+    ms_per_token: float = config.FAKE_LLM_MS_PER_TOKEN
+    max_tokens: int = config.FAKE_LLM_MAX_TOKENS
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _tokens(self, messages: TypingList[BaseMessage]) -> TypingList[str]:
+        prompt = "\n".join(str(m.content) for m in messages)
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        words = _WORD.findall(messages[-1].content if messages else "")
+        return [f"[fake-{digest}]"] + [f" {w}" for w in words[: self.max_tokens - 1]]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens(messages)
+        time.sleep((self.ttft_ms + self.ms_per_token * (len(tokens) - 1)) / 1000)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens(messages)
+        await asyncio.sleep((self.ttft_ms + self.ms_per_token * (len(tokens) - 1)) / 1000)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.ttft_ms / 1000)
+        for i, token in enumerate(self._tokens(messages)):
+            if i:
+                time.sleep(self.ms_per_token / 1000)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(
+        self, messages, stop=None, run_manager=None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.ttft_ms / 1000)
+        for i, token in enumerate(self._tokens(messages)):
+            if i:
+                await asyncio.sleep(self.ms_per_token / 1000)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+class FakeReranker(Reranker):
+    """
+    Lexical-overlap reranker: score = shared query words / sqrt(doc words).
+    Ties keep the first-stage order. Sleeps `latency_ms` per call.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency_ms: float = config.FAKE_RERANK_MS):
+        self.latency_ms = latency_ms
+
+    def _scores(self, query: str, documents: TypingList[str]) -> TypingList[float]:
+        q = set(w.lower() for w in _WORD.findall(query))
+        scores = []
+        for doc in documents:
+            words = [w.lower() for w in _WORD.findall(doc)]
+            scores.append(sum(w in q for w in set(words)) / math.sqrt(len(words) or 1))
+        return scores
+
+    def _top(self, query, documents, top_n):
+        scores = self._scores(query, documents)
+        order = sorted(range(len(documents)), key=lambda i: (-scores[i], i))
+        return [RerankResult(i, scores[i]) for i in order[:top_n]]
+
+    def rerank(self, query, documents, top_n):
+        time.sleep(self.latency_ms / 1000)
+        return self._top(query, documents, top_n)
+
+    async def arerank(self, query, documents, top_n):
+        await asyncio.sleep(self.latency_ms / 1000)
+        return self._top(query, documents, top_n)
+
+
+class FakeRerankServer:
+    """
+    Cohere-compatible POST /v1/rerank and /v2/rerank backed by `FakeReranker`.
+
+    Each call waits `latency_ms`; a `slow_rate` share of calls waits `slow_ms`
+    instead and a `fail_rate` share answers HTTP 500. Runs on a daemon thread.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = config.FAKE_RERANK_MS,
+        slow_rate: float = 0.0,
+        slow_ms: float = 5000.0,
+        fail_rate: float = 0.0,
+        seed: int | None = None,
+    ):
+        self.reranker = FakeReranker(latency_ms=0)
+        self.latency_ms = latency_ms
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.fail_rate = fail_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _draw(self) -> tuple[bool, bool]:
+        """(slow, fail) for the next call."""
+        with self._lock:
+            self.calls += 1
+            return self._random.random() < self.slow_rate, self._random.random() < self.fail_rate
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:  # keep test output quiet
+                pass
+
+            def _send(self, status: int, body: dict) -> None:
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self) -> None:
+                if self.path.rstrip("/") not in ("/v1/rerank", "/v2/rerank"):
+                    self._send(404, {"message": f"no route {self.path}"})
+                    return
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                slow, fail = server._draw()
+                time.sleep((server.slow_ms if slow else server.latency_ms) / 1000)
+                if fail:
+                    self._send(500, {"message": "injected failure"})
+                    return
+                documents = [
+                    d if isinstance(d, str) else d.get("text", "") for d in request["documents"]
+                ]
+                top_n = request.get("top_n") or len(documents)
+                results = server.reranker._top(request["query"], documents, top_n)
+                self._send(
+                    200,
+                    {
+                        "id": str(uuid.uuid4()),
+                        "results": [
+                            {"index": r.index, "relevance_score": r.relevance_score} for r in results
+                        ],
+                        "meta": {"api_version": {"version": "2"}, "billed_units": {"search_units": 1}},
+                    },
+                )
+
+        return Handler
+
+    def start(self) -> "FakeRerankServer":
+        self._thread = threading.Thread(
+            target=self.httpd.serve_forever, name="fake-rerank-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the fake reranker over a Cohere-compatible API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=config.FAKE_RERANK_MS)
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="share of calls that take --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=5000.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of calls answered with HTTP 500")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = FakeRerankServer(
+        args.host, args.port, args.latency_ms, args.slow_rate, args.slow_ms, args.fail_rate, args.seed
+    )
+    print(f"fake Cohere rerank API on {server.url} (set COHERE_BASE_URL to this)")
+    server.httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
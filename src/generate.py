@@ -1,105 +1,1183 @@
 # src/feminism_rag/generate.py
 from __future__ import annotations
 
-from typing_extensions import List, TypedDict
+import asyncio
+import logging
+import operator
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from datetime import datetime
+
+from typing_extensions import Annotated, AsyncIterator, List, Tuple, TypedDict
 
-import cohere
-from langchain_community.chat_models import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.documents import Document
-from langgraph.graph import START, StateGraph
-
-from . import config
-from .retrieval import get_retriever, enrich_with_payload
+from langchain_core.runnables import RunnableLambda
 
-# ---- Cohere client ----
-if not config.COHERE_API_KEY:
-    raise RuntimeError(
-        "COHERE_API_KEY is not set. Add it to your .env before running the app."
-    )
+from . import config, metrics
+from . import deadline as dl
+from .context_pack import PackedContext, get_token_counter, pack_context
+from .deadline import Deadline
+from .rerank import HedgedReranker, RerankPlan, RerankResult, plan_rerank
+from .retrieval import enrich_with_payload, rrf_fuse
+from .singleflight import SharedStream, SingleFlight, normalize_question
 
-co = cohere.Client(config.COHERE_API_KEY)
-
-print(config.OLLAMA_MODEL_NAME)
-# ---- LLM (local via Ollama) ----
-llm = ChatOllama(
-    model=config.OLLAMA_MODEL_NAME,
-    base_url=config.OLLAMA_BASE_URL,
-    temperature=config.OLLAMA_TEMPERATURE,
-    num_ctx=config.OLLAMA_NUM_CTX,
-)
+logger = logging.getLogger(__name__)
 
 # ---- Prompt (from LangChain Hub) ----
-prompt = ChatPromptTemplate.from_template(
-    """You are a helpful research assistant specializing in feminist theory,
-social science, and gender studies. Use ONLY the context provided below to
-answer the question. If the context is not sufficient, say you don't know.
-
-Context:
-{context}
-
-Question:
-{question}
+# All static instructions live in the system message so every request starts
+# with the same token prefix, which the backend's prompt/KV cache can reuse;
+# only the human message (context + question) varies.
+SYSTEM_PROMPT = """You are a helpful research assistant specializing in feminist theory,
+social science, and gender studies. Use ONLY the context provided in the user's
+message to answer their question. If the context is not sufficient, say you
+don't know.
 
 Answer in a clear, concise way that would make sense to a non-expert reader."""
+
+prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM_PROMPT),
+        ("human", "Context:\n{context}\n\nQuestion:\n{question}"),
+    ]
 )
 _example_messages = prompt.invoke(
     {"context": "(context goes here)", "question": "(question goes here)"}
 ).to_messages()
-assert len(_example_messages) == 1  # basic sanity check
+assert len(_example_messages) == 2  # basic sanity check
 
 
 # ---- RAG graph state ----
 class State(TypedDict):
     question: str
+    query_embedding: List[float]  # optional; set when the caller already embedded the question
     context: List[Document]
+    scores: List[float]       # per context doc: rerank relevance, or dense similarity if not reranked
     answer: str
+    prompt_tokens_saved: int  # set by generate when context packing merged/trimmed chunks
+    deadline: Deadline        # latency budget; set by the entry points, else one per node
+    degradations: Annotated[List[str], operator.add]  # deadline.* tags, appended by each node
+
+
+# ---- Generation backends ----
+def get_llm(backend: str | None = None):
+    """
+    Build the chat model for LLM_BACKEND:
+
+    - "ollama": local Ollama server via ChatOllama
+    - "openai": any OpenAI-compatible server (vLLM, llama.cpp server, ...),
+      over pooled keep-alive httpx clients sized to LLM_MAX_IN_FLIGHT
+    - "fake":   deterministic in-process stand-in (src/fakes.py)
+    """
+    backend = backend or config.LLM_BACKEND
+    if backend == "ollama":
+        from langchain_community.chat_models import ChatOllama
+
+        return ChatOllama(
+            model=config.OLLAMA_MODEL_NAME,
+            base_url=config.OLLAMA_BASE_URL,
+            temperature=config.OLLAMA_TEMPERATURE,
+            num_ctx=config.OLLAMA_NUM_CTX,
+            keep_alive=config.OLLAMA_KEEP_ALIVE,
+            timeout=int(config.LLM_HTTP_TIMEOUT_S),
+        )
+    if backend == "openai":
+        import httpx
+        from langchain_openai import ChatOpenAI
+
+        limits = httpx.Limits(
+            max_connections=config.LLM_MAX_IN_FLIGHT,
+            max_keepalive_connections=config.LLM_MAX_IN_FLIGHT,
+            keepalive_expiry=config.LLM_HTTP_KEEPALIVE_S,
+        )
+        timeout = httpx.Timeout(config.LLM_HTTP_TIMEOUT_S, connect=5.0)
+        return ChatOpenAI(
+            model=config.OPENAI_COMPAT_MODEL,
+            base_url=config.OPENAI_COMPAT_BASE_URL,
+            api_key=config.OPENAI_COMPAT_API_KEY or "EMPTY",
+            temperature=config.OLLAMA_TEMPERATURE,
+            max_retries=1,
+            stream_usage=True,
+            http_client=httpx.Client(limits=limits, timeout=timeout),
+            http_async_client=httpx.AsyncClient(limits=limits, timeout=timeout),
+        )
+    if backend == "fake":
+        from .fakes import FakeChatModel
+
+        return FakeChatModel()
+    raise ValueError(f"unknown LLM_BACKEND: {backend!r}")
+
+
+class GenerationDispatcher:
+    """
+    Sends prompts to the generation backend with at most `max_in_flight`
+    requests outstanding.
+
+    Concurrent questions are dispatched as parallel requests up to that
+    limit, which is what lets batching servers (vLLM, llama.cpp with
+    parallel slots) fold them into one decode batch; the rest wait here
+    rather than piling onto the server. Sync callers (warm-up, benchmarks)
+    and async callers have separate budgets of the same size.
+    """
+
+    def __init__(self, llm, max_in_flight: int):
+        self.llm = llm
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.waiting = 0
+        self._async_slots = asyncio.Semaphore(max_in_flight)
+        self._sync_slots = threading.BoundedSemaphore(max_in_flight)
+
+    def invoke(self, message):
+        with self._sync_slots:
+            return self.llm.invoke(message)
+
+    def stream(self, message):
+        with self._sync_slots:
+            yield from self.llm.stream(message)
+
+    async def _acquire(self) -> None:
+        self.waiting += 1
+        try:
+            await self._async_slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._async_slots.release()
+
+    async def ainvoke(self, message):
+        await self._acquire()
+        try:
+            return await self.llm.ainvoke(message)
+        finally:
+            self._release()
+
+    async def astream(self, message):
+        await self._acquire()
+        try:
+            async for chunk in self.llm.astream(message):
+                yield chunk
+        finally:
+            self._release()
+
+    async def abatch(self, messages: list) -> list:
+        """Dispatch many prompts at once; results come back in input order."""
+        return await asyncio.gather(*(self.ainvoke(m) for m in messages))
+
+
+def _in_active_hours(now: datetime | None = None) -> bool:
+    if config.OLLAMA_ACTIVE_HOURS is None:
+        return True
+    start, end = config.OLLAMA_ACTIVE_HOURS
+    hour = (now or datetime.now()).hour
+    return start <= hour < end if start <= end else hour >= start or hour < end
+
+
+class OllamaHeartbeat:
+    """
+    Keeps the Ollama model resident during OLLAMA_ACTIVE_HOURS.
+
+    Every OLLAMA_HEARTBEAT_INTERVAL_S a daemon thread sends an empty-prompt
+    /api/generate request, which loads the model if needed and resets its
+    keep-alive timer to OLLAMA_KEEP_ALIVE without generating anything.
+    Outside active hours it stays quiet and lets the model unload.
+    """
+
+    def __init__(self, interval_s: float = config.OLLAMA_HEARTBEAT_INTERVAL_S):
+        self.interval_s = interval_s
+        self.beats = 0
+        self.last_load_ms: float | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def beat(self) -> float:
+        """Ping once; returns Ollama's model load time in ms (0 when already resident)."""
+        import httpx
+
+        response = httpx.post(
+            f"{config.OLLAMA_BASE_URL}/api/generate",
+            json={
+                "model": config.OLLAMA_MODEL_NAME,
+                "prompt": "",
+                "keep_alive": config.OLLAMA_KEEP_ALIVE,
+            },
+            timeout=config.LLM_HTTP_TIMEOUT_S,
+        )
+        response.raise_for_status()
+        self.beats += 1
+        self.last_load_ms = response.json().get("load_duration", 0) / 1e6
+        return self.last_load_ms
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            if not _in_active_hours():
+                continue
+            try:
+                load_ms = self.beat()
+            except Exception as e:
+                logger.warning("ollama heartbeat failed: %s", e)
+                continue
+            if load_ms > 1.0:
+                logger.info("ollama heartbeat reloaded the model (load_ms=%.0f)", load_ms)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="ollama-heartbeat", daemon=True)
+        self._thread.start()
+        logger.info(
+            "ollama heartbeat every %.0fs (keep_alive=%s, active_hours=%s)",
+            self.interval_s, config.OLLAMA_KEEP_ALIVE, config.OLLAMA_ACTIVE_HOURS,
+        )
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+@dataclass
+class BackendTimings:
+    """Server-side timings reported with a response, when the backend provides them."""
+
+    load_ms: float | None = None             # model (re)load before the request ran
+    prompt_tokens: int | None = None
+    prompt_eval_tokens: int | None = None    # prompt tokens actually evaluated
+    prompt_eval_ms: float | None = None
+    cached_prompt_tokens: int | None = None  # prefix reused from the prompt cache
+
+
+def backend_timings(message, prompt_tokens: int | None = None) -> BackendTimings:
+    """
+    Read timings from a response's metadata.
+
+    Ollama reports load_duration and prompt_eval_count (ns / tokens) but not
+    the cached prefix directly: its prompt_eval_count excludes cached tokens,
+    so the prefix is estimated against our own count of the prompt.
+    OpenAI-compatible servers report cached tokens in the usage block.
+    """
+    meta = getattr(message, "response_metadata", None) or {}
+    usage = getattr(message, "usage_metadata", None) or {}
+    timings = BackendTimings(prompt_tokens=prompt_tokens)
+
+    if "load_duration" in meta:
+        timings.load_ms = meta["load_duration"] / 1e6
+    if "prompt_eval_count" in meta:
+        timings.prompt_eval_tokens = meta["prompt_eval_count"]
+        timings.prompt_eval_ms = meta.get("prompt_eval_duration", 0) / 1e6
+        if prompt_tokens is not None:
+            timings.cached_prompt_tokens = max(0, prompt_tokens - timings.prompt_eval_tokens)
+
+    cache_read = (usage.get("input_token_details") or {}).get("cache_read")
+    if cache_read is not None:
+        timings.cached_prompt_tokens = cache_read
+        timings.prompt_tokens = usage.get("input_tokens", prompt_tokens)
+    return timings
+
+
+def _log_backend_timings(timings: BackendTimings) -> None:
+    if timings.load_ms is None and timings.cached_prompt_tokens is None:
+        return
+    logger.info(
+        "llm backend: load_ms=%s prompt_tokens=%s prompt_eval_tokens=%s "
+        "prompt_eval_ms=%s cached_prompt_tokens=%s",
+        None if timings.load_ms is None else round(timings.load_ms),
+        timings.prompt_tokens,
+        timings.prompt_eval_tokens,
+        None if timings.prompt_eval_ms is None else round(timings.prompt_eval_ms),
+        timings.cached_prompt_tokens,
+    )
+    if timings.load_ms is not None and timings.load_ms > config.OLLAMA_COLD_LOAD_WARN_MS:
+        logger.warning("llm backend: cold model load took %.0f ms", timings.load_ms)
+
+
+# ---- Lazily built pipeline components ----
+class _component:
+    """
+    Like `functools.cached_property`, but builds under the owner's lock so
+    concurrent first use never loads a model twice.
+    """
+
+    def __init__(self, build):
+        self.build = build
+        self.name = build.__name__
+        self.__doc__ = build.__doc__
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        with obj._lock:
+            if self.name not in obj.__dict__:
+                obj.__dict__[self.name] = self.build(obj)
+        return obj.__dict__[self.name]
+
+
+class RAGPipeline:
+    """
+    Holds the heavy RAG components and builds each one on first use.
+
+    Constructing this object (and importing this module) does no I/O and
+    loads no models; `warmup()` builds everything up front and pushes a dummy
+    request through each stage so the first real question is not the one
+    paying for cold caches.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+
+    @_component
+    def _retrieval(self):
+        from .retrieval import get_retriever
+
+        return get_retriever()
+
+    @property
+    def retriever(self):
+        return self._retrieval[0]
+
+    @property
+    def qdrant_client(self):
+        return self._retrieval[1]
+
+    @property
+    def embedder(self):
+        """The (batching) query embedder behind the retriever."""
+        return self.retriever.vectorstore.embeddings
+
+    @_component
+    def payload_store(self):
+        """In-memory payload store, or None when payloads come inline with search."""
+        if not config.PAYLOAD_STORE_ENABLED:
+            return None
+        from .retrieval import get_payload_store
+
+        if config.RETRIEVER_BACKEND == "mmap":
+            return get_payload_store(index=self.retriever.vectorstore.index)
+        return get_payload_store(client=self.qdrant_client)
+
+    @_component
+    def lexical(self):
+        """BM25 index for the hybrid / lexical retrieval modes (None for "dense")."""
+        if config.RETRIEVAL_MODE == "dense":
+            return None
+        if config.RETRIEVAL_MODE not in ("hybrid", "auto", "lexical"):
+            raise ValueError(f"unknown RETRIEVAL_MODE: {config.RETRIEVAL_MODE!r}")
+        from .retrieval import get_lexical_index
+
+        return get_lexical_index()
+
+    @_component
+    def reranker(self):
+        """
+        Cohere API or local cross-encoder (see RERANKER_BACKEND), wrapped for
+        deadline-bounded, hedged calls.
+        """
+        from .rerank import get_reranker
+
+        return HedgedReranker(get_reranker())
+
+    @_component
+    def llm(self):
+        """Chat model for LLM_BACKEND (see `get_llm`)."""
+        return get_llm()
+
+    @_component
+    def generator(self):
+        """Concurrency-limited front door to `llm`."""
+        return GenerationDispatcher(self.llm, config.LLM_MAX_IN_FLIGHT)
+
+    @_component
+    def heartbeat(self):
+        """Keep-warm pinger for the Ollama backend (None for other backends)."""
+        if config.LLM_BACKEND != "ollama" or not config.OLLAMA_HEARTBEAT_ENABLED:
+            return None
+        return OllamaHeartbeat()
+
+    @_component
+    def flights(self):
+        """
+        Single-flight tables: "answer" (whole questions), "stream" (streamed
+        answers for the bot) and "rerank" (hydrate + rerank of one candidate set).
+        """
+        return {name: SingleFlight(name) for name in ("answer", "stream", "rerank")}
+
+    @_component
+    def retrieval_executor(self):
+        """
+        Embedding + Qdrant search are CPU-bound and synchronous; the async
+        path runs them here so they never block the caller's event loop.
+        """
+        return ThreadPoolExecutor(
+            max_workers=config.RETRIEVAL_EXECUTOR_WORKERS,
+            thread_name_prefix="rag-retrieval",
+        )
+
+    @_component
+    def generation_executor(self):
+        """
+        Drains sync generation streams (`generate`), so the caller can stop
+        waiting at the generation budget even when the backend stalls.
+        """
+        return ThreadPoolExecutor(
+            max_workers=config.LLM_MAX_IN_FLIGHT, thread_name_prefix="rag-generate"
+        )
+
+    @_component
+    def semantic_cache(self):
+        """Semantic answer cache in front of the graph."""
+        from .semantic_cache import SemanticCache
+
+        return SemanticCache(
+            path=config.SEMANTIC_CACHE_PATH,
+            threshold=config.SEMANTIC_CACHE_THRESHOLD,
+            max_entries=config.SEMANTIC_CACHE_MAX_ENTRIES,
+            ttl_s=config.SEMANTIC_CACHE_TTL_S,
+            save_delay_s=config.SEMANTIC_CACHE_SAVE_DELAY_S,
+        )
+
+    @_component
+    def graph(self):
+        """
+        LangGraph assembly. Each node carries a sync and an async
+        implementation, so `graph.invoke` and `graph.ainvoke` both work
+        without one wrapping the other.
+        """
+        from langgraph.graph import START, StateGraph
+
+        graph_builder = StateGraph(State).add_sequence(
+            [
+                (
+                    "retrieve",
+                    RunnableLambda(
+                        metrics.node("retrieve", retrieve),
+                        afunc=metrics.anode("retrieve", aretrieve),
+                    ),
+                ),
+                (
+                    "generate",
+                    RunnableLambda(
+                        metrics.node("generate", generate),
+                        afunc=metrics.anode("generate", agenerate),
+                    ),
+                ),
+            ]
+        )
+        graph_builder.add_edge(START, "retrieve")
+        return graph_builder.compile()
+
+    def warmup(self, question: str = "What is feminism?") -> dict:
+        """
+        Build every component and run one dummy embed / search / rerank /
+        generate. Returns per-step wall times in ms.
+        """
+        timings: dict = {}
+
+        def step(name, fn):
+            t0 = time.perf_counter()
+            out = fn()
+            timings[name] = (time.perf_counter() - t0) * 1000
+            return out
+
+        step("load_retriever_ms", lambda: self._retrieval)
+        step("load_payload_store_ms", lambda: self.payload_store)
+        step("load_lexical_ms", lambda: self.lexical)
+        step("load_reranker_ms", lambda: self.reranker)
+        step("load_llm_ms", lambda: self.generator)
+        if config.CONTEXT_PACKING_ENABLED:
+            step("load_tokenizer_ms", get_token_counter)
+        step("load_cache_ms", lambda: self.semantic_cache)
+        step("build_graph_ms", lambda: self.graph)
+
+        embedding = step("embed_ms", lambda: self.embedder.embed_query(question))
+        docs = step("search_ms", lambda: _first_stage(question, embedding))
+        step(
+            "rerank_ms",
+            lambda: self.reranker.rerank(
+                question, [d.page_content for d in docs], top_n=config.RERANK_FINAL_K
+            ),
+        )
+        step(
+            "generate_ms",
+            lambda: self.generator.invoke("Reply with the single word: ready"),
+        )
+
+        timings["total_ms"] = sum(timings.values())
+        logger.info("pipeline warm-up (llm backend %s): %s", config.LLM_BACKEND, timings)
+        return timings
+
+
+pipeline = RAGPipeline()
+
+# Names that used to be module-level globals; resolved lazily via `pipeline`.
+_PIPELINE_ATTRS = (
+    "retriever",
+    "qdrant_client",
+    "payload_store",
+    "reranker",
+    "llm",
+    "generator",
+    "heartbeat",
+    "flights",
+    "retrieval_executor",
+    "semantic_cache",
+    "graph",
+)
+
+
+def __getattr__(name: str):
+    if name in _PIPELINE_ATTRS:
+        return getattr(pipeline, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def lexical_only(question: str) -> bool:
+    """Whether `question` takes the BM25-only path, which needs no query embedding."""
+    if config.RETRIEVAL_MODE == "lexical":
+        return True
+    return config.RETRIEVAL_MODE == "auto" and pipeline.lexical.is_keyword_query(question)
+
+
+def _lexical_docs(doc_ids: List[int | str]) -> dict:
+    """Point ID -> Document for BM25 hits (which carry nothing but their IDs)."""
+    return {d.metadata.get("_id"): d for d in hydrate_ids(doc_ids)}
+
+
+def _search(
+    question: str, embedding: List[float] | None = None
+) -> List[Tuple[Document, float]]:
+    """
+    First-stage candidates for RETRIEVAL_MODE: MMR search (Qdrant or mmap
+    index) with each hit's dense similarity, BM25 hits with their scores, or
+    both fused by reciprocal rank with the fused scores. Dense hits may still
+    lack their payloads.
+    """
+    if lexical_only(question):
+        with metrics.span("lexical"):
+            hits = pipeline.lexical.search(question, config.RETRIEVAL_MMR_K)
+            docs = _lexical_docs([doc_id for doc_id, _ in hits])
+            return [(docs[doc_id], score) for doc_id, score in hits if doc_id in docs]
+
+    if embedding is None:
+        with metrics.span("embed"):
+            embedding = pipeline.embedder.embed_query(question)
+    retriever = pipeline.retriever
+    with metrics.span("search"):
+        dense = retriever.vectorstore.max_marginal_relevance_search_with_score_by_vector(
+            embedding, **retriever.search_kwargs
+        )
+    if config.RETRIEVAL_MODE == "dense":
+        return dense
 
+    with metrics.span("lexical"):
+        lexical = pipeline.lexical.search(question, config.BM25_FETCH_K)
+        docs = {d.metadata.get("_id"): d for d, _ in dense}
+        fused = rrf_fuse(
+            [list(docs), [doc_id for doc_id, _ in lexical]], limit=config.RETRIEVAL_MMR_K
+        )
+        docs.update(_lexical_docs([doc_id for doc_id, _ in fused if doc_id not in docs]))
+        return [(docs[doc_id], score) for doc_id, score in fused if doc_id in docs]
 
-# Global retrieval components
-retriever, qdrant_client = get_retriever()
+
+def _first_stage(question: str, embedding: List[float] | None = None) -> List[Document]:
+    """MMR search followed by payload hydration."""
+    return _hydrate([doc for doc, _ in _search(question, embedding)])
+
+
+def _hydrate(docs: List[Document]) -> List[Document]:
+    """
+    Attach full payloads (title, author, ...) to search hits. Without the
+    payload store the search already returned them inline.
+    """
+    store = pipeline.payload_store
+    if store is None:
+        return docs
+    with metrics.span("hydrate"):
+        return store.hydrate(docs)
+
+
+def _rerank_key(question: str, candidates: List[Tuple[Document, float]]) -> tuple:
+    """Same question + same candidate set => same hydrate/rerank output."""
+    return normalize_question(question), tuple(d.metadata.get("_id") for d, _ in candidates)
+
+
+_rerank_branches: Counter = Counter()
+
+
+def _plan_rerank(
+    candidates: List[Tuple[Document, float]],
+) -> Tuple[List[Document], RerankPlan]:
+    """Hydrate the candidates and decide what the reranker needs to see."""
+    docs = _hydrate([doc for doc, _ in candidates])
+    if not config.RERANK_ADAPTIVE_ENABLED or config.RETRIEVAL_MODE != "dense":
+        return docs, RerankPlan("full", tail=list(range(len(docs))), top_n=config.RERANK_FINAL_K)
+
+    plan = plan_rerank([score for _, score in candidates], [d.metadata.get("title", "") for d in docs])
+    _rerank_branches[plan.branch] += 1
+    metrics.rerank_branch(plan.branch)
+    logger.info(
+        "rerank policy: %s (head=%d, reranking %d for %d); branches so far %s",
+        plan.branch, len(plan.head), len(plan.tail), plan.top_n, dict(_rerank_branches),
+    )
+    return docs, plan
+
+
+def _apply_plan(
+    docs: List[Document], dense: List[float], plan: RerankPlan, results
+) -> Tuple[List[Document], List[float]]:
+    """(context, scores): the confident head by dense score, then the reranked tail."""
+    picked = [(i, dense[i]) for i in plan.head]
+    picked += [(plan.tail[r.index], r.relevance_score) for r in results]
+    return [docs[i] for i, _ in picked], [score for _, score in picked]
+
+
+def _dense_fallback(plan: RerankPlan, dense: List[float]) -> List[RerankResult]:
+    """The tail's first `top_n` in dense (search) order, in reranker shape."""
+    return [RerankResult(i, dense[plan.tail[i]]) for i in range(min(plan.top_n, len(plan.tail)))]
+
+
+def _degrade(tag: str, detail: object = "") -> List[str]:
+    logger.warning("degraded: %s%s", dl.DESCRIPTIONS[tag], f" ({detail})" if detail else "")
+    metrics.degraded(tag)
+    return [tag]
+
+
+def _rerank(
+    question: str, candidates: List[Tuple[Document, float]], timeout: float
+) -> Tuple[List[Document], List[float], List[str]]:
+    """Hydrate + rerank within `timeout`; returns (context, scores, degradations)."""
+    docs, plan = _plan_rerank(candidates)
+    dense = [score for _, score in candidates]
+    if not plan.tail:
+        context, scores = _apply_plan(docs, dense, plan, [])
+        return context, scores, []
+    degradations: List[str] = []
+    with metrics.span("rerank"):
+        try:
+            results = pipeline.reranker.rerank_within(
+                question, [docs[i].page_content for i in plan.tail], plan.top_n, timeout
+            )
+        except TimeoutError:
+            results, degradations = _dense_fallback(plan, dense), _degrade(dl.RERANK_TIMEOUT)
+        except Exception as e:
+            results, degradations = _dense_fallback(plan, dense), _degrade(dl.RERANK_ERROR, e)
+    context, scores = _apply_plan(docs, dense, plan, results)
+    return context, scores, degradations
+
+
+async def _arerank(
+    question: str, candidates: List[Tuple[Document, float]], timeout: float
+) -> Tuple[List[Document], List[float], List[str]]:
+    """Async variant of `_rerank`."""
+    docs, plan = _plan_rerank(candidates)  # in-memory lookups, fine on the loop
+    dense = [score for _, score in candidates]
+    if not plan.tail:
+        context, scores = _apply_plan(docs, dense, plan, [])
+        return context, scores, []
+    degradations: List[str] = []
+    with metrics.span("rerank"):
+        try:
+            results = await pipeline.reranker.arerank_within(
+                question, [docs[i].page_content for i in plan.tail], plan.top_n, timeout
+            )
+        except (TimeoutError, asyncio.TimeoutError):
+            results, degradations = _dense_fallback(plan, dense), _degrade(dl.RERANK_TIMEOUT)
+        except Exception as e:
+            results, degradations = _dense_fallback(plan, dense), _degrade(dl.RERANK_ERROR, e)
+    context, scores = _apply_plan(docs, dense, plan, results)
+    return context, scores, degradations
+
+
+def _deadline(state: State) -> Deadline:
+    return state.get("deadline") or Deadline()
 
 
 def retrieve(state: State) -> dict:
     """
-    Retrieve relevant docs using MMR, then rerank with Cohere.
-    Returns 'context' as a list of top-k Documents.
+    Retrieve relevant docs using MMR, then rerank (Cohere or local cross-encoder).
+    Returns 'context' as a list of top-k Documents. Search and rerank are
+    bounded by the state's deadline, like `aretrieve`.
     """
     question = state["question"]
+    deadline = _deadline(state)
 
-    # First-stage retrieval from Qdrant
-    retrieved_docs = retriever.get_relevant_documents(question)
-    retrieved_docs = enrich_with_payload(qdrant_client, retrieved_docs)
-
-    # Second-stage rerank with Cohere
-    response = co.rerank(
-        model=config.COHERE_RERANK_MODEL,
-        query=question,
-        documents=[r.page_content for r in retrieved_docs],
-        top_n=config.RERANK_FINAL_K,
-        return_documents=True,
-    )
+    # First-stage retrieval from Qdrant, on `retrieval_executor` so it can be bounded
+    search = pipeline.retrieval_executor.submit(_search, question, state.get("query_embedding"))
+    try:
+        candidates = search.result(timeout=deadline.budget("retrieve"))
+    except FutureTimeoutError:
+        return {"context": [], "scores": [], "degradations": _degrade(dl.RETRIEVE_TIMEOUT)}
 
-    top_docs = [retrieved_docs[r.index] for r in response.results]
-    return {"context": top_docs}
+    # Hydrate + second-stage rerank, shared with identical concurrent retrievals
+    rerank = lambda: _rerank(question, candidates, deadline.budget("rerank"))
+    if not config.SINGLE_FLIGHT_ENABLED:
+        top_docs, scores, degradations = rerank()
+    else:
+        top_docs, scores, degradations = pipeline.flights["rerank"].do_sync(
+            _rerank_key(question, candidates), rerank
+        )
+    return {"context": list(top_docs), "scores": list(scores), "degradations": degradations}
 
 
-def generate(state: State) -> dict:
+async def aretrieve(state: State) -> dict:
     """
-    Generate a grounded answer from the retrieved context.
+    Async variant of `retrieve`: first stage runs on `retrieval_executor`,
+    then the reranker's async path (Cohere's async client, or a worker thread
+    for the local cross-encoder).
     """
-    docs_content = "\n\n".join(doc.page_content for doc in state["context"])
-    message = prompt.invoke(
+    question = state["question"]
+    deadline = _deadline(state)
+
+    loop = asyncio.get_running_loop()
+    try:
+        candidates = await asyncio.wait_for(
+            loop.run_in_executor(
+                pipeline.retrieval_executor, _search, question, state.get("query_embedding")
+            ),
+            timeout=deadline.budget("retrieve"),
+        )
+    except asyncio.TimeoutError:
+        return {"context": [], "scores": [], "degradations": _degrade(dl.RETRIEVE_TIMEOUT)}
+
+    rerank = lambda: _arerank(question, candidates, deadline.budget("rerank"))
+    if not config.SINGLE_FLIGHT_ENABLED:
+        top_docs, scores, degradations = await rerank()
+    else:
+        top_docs, scores, degradations = await pipeline.flights["rerank"].do(
+            _rerank_key(question, candidates), rerank
+        )
+    return {"context": list(top_docs), "scores": list(scores), "degradations": degradations}
+
+
+def _pack(state: State) -> PackedContext | None:
+    """Merge and budget the context chunks (None when packing is disabled)."""
+    if not config.CONTEXT_PACKING_ENABLED:
+        return None
+    counter = get_token_counter()
+    with metrics.span("pack"):
+        fixed = counter.count(
+            prompt.invoke({"question": state["question"], "context": ""}).to_string()
+        )
+        packed = pack_context(state["context"], counter=counter, fixed_tokens=fixed)
+    logger.info(
+        "context packing: %d chunks -> %d passages, %d -> %d tokens "
+        "(%d saved, budget %d, truncated=%s, dropped=%d)",
+        packed.chunks, len(packed.passages), packed.raw_tokens, packed.tokens,
+        packed.saved_tokens, packed.budget, packed.truncated, packed.dropped_passages,
+    )
+    return packed
+
+
+def _build_message(state: State, packed: PackedContext | None = None):
+    if packed is None:
+        packed = _pack(state)
+    if packed is not None:
+        docs_content = packed.text
+    else:
+        docs_content = "\n\n".join(doc.page_content for doc in state["context"])
+    return prompt.invoke(
         {
             "question": state["question"],
             "context": docs_content,
         }
     )
-    response = llm.invoke(message)
-    return {"answer": response.content}
 
 
-# ---- LangGraph assembly ----
-graph_builder = StateGraph(State).add_sequence([retrieve, generate])
-graph_builder.add_edge(START, "retrieve")
-graph = graph_builder.compile()
+def _saved(packed: PackedContext | None) -> dict:
+    return {"prompt_tokens_saved": packed.saved_tokens} if packed is not None else {}
+
+
+def _prompt_tokens(packed: PackedContext | None) -> int | None:
+    return packed.prompt_tokens if packed is not None else None
+
+
+def _cut_off_text(tag: str | None) -> str:
+    """What to append to (or answer instead of) a generation stopped at its cap."""
+    if tag == dl.GENERATE_TIMEOUT:
+        return dl.STILL_THINKING_MESSAGE
+    if tag == dl.GENERATE_TRUNCATED:
+        return dl.TRUNCATED_SUFFIX
+    return ""
+
+
+def generate(state: State) -> dict:
+    """
+    Generate a grounded answer from the retrieved context, stopping at the
+    generation budget. As in `astream_generate`, the backend stream is
+    drained on `generation_executor` into a queue, so a backend that stalls
+    before or between tokens is cut off at the budget, not at
+    LLM_HTTP_TIMEOUT_S.
+    """
+    packed = _pack(state)
+    message = _build_message(state, packed)
+    expires = time.monotonic() + _deadline(state).budget("generate")
+    chunks: queue.Queue = queue.Queue()
+    stop = threading.Event()
+
+    def pump() -> None:
+        stream = pipeline.generator.stream(message)
+        try:
+            for chunk in stream:
+                if stop.is_set():
+                    break
+                chunks.put(chunk)
+        finally:
+            stream.close()  # releases the dispatcher slot
+            chunks.put(None)
+
+    parts: List[str] = []
+    final = None
+    cut_off = None
+    with metrics.span("generate"):
+        producer = pipeline.generation_executor.submit(pump)
+        try:
+            while True:
+                try:
+                    chunk = chunks.get(timeout=max(0.0, expires - time.monotonic()))
+                except queue.Empty:
+                    cut_off = dl.GENERATE_TRUNCATED if "".join(parts) else dl.GENERATE_TIMEOUT
+                    break
+                if chunk is None:
+                    producer.result()  # re-raises a backend error
+                    break
+                if chunk.response_metadata or chunk.usage_metadata:
+                    final = chunk
+                parts.append(chunk.content)
+        finally:
+            stop.set()  # a stalled pump stops at its next chunk
+    if final is not None:
+        _log_backend_timings(backend_timings(final, _prompt_tokens(packed)))
+    degradations = _degrade(cut_off) if cut_off else []
+    return {
+        "answer": "".join(parts) + _cut_off_text(cut_off),
+        "degradations": degradations,
+        **_saved(packed),
+    }
+
+
+async def agenerate(state: State) -> dict:
+    """
+    Async variant of `generate`: streams internally so a generation cut off
+    at its budget still returns what it had.
+    """
+    stats = GenerationStats()
+    with metrics.span("generate"):
+        answer = "".join([delta async for delta in astream_generate(state, stats)])
+    return {
+        "answer": answer,
+        "degradations": [stats.cut_off] if stats.cut_off else [],
+        "prompt_tokens_saved": stats.prompt_tokens_saved,
+    }
+
+
+@dataclass
+class GenerationStats:
+    """Latency profile of one streamed generation."""
+
+    ttft_ms: float | None = None  # time to first token
+    total_ms: float = 0.0
+    tokens: int = 0               # streamed chunks; Ollama emits one token per chunk
+    prompt_tokens_saved: int = 0  # by context packing
+    load_ms: float | None = None  # backend model load before this request (cold start)
+    cached_prompt_tokens: int | None = None
+    cut_off: str | None = None    # deadline.GENERATE_* when the budget ran out
+
+    @property
+    def tokens_per_s(self) -> float:
+        if not self.tokens or self.ttft_ms is None:
+            return 0.0
+        decode_s = (self.total_ms - self.ttft_ms) / 1000
+        return self.tokens / decode_s if decode_s > 0 else 0.0
+
+
+async def astream_generate(
+    state: State, stats: GenerationStats | None = None
+) -> AsyncIterator[str]:
+    """
+    Stream the answer for already-retrieved context as text deltas,
+    filling `stats` (TTFT, total time, token count) as it goes.
+
+    The backend stream is drained by its own task into a queue, so when the
+    generation budget runs out it can be cancelled cleanly; the answer then
+    ends with a "cut off" note, or is the "still thinking" message if no
+    token arrived, and `stats.cut_off` says which.
+    """
+    stats = stats if stats is not None else GenerationStats()
+    t0 = time.perf_counter()
+    packed = _pack(state)
+    if packed is not None:
+        stats.prompt_tokens_saved = packed.saved_tokens
+    message = _build_message(state, packed)
+
+    loop = asyncio.get_running_loop()
+    expires = loop.time() + _deadline(state).budget("generate")
+    chunks: asyncio.Queue = asyncio.Queue()
+
+    async def pump() -> None:
+        try:
+            async for chunk in pipeline.generator.astream(message):
+                chunks.put_nowait(chunk)
+        finally:
+            chunks.put_nowait(None)
+
+    producer = asyncio.ensure_future(pump())
+    final = None
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(
+                    chunks.get(), timeout=max(0.0, expires - loop.time())
+                )
+            except asyncio.TimeoutError:
+                stats.cut_off = dl.GENERATE_TRUNCATED if stats.tokens else dl.GENERATE_TIMEOUT
+                break
+            if chunk is None:
+                await producer  # re-raises a backend error
+                break
+            if chunk.response_metadata or chunk.usage_metadata:
+                final = chunk  # Ollama / OpenAI usage arrive on the last chunk
+            if not chunk.content:
+                continue
+            if stats.ttft_ms is None:
+                stats.ttft_ms = (time.perf_counter() - t0) * 1000
+            stats.tokens += 1
+            yield chunk.content
+    finally:
+        producer.cancel()
+    if stats.cut_off:
+        _degrade(stats.cut_off)
+        yield _cut_off_text(stats.cut_off)
+    stats.total_ms = (time.perf_counter() - t0) * 1000
+    if stats.ttft_ms is not None:
+        metrics.observe("ttft", stats.ttft_ms / 1000)
+    metrics.observe("llm_stream", stats.total_ms / 1000)
+    if final is not None:
+        timings = backend_timings(final, _prompt_tokens(packed))
+        stats.load_ms = timings.load_ms
+        stats.cached_prompt_tokens = timings.cached_prompt_tokens
+        _log_backend_timings(timings)
+
+
+# ---- Semantic answer cache (in front of the graph) ----
+def _cache_lookup(embedding: List[float]):
+    cache = pipeline.semantic_cache
+    entry = cache.lookup(embedding)
+    metrics.cache_lookup(entry is not None)
+    logger.info("semantic cache %s: %s", "hit" if entry else "miss", cache.stats())
+    return entry
+
+
+def hydrate_ids(doc_ids: List[int | str]) -> List[Document]:
+    """Rebuild context Documents (cached answers, 🔍 history) from their point IDs."""
+    store = pipeline.payload_store
+    if store is not None:
+        return store.documents(doc_ids)
+
+    stubs = [
+        Document(
+            page_content="",
+            metadata={"_id": doc_id, "_collection_name": config.QDRANT_COLLECTION},
+        )
+        for doc_id in doc_ids
+    ]
+    if config.RETRIEVER_BACKEND == "mmap":
+        return pipeline.retriever.vectorstore.hydrate(stubs)
+    return enrich_with_payload(pipeline.qdrant_client, stubs)
+
+
+def _context_ids(result: dict) -> List[int | str]:
+    return [d.metadata.get("_id") for d in result.get("context", [])]
+
+
+def dedup_stats() -> dict:
+    """Single-flight counters per table (executions, deduplicated, ...)."""
+    return {name: flight.stats() for name, flight in pipeline.flights.items()}
+
+
+def answer(question: str) -> dict:
+    """
+    Run the RAG graph, answering from the semantic cache when a close enough
+    question has been answered before. Concurrent calls with the same
+    (normalized) question share one run.
+    """
+    with metrics.request("answer"):
+        if not config.SINGLE_FLIGHT_ENABLED:
+            return _answer(question)
+        result = pipeline.flights["answer"].do_sync(
+            normalize_question(question), lambda: _answer(question)
+        )
+    return {**result, "question": question}
+
+
+async def aanswer(question: str) -> dict:
+    """
+    Async variant of `answer`; cache hydration and persistence run on
+    `retrieval_executor`.
+    """
+    with metrics.request("answer"):
+        if not config.SINGLE_FLIGHT_ENABLED:
+            return await _aanswer(question)
+        result = await pipeline.flights["answer"].do(
+            normalize_question(question), lambda: _aanswer(question)
+        )
+    return {**result, "question": question}
+
+
+def _cacheable(result: dict) -> bool:
+    """Degraded answers (timeouts, fallbacks) must not be served again from the cache."""
+    return not result.get("degradations")
+
+
+def _answer(question: str) -> dict:
+    deadline = Deadline()
+    if not config.SEMANTIC_CACHE_ENABLED or lexical_only(question):
+        return pipeline.graph.invoke({"question": question, "deadline": deadline})
+
+    with metrics.span("embed"):
+        embedding = pipeline.embedder.embed_query(question)
+    entry = _cache_lookup(embedding)
+    if entry is not None:
+        return {
+            "question": question,
+            "context": hydrate_ids(entry.doc_ids),
+            "answer": entry.answer,
+        }
+
+    result = pipeline.graph.invoke(
+        {"question": question, "query_embedding": embedding, "deadline": deadline}
+    )
+    if _cacheable(result):
+        pipeline.semantic_cache.store(
+            question, embedding, result["answer"], _context_ids(result)
+        )
+    return result
+
+
+async def _aanswer(question: str) -> dict:
+    deadline = Deadline()
+    if not config.SEMANTIC_CACHE_ENABLED or lexical_only(question):
+        return await pipeline.graph.ainvoke({"question": question, "deadline": deadline})
+
+    loop = asyncio.get_running_loop()
+    with metrics.span("embed"):
+        embedding = await pipeline.embedder.aembed_query(question)
+    entry = _cache_lookup(embedding)
+    if entry is not None:
+        context = await loop.run_in_executor(
+            pipeline.retrieval_executor, hydrate_ids, entry.doc_ids
+        )
+        return {"question": question, "context": context, "answer": entry.answer}
+
+    result = await pipeline.graph.ainvoke(
+        {"question": question, "query_embedding": embedding, "deadline": deadline}
+    )
+    if _cacheable(result):
+        await loop.run_in_executor(
+            pipeline.retrieval_executor,
+            pipeline.semantic_cache.store,
+            question,
+            embedding,
+            result["answer"],
+            _context_ids(result),
+        )
+    return result
+
+
+class _SharedAnswer(SharedStream):
+    def __init__(self, leader: "AnswerStream"):
+        self.leader = leader
+        super().__init__(leader._produce())
+
+
+class AnswerStream:
+    """
+    One streaming RAG run for the Discord bot.
+
+    Iterate `deltas()` to receive answer text as it is generated; once it is
+    exhausted, `result` holds the same dict `aanswer` returns (question,
+    context, answer) and `stats` the generation timings. Semantic cache hits
+    yield the cached answer in one piece. Concurrent streams for the same
+    (normalized) question share one run: later ones replay the deltas so
+    far, then follow along live.
+    """
+
+    def __init__(self, question: str):
+        self.question = question
+        self.result: dict = {}
+        self.stats = GenerationStats()
+
+    async def deltas(self) -> AsyncIterator[str]:
+        with metrics.request("stream"):
+            async for delta in self._deltas():
+                yield delta
+
+    async def _deltas(self) -> AsyncIterator[str]:
+        if not config.SINGLE_FLIGHT_ENABLED:
+            async for delta in self._produce():
+                yield delta
+            return
+
+        # The leader's run goes in a background task, so a consumer that
+        # disconnects doesn't cut the stream off for the others.
+        shared = pipeline.flights["stream"].join(
+            normalize_question(self.question), lambda: _SharedAnswer(self)
+        )
+        async for delta in shared.replay():
+            yield delta
+        if shared.leader is not self:
+            self.result = {**shared.leader.result, "question": self.question}
+            self.stats = shared.leader.stats
+
+    async def _produce(self) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        state: dict = {"question": self.question, "deadline": Deadline()}
+        # The cache is keyed by the query embedding, which the lexical path never computes.
+        use_cache = config.SEMANTIC_CACHE_ENABLED and not lexical_only(self.question)
+
+        if use_cache:
+            with metrics.span("embed"):
+                embedding = await pipeline.embedder.aembed_query(self.question)
+            entry = _cache_lookup(embedding)
+            if entry is not None:
+                context = await loop.run_in_executor(
+                    pipeline.retrieval_executor, hydrate_ids, entry.doc_ids
+                )
+                self.result = {**state, "context": context, "answer": entry.answer}
+                yield entry.answer
+                return
+            state["query_embedding"] = embedding
+
+        state.update(await aretrieve(state))
+
+        parts: List[str] = []
+        async for delta in astream_generate(state, self.stats):
+            parts.append(delta)
+            yield delta
+        state["answer"] = "".join(parts)
+        state["prompt_tokens_saved"] = self.stats.prompt_tokens_saved
+        if self.stats.cut_off:
+            state["degradations"] = state.get("degradations", []) + [self.stats.cut_off]
+        self.result = state
+
+        logger.info(
+            "generation: ttft_ms=%.0f total_ms=%.0f tokens=%d tokens_per_s=%.1f "
+            "prompt_tokens_saved=%d",
+            self.stats.ttft_ms or 0.0,
+            self.stats.total_ms,
+            self.stats.tokens,
+            self.stats.tokens_per_s,
+            self.stats.prompt_tokens_saved,
+        )
+        if use_cache and _cacheable(state):
+            await loop.run_in_executor(
+                pipeline.retrieval_executor,
+                pipeline.semantic_cache.store,
+                self.question,
+                state["query_embedding"],
+                state["answer"],
+                _context_ids(state),
+            )
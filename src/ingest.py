@@ -0,0 +1,275 @@
+# src/feminism_rag/ingest.py
+"""
+Build or extend the Qdrant collection from source texts.
+
+    python -m src.ingest SOURCE_DIR [--workers N] [--batch-size N]
+
+SOURCE_DIR holds one .txt/.md/.pdf file per book. Titles and authors come
+from an optional `books.json` in that directory
+(`{"the_second_sex.txt": {"title": "...", "author": "..."}}`), falling back
+to a "Title - Author.ext" filename.
+
+The run is a streaming pipeline: files are chunked lazily, chunks are
+embedded in batches across a process pool (one model copy per worker), and
+embedded batches are upserted to Qdrant in submission order. After every
+upsert the per-file progress is checkpointed, so an interrupted run resumes
+where it stopped without re-embedding finished chunks. Point IDs are
+deterministic (file name + chunk index), so replaying a batch is idempotent.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List as TypingList
+
+from . import config
+
+SOURCE_SUFFIXES = (".txt", ".md", ".pdf")
+ID_NAMESPACE = uuid.UUID("8a4c1f0e-5b7d-4c1e-9f3a-2d6b0e7c9a11")
+
+
+@dataclass
+class Chunk:
+    source: str
+    index: int
+    start: int
+    text: str
+    title: str
+    author: str
+    is_last: bool = False
+
+    @property
+    def point_id(self) -> str:
+        return str(uuid.uuid5(ID_NAMESPACE, f"{self.source}:{self.index}"))
+
+    def payload(self) -> dict:
+        # `document` is the text key enrich_with_payload / the vector store read;
+        # title + author are what the 🔍 reaction shows.
+        return {
+            "document": self.text,
+            "title": self.title,
+            "author": self.author,
+            "source": self.source,
+            "chunk_index": self.index,
+            "start_index": self.start,
+        }
+
+
+# ---- Checkpoint ----
+class Checkpoint:
+    """Per-file count of chunks already upserted, persisted as JSON."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.state: dict = json.loads(path.read_text()) if path.exists() else {}
+
+    def done(self, source: str) -> int:
+        return self.state.get(source, {}).get("done", 0)
+
+    def complete(self, source: str) -> bool:
+        return self.state.get(source, {}).get("complete", False)
+
+    def advance(self, chunks: TypingList[Chunk]) -> None:
+        for c in chunks:
+            entry = self.state.setdefault(c.source, {"done": 0, "complete": False})
+            entry["done"] = max(entry["done"], c.index + 1)
+            entry["complete"] = entry["complete"] or c.is_last
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state, indent=2))
+        os.replace(tmp, self.path)
+
+
+# ---- Sources + chunking ----
+def _read_text(path: Path) -> str:
+    if path.suffix == ".pdf":
+        from pypdf import PdfReader
+
+        return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+    return path.read_text(encoding="utf-8", errors="replace")
+
+
+def _book_metadata(path: Path, manifest: dict) -> tuple[str, str]:
+    if path.name in manifest:
+        meta = manifest[path.name]
+        return meta["title"], meta["author"]
+    title, sep, author = path.stem.partition(" - ")
+    return title.strip(), author.strip() if sep else "unknown"
+
+
+def iter_chunks(source_dir: Path, checkpoint: Checkpoint) -> Iterator[Chunk]:
+    """Lazily chunk every source file, skipping what the checkpoint covers."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=config.INGEST_CHUNK_SIZE,
+        chunk_overlap=config.INGEST_CHUNK_OVERLAP,
+        add_start_index=True,
+    )
+    manifest_path = source_dir / "books.json"
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+
+    for path in sorted(source_dir.iterdir()):
+        if path.suffix not in SOURCE_SUFFIXES or checkpoint.complete(path.name):
+            continue
+        title, author = _book_metadata(path, manifest)
+        skip = checkpoint.done(path.name)
+
+        docs = splitter.create_documents([_read_text(path)])
+        for i, doc in enumerate(docs):
+            if i < skip:
+                continue
+            yield Chunk(
+                source=path.name,
+                index=i,
+                start=doc.metadata.get("start_index", -1),
+                text=doc.page_content,
+                title=title,
+                author=author,
+                is_last=i == len(docs) - 1,
+            )
+
+
+def _batched(chunks: Iterator[Chunk], size: int) -> Iterator[TypingList[Chunk]]:
+    batch: TypingList[Chunk] = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ---- Embedding workers (one model per process) ----
+_worker_model = None
+
+
+def _init_worker(model_name: str, cache_folder: str | None, threads: int) -> None:
+    global _worker_model
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(threads)
+    _worker_model = SentenceTransformer(model_name, cache_folder=cache_folder, device="cpu")
+
+
+def _embed_batch(texts: TypingList[str]):
+    return _worker_model.encode(
+        texts,
+        batch_size=len(texts),
+        normalize_embeddings=True,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+    )
+
+
+# ---- Qdrant ----
+def _ensure_collection(client, collection: str, dim: int) -> None:
+    from qdrant_client import models
+
+    if client.collection_exists(collection):
+        return
+    params = models.VectorParams(size=dim, distance=models.Distance.COSINE)
+    client.create_collection(
+        collection_name=collection,
+        vectors_config={config.QDRANT_VECTOR_NAME: params} if config.QDRANT_VECTOR_NAME else params,
+    )
+
+
+def _upsert(client, collection: str, chunks: TypingList[Chunk], vectors) -> None:
+    from qdrant_client import models
+
+    points = [
+        models.PointStruct(
+            id=c.point_id,
+            vector={config.QDRANT_VECTOR_NAME: v.tolist()} if config.QDRANT_VECTOR_NAME else v.tolist(),
+            payload=c.payload(),
+        )
+        for c, v in zip(chunks, vectors)
+    ]
+    client.upsert(collection_name=collection, points=points, wait=True)
+
+
+def ingest(
+    source_dir: str | Path,
+    collection: str = config.QDRANT_COLLECTION,
+    workers: int = config.INGEST_WORKERS,
+    batch_size: int = config.INGEST_BATCH_SIZE,
+    checkpoint_path: str | Path | None = None,
+) -> dict:
+    """Run the pipeline; returns counts and throughput."""
+    from .retrieval import get_qdrant_client
+
+    source_dir = Path(source_dir)
+    checkpoint = Checkpoint(Path(checkpoint_path or source_dir / f".ingest_{collection}.json"))
+    client = get_qdrant_client()
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    total = 0
+    t0 = time.perf_counter()
+    in_flight: deque = deque()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(config.EMBEDDING_MODEL_NAME, config.HF_CACHE, threads),
+    ) as pool:
+
+        def drain_one() -> None:
+            # FIFO completion keeps each file's checkpoint a contiguous prefix.
+            nonlocal total
+            chunks, future = in_flight.popleft()
+            vectors = future.result()
+            _ensure_collection(client, collection, vectors.shape[1])
+            _upsert(client, collection, chunks, vectors)
+            checkpoint.advance(chunks)
+            total += len(chunks)
+            elapsed = time.perf_counter() - t0
+            print(f"upserted {total} chunks ({total / elapsed:.1f} chunks/s)", flush=True)
+
+        for batch in _batched(iter_chunks(source_dir, checkpoint), batch_size):
+            in_flight.append((batch, pool.submit(_embed_batch, [c.text for c in batch])))
+            if len(in_flight) >= 2 * workers:  # bounded look-ahead
+                drain_one()
+        while in_flight:
+            drain_one()
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "chunks": total,
+        "seconds": elapsed,
+        "chunks_per_s": total / elapsed if elapsed else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("source_dir")
+    parser.add_argument("--collection", default=config.QDRANT_COLLECTION)
+    parser.add_argument("--workers", type=int, default=config.INGEST_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=config.INGEST_BATCH_SIZE)
+    parser.add_argument("--checkpoint", default=None)
+    args = parser.parse_args()
+
+    stats = ingest(
+        args.source_dir,
+        collection=args.collection,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        checkpoint_path=args.checkpoint,
+    )
+    print("=== INGEST SUMMARY ===")
+    for k, v in stats.items():
+        print(f"{k}: {v:.2f}" if isinstance(v, float) else f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
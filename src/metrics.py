@@ -0,0 +1,165 @@
+# src/feminism_rag/metrics.py
+"""
+Production instrumentation: span timings, counters and gauges exported in
+Prometheus text format from a small local HTTP endpoint.
+
+    rag_stage_seconds{stage}        embed / search / lexical / hydrate / rerank /
+                                    pack / generate / ttft / llm_stream
+    rag_node_seconds{node}          LangGraph nodes (retrieve, generate)
+    rag_request_seconds{path}       whole questions as callers see them (answer, stream)
+    rag_errors_total{where}         exceptions escaping a span, node or request
+    rag_semantic_cache_total{result}
+    rag_singleflight_total{flight,role}
+    rag_rerank_branch_total{branch} adaptive rerank decisions (skip, tail, full)
+    rag_degradations_total{kind}    deadline fallbacks (see deadline.py tags)
+    rag_* gauges                    queue depth, in-flight questions / LLM calls
+
+Metric objects are created on first use, so with METRICS_ENABLED = False
+nothing is imported and spans cost one attribute lookup. When enabled a span
+is two perf_counter calls and one histogram observe.
+"""
+from __future__ import annotations
+
+import functools
+import logging
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Callable, Iterator
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers ms-scale lookups up to multi-second LLM calls.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0)
+
+
+@functools.lru_cache(maxsize=1)
+def _metrics() -> SimpleNamespace:
+    from prometheus_client import Counter, Histogram
+
+    return SimpleNamespace(
+        stage=Histogram(
+            "rag_stage_seconds", "RAG sub-step latency", ["stage"], buckets=BUCKETS
+        ),
+        node=Histogram(
+            "rag_node_seconds", "LangGraph node latency", ["node"], buckets=BUCKETS
+        ),
+        request=Histogram(
+            "rag_request_seconds", "End-to-end question latency", ["path"], buckets=BUCKETS
+        ),
+        errors=Counter("rag_errors_total", "Exceptions by stage/node/path", ["where"]),
+        cache=Counter("rag_semantic_cache_total", "Semantic cache lookups", ["result"]),
+        flight=Counter(
+            "rag_singleflight_total", "Single-flight executions and joins", ["flight", "role"]
+        ),
+        rerank_branch=Counter(
+            "rag_rerank_branch_total", "Adaptive rerank decisions", ["branch"]
+        ),
+        degraded=Counter(
+            "rag_degradations_total", "Requests degraded to meet their deadline", ["kind"]
+        ),
+    )
+
+
+def _observe(metric: str, label: str, seconds: float) -> None:
+    getattr(_metrics(), metric).labels(label).observe(seconds)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("span %s=%s %.1fms", metric, label, seconds * 1000)
+
+
+@contextmanager
+def _timed(metric: str, label: str) -> Iterator[None]:
+    if not config.METRICS_ENABLED:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        _metrics().errors.labels(label).inc()
+        raise
+    finally:
+        _observe(metric, label, time.perf_counter() - t0)
+
+
+def span(stage: str):
+    """Time a pipeline sub-step: `with metrics.span("rerank"): ...`."""
+    return _timed("stage", stage)
+
+
+def request(path: str):
+    """Time one whole question (counted per `path` via the histogram)."""
+    return _timed("request", path)
+
+
+def observe(stage: str, seconds: float) -> None:
+    """Record a duration measured elsewhere (e.g. TTFT from a stream)."""
+    if config.METRICS_ENABLED:
+        _observe("stage", stage, seconds)
+
+
+def node(name: str, fn: Callable) -> Callable:
+    """Wrap a sync graph node so each call lands in rag_node_seconds."""
+
+    @functools.wraps(fn)
+    def wrapper(state):
+        with _timed("node", name):
+            return fn(state)
+
+    return wrapper
+
+
+def anode(name: str, fn: Callable) -> Callable:
+    """Async counterpart of `node`."""
+
+    @functools.wraps(fn)
+    async def wrapper(state):
+        with _timed("node", name):
+            return await fn(state)
+
+    return wrapper
+
+
+def cache_lookup(hit: bool) -> None:
+    if config.METRICS_ENABLED:
+        _metrics().cache.labels("hit" if hit else "miss").inc()
+
+
+def flight(name: str, leader: bool) -> None:
+    if config.METRICS_ENABLED:
+        _metrics().flight.labels(name, "leader" if leader else "follower").inc()
+
+
+def rerank_branch(branch: str) -> None:
+    if config.METRICS_ENABLED:
+        _metrics().rerank_branch.labels(branch).inc()
+
+
+def degraded(kind: str) -> None:
+    if config.METRICS_ENABLED:
+        _metrics().degraded.labels(kind).inc()
+
+
+def gauge(name: str, documentation: str, fn: Callable[[], float]) -> None:
+    """Register a gauge sampled from `fn` at scrape time (no-op when disabled)."""
+    if not config.METRICS_ENABLED:
+        return
+    from prometheus_client import Gauge
+
+    Gauge(name, documentation).set_function(fn)
+
+
+def start_server(port: int | None = None, host: str | None = None) -> bool:
+    """Serve /metrics on a daemon thread; returns False when metrics are disabled."""
+    if not config.METRICS_ENABLED:
+        return False
+    from prometheus_client import start_http_server
+
+    port = port if port is not None else config.METRICS_PORT
+    host = host or config.METRICS_HOST
+    _metrics()  # register the metric families before the first scrape
+    start_http_server(port, addr=host)
+    logger.info("metrics endpoint: http://%s:%d/metrics", host, port)
+    return True
@@ -0,0 +1,360 @@
+# src/feminism_rag/rerank.py
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import List as TypingList, NamedTuple, Sequence, Tuple
+
+from . import config
+
+
+class RerankResult(NamedTuple):
+    """Index into the candidate list plus its relevance score (Cohere's shape)."""
+
+    index: int
+    relevance_score: float
+
+
+class Reranker:
+    """
+    Second-stage reranker interface.
+
+    `rerank` returns the best `top_n` candidates, most relevant first.
+    Subclasses with a native async client override `arerank`; the default
+    runs `rerank` in a worker thread so CPU-bound models don't block the loop.
+    """
+
+    name = "base"
+
+    def rerank(
+        self, query: str, documents: TypingList[str], top_n: int
+    ) -> TypingList[RerankResult]:
+        raise NotImplementedError
+
+    async def arerank(
+        self, query: str, documents: TypingList[str], top_n: int
+    ) -> TypingList[RerankResult]:
+        return await asyncio.to_thread(self.rerank, query, documents, top_n)
+
+    def rerank_many(
+        self, requests: TypingList[Tuple[str, TypingList[str], int]]
+    ) -> TypingList[TypingList[RerankResult]]:
+        """Rerank several (query, documents, top_n) requests; one call by default each."""
+        return [self.rerank(query, documents, top_n) for query, documents, top_n in requests]
+
+    async def arerank_many(
+        self, requests: TypingList[Tuple[str, TypingList[str], int]]
+    ) -> TypingList[TypingList[RerankResult]]:
+        """Async `rerank_many`; API backends run the requests concurrently."""
+        return list(
+            await asyncio.gather(
+                *(self.arerank(query, documents, top_n) for query, documents, top_n in requests)
+            )
+        )
+
+
+class CohereReranker(Reranker):
+    """Hosted Cohere rerank API (one network round trip per query)."""
+
+    name = "cohere"
+
+    def __init__(self, model: str = config.COHERE_RERANK_MODEL):
+        import cohere
+
+        if not config.COHERE_API_KEY:
+            raise RuntimeError(
+                "COHERE_API_KEY is not set. Add it to your .env or set "
+                "RERANKER_BACKEND = \"cross-encoder\" in config.py."
+            )
+        self.model = model
+        # COHERE_BASE_URL points the client elsewhere, e.g. at the fake server in fakes.py.
+        kwargs = {"base_url": config.COHERE_BASE_URL} if config.COHERE_BASE_URL else {}
+        self.client = cohere.Client(
+            config.COHERE_API_KEY, timeout=config.COHERE_TIMEOUT_S, **kwargs
+        )
+        self.async_client = cohere.AsyncClient(
+            config.COHERE_API_KEY, timeout=config.COHERE_TIMEOUT_S, **kwargs
+        )
+
+    def rerank(self, query, documents, top_n):
+        response = self.client.rerank(
+            model=self.model, query=query, documents=documents, top_n=top_n
+        )
+        return [RerankResult(r.index, r.relevance_score) for r in response.results]
+
+    async def arerank(self, query, documents, top_n):
+        response = await self.async_client.rerank(
+            model=self.model, query=query, documents=documents, top_n=top_n
+        )
+        return [RerankResult(r.index, r.relevance_score) for r in response.results]
+
+
+class CrossEncoderReranker(Reranker):
+    """
+    Local CPU cross-encoder (bge-reranker class) loaded from HF_CACHE.
+
+    All (query, candidate) pairs are scored in batched forward passes.
+    `execution` picks the runtime: "torch" (fp32), "int8" (torch dynamic
+    quantization of the Linear layers) or "onnx" (onnxruntime, optionally a
+    pre-quantized file via `onnx_file`).
+    """
+
+    name = "cross-encoder"
+
+    def __init__(
+        self,
+        model_name: str = config.CROSS_ENCODER_MODEL_NAME,
+        execution: str = config.CROSS_ENCODER_EXECUTION,
+        onnx_file: str | None = config.CROSS_ENCODER_ONNX_FILE,
+        batch_size: int = config.CROSS_ENCODER_BATCH_SIZE,
+        max_length: int = config.CROSS_ENCODER_MAX_LENGTH,
+    ):
+        from sentence_transformers import CrossEncoder
+
+        if execution not in ("torch", "int8", "onnx"):
+            raise ValueError(f"unknown cross-encoder execution mode: {execution!r}")
+
+        kwargs: dict = {
+            "device": "cpu",
+            "cache_folder": config.HF_CACHE,
+            "max_length": max_length,
+        }
+        if execution == "onnx":
+            kwargs["backend"] = "onnx"
+            if onnx_file:
+                kwargs["model_kwargs"] = {"file_name": onnx_file}
+
+        self.model = CrossEncoder(model_name, **kwargs)
+        if execution == "int8":
+            import torch
+
+            self.model.model = torch.quantization.quantize_dynamic(
+                self.model.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+
+        self.execution = execution
+        self.batch_size = batch_size
+
+    def rerank(self, query, documents, top_n):
+        if not documents:
+            return []
+        scores = self.model.predict(
+            [(query, doc) for doc in documents],
+            batch_size=self.batch_size,
+            show_progress_bar=False,
+        )
+        order = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)
+        return [RerankResult(i, float(scores[i])) for i in order[:top_n]]
+
+    def rerank_many(self, requests):
+        """All requests' pairs in one `predict`, so batches fill across queries."""
+        pairs = [(query, doc) for query, documents, _ in requests for doc in documents]
+        if not pairs:
+            return [[] for _ in requests]
+        scores = self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+        out, start = [], 0
+        for _, documents, top_n in requests:
+            own = scores[start:start + len(documents)]
+            start += len(documents)
+            order = sorted(range(len(documents)), key=lambda i: own[i], reverse=True)
+            out.append([RerankResult(i, float(own[i])) for i in order[:top_n]])
+        return out
+
+    async def arerank_many(self, requests):
+        return await asyncio.to_thread(self.rerank_many, requests)
+
+
+class HedgedReranker(Reranker):
+    """
+    Wraps a reranker with deadline-bounded, hedged calls.
+
+    `rerank_within` / `arerank_within` start one attempt and, if it hasn't
+    answered after the RERANK_HEDGE_PERCENTILE of recent latencies, a second
+    identical one; the first success wins. If neither succeeds within
+    `timeout` they raise TimeoutError (or the last attempt's error) and the
+    caller falls back to dense order. Plain `rerank` / `arerank` pass through.
+    """
+
+    def __init__(self, inner: Reranker):
+        self.inner = inner
+        self.name = inner.name
+        self.hedges = 0
+        self._latencies: deque = deque(maxlen=config.RERANK_HEDGE_WINDOW)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(
+            max_workers=config.RERANK_HEDGE_POOL_SIZE, thread_name_prefix="rerank-hedge"
+        )
+
+    def rerank(self, query, documents, top_n):
+        return self.inner.rerank(query, documents, top_n)
+
+    async def arerank(self, query, documents, top_n):
+        return await self.inner.arerank(query, documents, top_n)
+
+    def rerank_many(self, requests):
+        return self.inner.rerank_many(requests)
+
+    async def arerank_many(self, requests):
+        return await self.inner.arerank_many(requests)
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait before the second attempt."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < config.RERANK_HEDGE_MIN_SAMPLES:
+            return config.RERANK_HEDGE_DEFAULT_DELAY_S
+        rank = min(len(samples) - 1, int(config.RERANK_HEDGE_PERCENTILE * len(samples)))
+        return max(config.RERANK_HEDGE_MIN_DELAY_S, samples[rank])
+
+    def _record(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    # Failed and cancelled (timed-out) attempts are recorded too: leaving the slow
+    # ones out would pull the percentile, and with it the hedge delay, too low.
+    def _timed_rerank(self, query, documents, top_n):
+        t0 = time.perf_counter()
+        try:
+            return self.inner.rerank(query, documents, top_n)
+        finally:
+            self._record(time.perf_counter() - t0)
+
+    async def _timed_arerank(self, query, documents, top_n):
+        t0 = time.perf_counter()
+        try:
+            return await self.inner.arerank(query, documents, top_n)
+        finally:
+            self._record(time.perf_counter() - t0)
+
+    def rerank_within(self, query, documents, top_n, timeout: float):
+        """Sync hedged call; a losing attempt is left to finish in the background."""
+        expires = time.monotonic() + timeout
+        attempts = [self._pool.submit(self._timed_rerank, query, documents, top_n)]
+        hedged = not config.RERANK_HEDGE_ENABLED
+        error: BaseException | None = None
+        while attempts:
+            left = expires - time.monotonic()
+            if left <= 0:
+                break
+            wait_s = left if hedged else min(left, self.hedge_delay())
+            done, _ = wait(attempts, timeout=wait_s, return_when=FIRST_COMPLETED)
+            for future in done:
+                attempts.remove(future)
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+            if not hedged and (not done or not attempts):
+                hedged = True
+                self.hedges += 1
+                attempts.append(self._pool.submit(self._timed_rerank, query, documents, top_n))
+        raise error if error is not None and not attempts else TimeoutError("rerank budget exhausted")
+
+    async def arerank_within(self, query, documents, top_n, timeout: float):
+        """Async hedged call; losing or timed-out attempts are cancelled."""
+        loop = asyncio.get_running_loop()
+        expires = loop.time() + timeout
+        attempts = {asyncio.ensure_future(self._timed_arerank(query, documents, top_n))}
+        hedged = not config.RERANK_HEDGE_ENABLED
+        error: BaseException | None = None
+        try:
+            while attempts:
+                left = expires - loop.time()
+                if left <= 0:
+                    break
+                wait_s = left if hedged else min(left, self.hedge_delay())
+                done, attempts = await asyncio.wait(
+                    attempts, timeout=wait_s, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not hedged and (not done or not attempts):
+                    hedged = True
+                    self.hedges += 1
+                    attempts.add(
+                        asyncio.ensure_future(self._timed_arerank(query, documents, top_n))
+                    )
+        finally:
+            for task in attempts:
+                task.cancel()
+        if error is not None and not attempts:
+            raise error
+        raise TimeoutError("rerank budget exhausted")
+
+
+def get_reranker(backend: str | None = None) -> Reranker:
+    """Build the reranker selected in config.py (or `backend`)."""
+    backend = backend or config.RERANKER_BACKEND
+    if backend == "cohere":
+        return CohereReranker()
+    if backend == "cross-encoder":
+        return CrossEncoderReranker()
+    if backend == "fake":
+        from .fakes import FakeReranker
+
+        return FakeReranker()
+    raise ValueError(f"unknown RERANKER_BACKEND: {backend!r}")
+
+
+# ---- Adaptive rerank policy ----
+@dataclass
+class RerankPlan:
+    """
+    What to send to the reranker for one query.
+
+    `head` candidates (indices, best first) are confident enough to keep in
+    dense order; `tail` is the ambiguous remainder sent to the reranker,
+    which keeps its best `top_n`. branch: "skip" (no rerank call), "tail"
+    (rerank a shortened set) or "full" (the usual rerank of every candidate).
+    """
+
+    branch: str
+    head: TypingList[int] = field(default_factory=list)
+    tail: TypingList[int] = field(default_factory=list)
+    top_n: int = 0
+
+
+def plan_rerank(
+    scores: Sequence[float], sources: Sequence[str], k: int = config.RERANK_FINAL_K
+) -> RerankPlan:
+    """
+    Decide how much reranking `k` results need, from the candidates' dense
+    (cosine) scores and their sources (book titles).
+
+    Skip: the top score is high, the k-th result clears the (k+1)-th by a
+    wide margin and most of the top k come from one source.
+    Tail: the leading candidates are separated from the rest by a clear gap;
+    they are kept and only the next RERANK_TAIL_CANDIDATES are reranked.
+    Otherwise every candidate is reranked.
+    """
+    order = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+    if len(order) <= k:
+        return RerankPlan("full", tail=order, top_n=k)
+    ranked = [scores[i] for i in order]
+
+    top_k_sources = Counter(sources[i] for i in order[:k])
+    source_share = top_k_sources.most_common(1)[0][1] / k
+    if (
+        ranked[0] >= config.RERANK_SKIP_MIN_TOP_SCORE
+        and ranked[k - 1] - ranked[k] >= config.RERANK_SKIP_MIN_MARGIN
+        and source_share >= config.RERANK_SKIP_MIN_SOURCE_SHARE
+    ):
+        return RerankPlan("skip", head=order[:k])
+
+    # Largest confident head: the deepest position (short of k) followed by a
+    # clear score gap, provided everything above it clears the top-score bar.
+    head = 0
+    for i in range(k - 1):
+        if ranked[i] < config.RERANK_SKIP_MIN_TOP_SCORE:
+            break
+        if ranked[i] - ranked[i + 1] >= config.RERANK_HEAD_MIN_GAP:
+            head = i + 1
+    if head:
+        tail = order[head:head + config.RERANK_TAIL_CANDIDATES]
+        return RerankPlan("tail", head=order[:head], tail=tail, top_n=k - head)
+    return RerankPlan("full", tail=list(range(len(scores))), top_n=k)
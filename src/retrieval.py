@@ -1,53 +1,226 @@
 # src/feminism_rag/retrieval.py
 from __future__ import annotations
 
-from typing import List as TypingList
+import asyncio
+import functools
+import json
+import logging
+import queue
+import re
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from collections import Counter
+from concurrent.futures import Future
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, List as TypingList, Tuple
 
-import qdrant_client
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Qdrant
+import numpy as np
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
 
 from . import config
-import torch
+
+logger = logging.getLogger(__name__)
+
+# Heavy dependencies (qdrant, sentence-transformers/torch) are imported inside
+# the functions that need them, so importing this module stays cheap.
+if TYPE_CHECKING:
+    import qdrant_client
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    from langchain_community.vectorstores import Qdrant
+
 
 def get_qdrant_client() -> qdrant_client.QdrantClient:
     """Create a Qdrant client pointing at the local disk index."""
+    import qdrant_client
+
     return qdrant_client.QdrantClient(path=config.QDRANT_PATH)
 
 
-def get_embedding_model() -> HuggingFaceEmbeddings:
-    """Return the HF embedding model used by the vector store."""
-    return HuggingFaceEmbeddings(model_name=config.EMBEDDING_MODEL_NAME,
+def get_embedding_model(
+    backend: str | None = None, threads: int | None = None
+) -> HuggingFaceEmbeddings:
+    """
+    Return the HF embedding model used by the vector store.
+
+    `backend` (default EMBEDDING_BACKEND) picks the query encoder runtime:
+    "torch" (fp32), "int8" (torch dynamic quantization of the Linear layers)
+    or "onnx" (onnxruntime, optionally a pre-quantized file via
+    EMBEDDING_ONNX_FILE). All three run the same weights and normalize, so
+    vectors stay compatible with the fp32-built index; check the drift with
+    `python -m benchmarks.embed_compare`. `threads` (default
+    EMBEDDING_THREADS) sets the intra-op thread count.
+    """
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    backend = backend or config.EMBEDDING_BACKEND
+    threads = threads if threads is not None else config.EMBEDDING_THREADS
+    if backend not in ("torch", "int8", "onnx"):
+        raise ValueError(f"unknown EMBEDDING_BACKEND: {backend!r}")
+
+    model_kwargs: dict = {
+        "device": "cpu",
+        #"torch_dtype": torch.float16,  # cuts VRAM a lot
+    }
+    if backend == "onnx":
+        model_kwargs["backend"] = "onnx"
+        ort_kwargs: dict = {"provider": "CPUExecutionProvider"}
+        if config.EMBEDDING_ONNX_FILE:
+            ort_kwargs["file_name"] = config.EMBEDDING_ONNX_FILE
+        if threads:
+            import onnxruntime
+
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+            ort_kwargs["session_options"] = options
+        model_kwargs["model_kwargs"] = ort_kwargs
+    elif threads:
+        import torch
+
+        torch.set_num_threads(threads)
+
+    embeddings = HuggingFaceEmbeddings(model_name=config.EMBEDDING_MODEL_NAME,
         cache_folder=config.HF_CACHE,
-        model_kwargs={
-            "device": "cpu",
-            #"torch_dtype": torch.float16,  # cuts VRAM a lot
-        },
+        model_kwargs=model_kwargs,
         encode_kwargs={
             "normalize_embeddings": True,
-            "batch_size": 8,              # keep batch small at first
+            "batch_size": config.EMBED_MAX_BATCH_SIZE,
         },
 
     )
+    if backend == "int8":
+        import torch
+
+        transformer = embeddings.client[0]
+        transformer.auto_model = torch.quantization.quantize_dynamic(
+            transformer.auto_model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    return embeddings
+
+
+class BatchingEmbedder(Embeddings):
+    """
+    Coalesces concurrent `embed_query` calls into one batched forward pass.
+
+    A single background thread owns the model: it takes the first queued
+    query, keeps collecting for up to `max_wait_ms` (or until `max_batch_size`
+    queries are waiting), encodes them with one `embed_documents` call and
+    resolves each caller's future with its own vector.
+    """
+
+    def __init__(
+        self,
+        model: Embeddings,
+        max_batch_size: int = config.EMBED_MAX_BATCH_SIZE,
+        max_wait_ms: float = config.EMBED_MAX_WAIT_MS,
+    ):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._worker = threading.Thread(
+            target=self._run, name="embed-batcher", daemon=True
+        )
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue a query for the next batch; the future resolves to its vector."""
+        fut: Future = Future()
+        self._queue.put((text, fut))
+        return fut
+
+    def embed_query(self, text: str) -> TypingList[float]:
+        return self.submit(text).result()
+
+    async def aembed_query(self, text: str) -> TypingList[float]:
+        return await asyncio.wrap_future(self.submit(text))
+
+    def embed_documents(self, texts: TypingList[str]) -> TypingList[TypingList[float]]:
+        return self.model.embed_documents(texts)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait_s
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # Callers that gave up (e.g. a cancelled `aembed_query`) are dropped, not encoded.
+            batch = [(text, fut) for text, fut in batch if fut.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                vectors = self.model.embed_documents([text for text, _ in batch])
+            except Exception as e:
+                for _, fut in batch:
+                    self._deliver(fut.set_exception, e)
+                continue
+            for (_, fut), vector in zip(batch, vectors):
+                self._deliver(fut.set_result, vector)
+
+    @staticmethod
+    def _deliver(resolve, value) -> None:
+        """Resolve one caller's future; nothing may escape and kill the batcher thread."""
+        try:
+            resolve(value)
+        except Exception:
+            logger.exception("embed-batcher: could not deliver a result")
+
+
+@functools.lru_cache(maxsize=None)
+def _inline_payload_qdrant():
+    """Qdrant wrapper subclass whose search hits carry the full payload."""
+    from langchain_community.vectorstores import Qdrant
+
+    class InlinePayloadQdrant(Qdrant):
+        @classmethod
+        def _document_from_scored_point(
+            cls, scored_point, collection_name, content_payload_key, metadata_payload_key
+        ):
+            payload = scored_point.payload or {}
+            metadata = {k: v for k, v in payload.items() if k != content_payload_key}
+            metadata["_id"] = scored_point.id
+            metadata["_collection_name"] = collection_name
+            return Document(
+                page_content=payload.get(content_payload_key, ""), metadata=metadata
+            )
+
+    return InlinePayloadQdrant
 
 
 def get_vector_store(
     client: qdrant_client.QdrantClient | None = None,
-    embedding_model: HuggingFaceEmbeddings | None = None,
+    embedding_model: Embeddings | None = None,
+    inline_payload: bool = False,
 ) -> Qdrant:
     """
     Build a LangChain Qdrant vector store wrapper.
 
     Assumes the collection already exists and has a payload key 'document'
     for the main text, consistent with the original experiment.
+    With `inline_payload`, hits already carry title/author/etc. in metadata,
+    so no `enrich_with_payload` round trip is needed.
     """
+    from langchain_community.vectorstores import Qdrant
+
     if client is None:
         client = get_qdrant_client()
     if embedding_model is None:
         embedding_model = get_embedding_model()
 
-    vector_store = Qdrant(
+    store_cls = _inline_payload_qdrant() if inline_payload else Qdrant
+    vector_store = store_cls(
         client=client,
         collection_name=config.QDRANT_COLLECTION,
         embeddings=embedding_model,
@@ -58,21 +231,648 @@ def get_vector_store(
     return vector_store
 
 
+# ---- Memory-mapped index (RETRIEVER_BACKEND == "mmap") ----
+def export_mmap_index(
+    client: qdrant_client.QdrantClient | None = None,
+    out_dir: str | Path | None = None,
+    dtype: str = config.MMAP_INDEX_DTYPE,
+    batch_size: int = 1024,
+) -> Path:
+    """
+    Dump the collection into a directory `MmapIndex` can open:
+
+    - vectors.npy          (N x dim) matrix in `dtype`, written via open_memmap
+    - payloads.bin         concatenated UTF-8 JSON payloads
+    - payload_offsets.npy  N+1 int64 byte offsets into payloads.bin
+    - ids.json / meta.json point IDs (row order) and index metadata
+    """
+    if client is None:
+        client = get_qdrant_client()
+    out = Path(out_dir or config.MMAP_INDEX_PATH)
+    out.mkdir(parents=True, exist_ok=True)
+
+    count = client.count(config.QDRANT_COLLECTION, exact=True).count
+    with_vectors = [config.QDRANT_VECTOR_NAME] if config.QDRANT_VECTOR_NAME else True
+    vectors = None
+    ids: TypingList[Any] = []
+    offsets = [0]
+
+    with open(out / "payloads.bin", "wb") as blob:
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=config.QDRANT_COLLECTION,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=with_vectors,
+            )
+            for p in points:
+                vec = p.vector[config.QDRANT_VECTOR_NAME] if config.QDRANT_VECTOR_NAME else p.vector
+                if vectors is None:
+                    vectors = np.lib.format.open_memmap(
+                        out / "vectors.npy", mode="w+", dtype=dtype, shape=(count, len(vec))
+                    )
+                vectors[len(ids)] = vec
+                raw = json.dumps(p.payload, ensure_ascii=False).encode("utf-8")
+                blob.write(raw)
+                offsets.append(offsets[-1] + len(raw))
+                ids.append(p.id)
+            if offset is None:
+                break
+
+    if vectors is None:
+        raise RuntimeError(f"collection {config.QDRANT_COLLECTION!r} is empty")
+    vectors.flush()
+    np.save(out / "payload_offsets.npy", np.asarray(offsets, dtype=np.int64))
+    (out / "ids.json").write_text(json.dumps(ids))
+    (out / "meta.json").write_text(
+        json.dumps(
+            {
+                "collection": config.QDRANT_COLLECTION,
+                "vector_name": config.QDRANT_VECTOR_NAME,
+                "count": len(ids),
+                "dim": int(vectors.shape[1]),
+                "dtype": dtype,
+            },
+            indent=2,
+        )
+    )
+    return out
+
+
+# ---- Quantized first pass over the mmap index (MMAP_QUANTIZATION) ----
+QUANTIZATION_KINDS = ("int8", "binary")
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount_rows(bits: np.ndarray) -> np.ndarray:
+    """Set bits per row of a packed uint8 matrix."""
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0: hardware popcount
+        return np.bitwise_count(bits).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[bits].sum(axis=1, dtype=np.int32)
+
+
+def quantize_mmap_index(
+    path: str | Path | None = None,
+    kind: str = "int8",
+    quantile: float = config.MMAP_QUANT_INT8_QUANTILE,
+    block_rows: int = 8192,
+    sample_rows: int = 100_000,
+) -> Path:
+    """
+    Write first-pass codes next to an `export_mmap_index` directory:
+
+    - int8:   codes_int8.npy, round(v / scale) per dimension, where scale is
+              the `quantile` of |v| over (a sample of) the rows / 127; the
+              rarer larger values are clipped
+    - binary: codes_binary.npy, one bit per dimension (v > that dimension's
+              mean), packed 8 per byte: 32x smaller than float32
+
+    Parameters are recorded under the kind's key in quantization.json.
+    """
+    if kind not in QUANTIZATION_KINDS:
+        raise ValueError(f"unknown quantization: {kind!r}")
+    path = Path(path or config.MMAP_INDEX_PATH)
+    vectors = np.load(path / "vectors.npy", mmap_mode="r")
+    n, dim = vectors.shape
+
+    rng = np.random.default_rng(0)
+    sample = np.sort(rng.choice(n, size=min(n, sample_rows), replace=False))
+    sampled = np.asarray(vectors[sample], dtype=np.float32)
+    if kind == "int8":
+        scales = np.quantile(np.abs(sampled), quantile, axis=0).astype(np.float32) / 127
+        scales[scales == 0] = 1.0
+        params = {"scales": scales.tolist(), "quantile": quantile}
+        codes = np.lib.format.open_memmap(
+            path / "codes_int8.npy", mode="w+", dtype=np.int8, shape=(n, dim)
+        )
+        for start in range(0, n, block_rows):
+            block = np.asarray(vectors[start:start + block_rows], dtype=np.float32)
+            codes[start:start + len(block)] = np.clip(np.rint(block / scales), -127, 127)
+    else:
+        thresholds = sampled.mean(axis=0).astype(np.float32)
+        params = {"thresholds": thresholds.tolist()}
+        codes = np.lib.format.open_memmap(
+            path / "codes_binary.npy", mode="w+", dtype=np.uint8, shape=(n, (dim + 7) // 8)
+        )
+        for start in range(0, n, block_rows):
+            block = np.asarray(vectors[start:start + block_rows], dtype=np.float32)
+            codes[start:start + len(block)] = np.packbits(block > thresholds, axis=1)
+    codes.flush()
+
+    meta_path = path / "quantization.json"
+    meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+    meta[kind] = {"file": f"codes_{kind}.npy", "count": n, "dim": dim, **params}
+    meta_path.write_text(json.dumps(meta))
+    return path
+
+
+class QuantizedCodes:
+    """
+    First-pass codes for an `MmapIndex`: int8 dot products, or Hamming
+    distance over packed bits. `candidates` returns the rows whose exact
+    float scores are then computed.
+    """
+
+    # Rows per scan block. int8 blocks are upcast to float32 for the matmul; small
+    # blocks keep that copy in cache (8192 rows made the int8 scan ~3x slower).
+    block_rows = {"int8": 256, "binary": 8192}
+
+    def __init__(self, path: str | Path, kind: str):
+        path = Path(path)
+        meta_path = path / "quantization.json"
+        meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+        if kind not in meta:
+            raise FileNotFoundError(
+                f"no {kind} codes in {path}; run `python -m src.export_mmap --no-export --quantize {kind}`"
+            )
+        params = meta[kind]
+        self.kind = kind
+        self.codes = np.load(path / params["file"], mmap_mode="r")
+        if kind == "int8":
+            self.scales = np.asarray(params["scales"], dtype=np.float32)
+        else:
+            self.thresholds = np.asarray(params["thresholds"], dtype=np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes
+
+    def approx_scores(self, query: np.ndarray) -> np.ndarray:
+        """Higher is better: int8 dot product, or minus the Hamming distance."""
+        n = len(self.codes)
+        out = np.empty(n, dtype=np.float32)
+        if self.kind == "int8":
+            scaled = query * self.scales  # (codes * scales) @ q == codes @ (q * scales)
+            step = self.block_rows["int8"]
+            for start in range(0, n, step):
+                block = self.codes[start:start + step]
+                out[start:start + len(block)] = block.astype(np.float32) @ scaled
+        else:
+            bits = np.packbits(query > self.thresholds)
+            step = self.block_rows["binary"]
+            for start in range(0, n, step):
+                block = self.codes[start:start + step]
+                out[start:start + len(block)] = -_popcount_rows(np.bitwise_xor(block, bits))
+        return out
+
+    def candidates(self, query: np.ndarray, n: int) -> np.ndarray:
+        """The `n` best rows by approximate score (unordered)."""
+        scores = self.approx_scores(query)
+        n = min(n, len(scores))
+        return np.argpartition(-scores, n - 1)[:n]
+
+
+class MmapIndex:
+    """
+    Read-only view over an `export_mmap_index` directory.
+
+    Vectors and payloads stay memory-mapped; only the ID list is held in
+    Python. Stored vectors are assumed unit-norm (Qdrant normalizes them for
+    cosine collections), so a dot product is the cosine score.
+
+    With `quantization` ("int8" / "binary") the full scan runs over the
+    compact codes and only the best `n * oversampling` rows are rescored
+    with their float vectors, so most of vectors.npy is never paged in.
+    """
+
+    block_rows = 8192  # rows per matmul block (bounds float16 -> float32 upcast memory)
+
+    def __init__(
+        self,
+        path: str | Path,
+        quantization: str | None = None,
+        oversampling: float = config.MMAP_QUANT_OVERSAMPLING,
+    ):
+        path = Path(path)
+        self.meta = json.loads((path / "meta.json").read_text())
+        self.vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        self.offsets = np.load(path / "payload_offsets.npy", mmap_mode="r")
+        self.payloads = np.memmap(path / "payloads.bin", dtype=np.uint8, mode="r")
+        self.ids = json.loads((path / "ids.json").read_text())
+        self.row_of = {point_id: row for row, point_id in enumerate(self.ids)}
+        self.codes = QuantizedCodes(path, quantization) if quantization else None
+        self.oversampling = oversampling
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def payload(self, row: int) -> dict:
+        start, end = self.offsets[row], self.offsets[row + 1]
+        return json.loads(self.payloads[start:end].tobytes())
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Cosine similarity of `query` against every stored vector."""
+        out = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), self.block_rows):
+            block = self.vectors[start:start + self.block_rows]
+            out[start:start + len(block)] = block @ query
+        return out
+
+    def top_n(self, query: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and (exact) scores of the `n` best matches, best first."""
+        if self.codes is not None:
+            rows = np.sort(self.codes.candidates(query, int(n * self.oversampling)))  # in file order
+            exact = np.asarray(self.vectors[rows], dtype=np.float32) @ query
+            best = np.argsort(-exact, kind="stable")[:n]
+            return rows[best], exact[best]
+        scores = self.scores(query)
+        n = min(n, len(scores))
+        rows = np.argpartition(-scores, n - 1)[:n]
+        rows = rows[np.argsort(-scores[rows], kind="stable")]
+        return rows, scores[rows]
+
+
+def mmr_select(
+    query_scores: np.ndarray,
+    candidates: np.ndarray,
+    k: int,
+    lambda_mult: float,
+) -> TypingList[int]:
+    """
+    Maximal marginal relevance over unit-norm candidate vectors.
+
+    Same selection rule as LangChain's `maximal_marginal_relevance`, but the
+    candidate/candidate similarities come from one matmul and the running
+    max-redundancy is updated with a vectorized `np.maximum` per pick.
+    """
+    k = min(k, len(query_scores))
+    if k <= 0:
+        return []
+    pairwise = candidates @ candidates.T
+    selected = [int(np.argmax(query_scores))]
+    redundancy = pairwise[selected[0]].copy()
+    while len(selected) < k:
+        mmr = lambda_mult * query_scores - (1 - lambda_mult) * redundancy
+        mmr[selected] = -np.inf
+        pick = int(np.argmax(mmr))
+        selected.append(pick)
+        np.maximum(redundancy, pairwise[pick], out=redundancy)
+    return selected
+
+
+class MmapVectorStore(VectorStore):
+    """
+    LangChain vector store over an `MmapIndex`: top-N similarity and MMR are
+    NumPy matrix ops, no Qdrant client involved.
+
+    Search returns Documents shaped like the Qdrant wrapper's (text plus
+    `_id` / `_collection_name`, or the full payload with `inline_payload`);
+    `hydrate` adds the rest of the payload.
+    """
+
+    def __init__(self, index: MmapIndex, embedding: Embeddings, inline_payload: bool = False):
+        self.index = index
+        self.embedding = embedding
+        self.inline_payload = inline_payload
+        self.collection_name = index.meta.get("collection", config.QDRANT_COLLECTION)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("build the index with export_mmap_index()")
+
+    def _document(self, row: int) -> Document:
+        payload = self.index.payload(row)
+        metadata = {}
+        if self.inline_payload:
+            metadata = {k: v for k, v in payload.items() if k != "document"}
+        metadata.update({"_id": self.index.ids[row], "_collection_name": self.collection_name})
+        return Document(page_content=payload.get("document", ""), metadata=metadata)
+
+    def _query(self, embedding) -> np.ndarray:
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: TypingList[float], k: int = 4, **kwargs: Any
+    ) -> TypingList[Tuple[Document, float]]:
+        rows, scores = self.index.top_n(self._query(embedding), k)
+        return [(self._document(int(r)), float(s)) for r, s in zip(rows, scores)]
+
+    def similarity_search_by_vector(
+        self, embedding: TypingList[float], k: int = 4, **kwargs: Any
+    ) -> TypingList[Document]:
+        return [d for d, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> TypingList[Document]:
+        return self.similarity_search_by_vector(self.embedding.embed_query(query), k)
+
+    def max_marginal_relevance_search_with_score_by_vector(
+        self,
+        embedding: TypingList[float],
+        k: int = 4,
+        fetch_k: int = config.MMAP_FETCH_K,
+        lambda_mult: float = config.MMAP_MMR_LAMBDA,
+        **kwargs: Any,
+    ) -> TypingList[Tuple[Document, float]]:
+        query = self._query(embedding)
+        rows, scores = self.index.top_n(query, fetch_k)
+        candidates = np.asarray(self.index.vectors[rows], dtype=np.float32)
+        candidates /= np.linalg.norm(candidates, axis=1, keepdims=True)
+        picks = mmr_select(scores, candidates, k, lambda_mult)
+        return [(self._document(int(rows[i])), float(scores[i])) for i in picks]
+
+    def max_marginal_relevance_search_by_vector(
+        self,
+        embedding: TypingList[float],
+        k: int = 4,
+        fetch_k: int = config.MMAP_FETCH_K,
+        lambda_mult: float = config.MMAP_MMR_LAMBDA,
+        **kwargs: Any,
+    ) -> TypingList[Document]:
+        return [
+            d
+            for d, _ in self.max_marginal_relevance_search_with_score_by_vector(
+                embedding, k, fetch_k, lambda_mult
+            )
+        ]
+
+    def max_marginal_relevance_search(
+        self,
+        query: str,
+        k: int = 4,
+        fetch_k: int = config.MMAP_FETCH_K,
+        lambda_mult: float = config.MMAP_MMR_LAMBDA,
+        **kwargs: Any,
+    ) -> TypingList[Document]:
+        return self.max_marginal_relevance_search_by_vector(
+            self.embedding.embed_query(query), k, fetch_k, lambda_mult
+        )
+
+    def hydrate(self, docs: TypingList[Document]) -> TypingList[Document]:
+        """Same output as `enrich_with_payload`, read from the mmap'd payloads."""
+        enriched: TypingList[Document] = []
+        for d in docs:
+            point_id = d.metadata.get("_id")
+            row = self.index.row_of.get(point_id)
+            payload = self.index.payload(row) if row is not None else {}
+            meta = {k: v for k, v in payload.items() if k != "document"}
+            meta.update({"_id": point_id, "_collection_name": self.collection_name})
+            enriched.append(
+                Document(page_content=payload.get("document", d.page_content or ""), metadata=meta)
+            )
+        return enriched
+
+
+# ---- BM25 inverted index (RETRIEVAL_MODE != "dense") ----
+_TOKEN_RE = re.compile(r"\w+")
+# Function words only: content terms (including short ones like "ai") stay searchable.
+# A query containing one of these reads as a phrased question, not a keyword lookup.
+STOPWORDS = frozenset(
+    """
+    a about after all also an and any are as at be because been but by can could did do
+    does for from had has have how i if in into is it its me my no not of on or our she
+    should so some such than that the their them then there these they this those to
+    was we were what when where which who whom whose why will with would you your
+    """.split()
+)
+
+
+def _words(text: str) -> TypingList[str]:
+    """Lowercased, accent-folded word tokens."""
+    folded = unicodedata.normalize("NFKD", text.lower())
+    return _TOKEN_RE.findall("".join(c for c in folded if not unicodedata.combining(c)))
+
+
+def tokenize(text: str) -> TypingList[str]:
+    """Index/query terms: `_words` minus stopwords (no stemming)."""
+    return [t for t in _words(text) if t not in STOPWORDS]
+
+
+def _bm25_chunks(client=None, index: MmapIndex | None = None, batch_size: int = 1024):
+    """(point ID, indexed text) per chunk: the text plus its title and author."""
+
+    def text(payload: dict) -> str:
+        return " ".join(str(payload.get(k) or "") for k in ("title", "author", "document"))
+
+    if index is not None:
+        for row, point_id in enumerate(index.ids):
+            yield point_id, text(index.payload(row))
+        return
+    if client is None:
+        client = get_qdrant_client()
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=config.QDRANT_COLLECTION,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False,
+        )
+        for p in points:
+            yield p.id, text(p.payload or {})
+        if offset is None:
+            break
+
+
+def build_bm25_index(
+    client: qdrant_client.QdrantClient | None = None,
+    index: MmapIndex | None = None,
+    out_dir: str | Path | None = None,
+) -> Path:
+    """
+    Build the inverted index over the collection's chunk texts (read from
+    the mmap export if `index` is given, else scrolled from Qdrant):
+
+    - vocab.json           terms, sorted; a term's position is its ID
+    - postings_offsets.npy V+1 int64 offsets into the postings (CSR)
+    - postings_rows.npy    int32 chunk rows, ascending within each term
+    - postings_tf.npy      uint16 term frequencies, parallel to the rows
+    - doc_len.npy          int32 tokens per chunk
+    - ids.json / meta.json point IDs (row order) and corpus statistics
+    """
+    out = Path(out_dir or config.BM25_INDEX_PATH)
+    out.mkdir(parents=True, exist_ok=True)
+
+    term_ids: dict = {}
+    post_terms, post_rows, post_tf, doc_len = array("i"), array("i"), array("H"), array("i")
+    ids: TypingList[Any] = []
+    for point_id, text in _bm25_chunks(client, index):
+        tokens = tokenize(text)
+        row = len(ids)
+        for term, tf in Counter(tokens).items():
+            post_terms.append(term_ids.setdefault(term, len(term_ids)))
+            post_rows.append(row)
+            post_tf.append(min(tf, 0xFFFF))
+        doc_len.append(len(tokens))
+        ids.append(point_id)
+    if not ids:
+        raise RuntimeError(f"collection {config.QDRANT_COLLECTION!r} is empty")
+
+    # Renumber terms alphabetically, then group the postings by term (rows stay ascending).
+    vocab = sorted(term_ids)
+    new_id = np.empty(len(vocab), dtype=np.int32)
+    new_id[[term_ids[t] for t in vocab]] = np.arange(len(vocab), dtype=np.int32)
+    terms = new_id[np.frombuffer(post_terms, dtype=np.int32)]
+    order = np.argsort(terms, kind="stable")
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(terms, minlength=len(vocab)), out=offsets[1:])
+
+    np.save(out / "postings_offsets.npy", offsets)
+    np.save(out / "postings_rows.npy", np.frombuffer(post_rows, dtype=np.int32)[order])
+    np.save(out / "postings_tf.npy", np.frombuffer(post_tf, dtype=np.uint16)[order])
+    lengths = np.frombuffer(doc_len, dtype=np.int32)
+    np.save(out / "doc_len.npy", lengths)
+    (out / "vocab.json").write_text(json.dumps(vocab, ensure_ascii=False))
+    (out / "ids.json").write_text(json.dumps(ids))
+    (out / "meta.json").write_text(
+        json.dumps(
+            {
+                "collection": config.QDRANT_COLLECTION,
+                "count": len(ids),
+                "terms": len(vocab),
+                "postings": int(offsets[-1]),
+                "avg_doc_len": float(lengths.mean()),
+            },
+            indent=2,
+        )
+    )
+    return out
+
+
+class Bm25Index:
+    """
+    Read-only BM25 scorer over a `build_bm25_index` directory.
+
+    Postings stay memory-mapped; the vocabulary dict, point IDs and the
+    per-chunk length normalization are held in memory. A query touches only
+    its terms' postings, so a search costs microseconds to a few ms and needs
+    no query embedding.
+    """
+
+    def __init__(self, path: str | Path, k1: float = config.BM25_K1, b: float = config.BM25_B):
+        path = Path(path)
+        self.meta = json.loads((path / "meta.json").read_text())
+        self.term_of = {t: i for i, t in enumerate(json.loads((path / "vocab.json").read_text()))}
+        self.offsets = np.load(path / "postings_offsets.npy", mmap_mode="r")
+        self.rows = np.load(path / "postings_rows.npy", mmap_mode="r")
+        self.tf = np.load(path / "postings_tf.npy", mmap_mode="r")
+        self.ids = json.loads((path / "ids.json").read_text())
+        self.k1 = k1
+        lengths = np.load(path / "doc_len.npy").astype(np.float32)
+        # tf * (k1 + 1) / (tf + norm), with the length part precomputed per chunk
+        self.norm = k1 * (1 - b + b * lengths / max(float(lengths.mean()), 1.0))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def df(self, term: str) -> int:
+        """Number of chunks containing `term` (0 when unknown)."""
+        t = self.term_of.get(term)
+        return 0 if t is None else int(self.offsets[t + 1] - self.offsets[t])
+
+    def idf(self, df: int) -> float:
+        n = len(self)
+        return float(np.log(1 + (n - df + 0.5) / (df + 0.5)))
+
+    def top_n(self, question: str, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and BM25 scores of the `n` best chunks, best first (fewer if few match)."""
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term, qtf in Counter(tokenize(question)).items():
+            t = self.term_of.get(term)
+            if t is None:
+                continue
+            start, end = self.offsets[t], self.offsets[t + 1]
+            rows = self.rows[start:end]
+            tf = self.tf[start:end].astype(np.float32)
+            weight = qtf * self.idf(int(end - start)) * (self.k1 + 1)
+            scores[rows] += weight * tf / (tf + self.norm[rows])
+        matched = np.flatnonzero(scores)
+        n = min(n, len(matched))
+        if n == 0:
+            return matched, scores[matched]
+        rows = matched[np.argpartition(-scores[matched], n - 1)[:n]]
+        rows = rows[np.argsort(-scores[rows], kind="stable")]
+        return rows, scores[rows]
+
+    def search(self, question: str, n: int) -> TypingList[Tuple[Any, float]]:
+        """(point ID, BM25 score) of the `n` best chunks, best first."""
+        rows, scores = self.top_n(question, n)
+        return [(self.ids[int(r)], float(s)) for r, s in zip(rows, scores)]
+
+    def is_keyword_query(self, question: str, max_terms: int = config.LEXICAL_MAX_TERMS) -> bool:
+        """
+        True for a bare name or term ("bell hooks", "intersectionality"): at
+        most `max_terms` words, no question mark or function words, and every
+        word occurs in the corpus. Such queries are where exact term match
+        beats the embedding, and where skipping it saves the most.
+        """
+        if "?" in question:
+            return False
+        words = _words(question)
+        return (
+            0 < len(words) <= max_terms
+            and not any(w in STOPWORDS for w in words)
+            and all(self.df(w) for w in words)
+        )
+
+
+def rrf_fuse(
+    rankings: TypingList[TypingList[Any]], k: int = config.RRF_K, limit: int | None = None
+) -> TypingList[Tuple[Any, float]]:
+    """
+    Reciprocal rank fusion: each ID scores sum(1 / (k + rank)) over the
+    rankings it appears in (rank from 1). Returns (ID, fused score), best
+    first; ties keep first-seen order, so the first ranking wins them.
+    """
+    fused: dict = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank)
+    ordered = sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
+    return ordered[:limit] if limit is not None else ordered
+
+
+def get_lexical_index(path: str | Path | None = None) -> Bm25Index:
+    """Open the BM25 index, with a hint on how to build it if it is missing."""
+    path = Path(path or config.BM25_INDEX_PATH)
+    if not (path / "meta.json").exists():
+        raise FileNotFoundError(
+            f"no BM25 index in {path}; run `python -m src.export_bm25` "
+            f"or set RETRIEVAL_MODE = \"dense\""
+        )
+    return Bm25Index(path)
+
+
 def get_retriever(
     client: qdrant_client.QdrantClient | None = None,
-    embedding_model: HuggingFaceEmbeddings | None = None,
+    embedding_model: Embeddings | None = None,
 ):
     """
     Return (retriever, client) pair.
 
     Retriever uses MMR with configurable k, mirroring the original setup. :contentReference[oaicite:1]{index=1}
+    Query embedding goes through a `BatchingEmbedder` unless a model is passed in.
+    With RETRIEVER_BACKEND == "mmap" the search runs over the exported
+    memory-mapped index and no Qdrant client is opened (client is returned
+    as passed, possibly None).
     """
-    if client is None:
-        client = get_qdrant_client()
     if embedding_model is None:
-        embedding_model = get_embedding_model()
+        embedding_model = BatchingEmbedder(get_embedding_model())
 
-    vector_store = get_vector_store(client=client, embedding_model=embedding_model)
+    # Without the in-memory payload store, ask the search for payloads inline.
+    inline_payload = not config.PAYLOAD_STORE_ENABLED
+    if config.RETRIEVER_BACKEND == "mmap":
+        vector_store = MmapVectorStore(
+            MmapIndex(config.MMAP_INDEX_PATH, quantization=config.MMAP_QUANTIZATION),
+            embedding_model,
+            inline_payload=inline_payload,
+        )
+    elif config.RETRIEVER_BACKEND == "qdrant":
+        if client is None:
+            client = get_qdrant_client()
+        vector_store = get_vector_store(
+            client=client, embedding_model=embedding_model, inline_payload=inline_payload
+        )
+    else:
+        raise ValueError(f"unknown RETRIEVER_BACKEND: {config.RETRIEVER_BACKEND!r}")
 
     retriever = vector_store.as_retriever(
         search_type="mmr",
@@ -81,6 +881,106 @@ def get_retriever(
     return retriever, client
 
 
+class _Chunk:
+    """One chunk's text and prebuilt Document metadata."""
+
+    __slots__ = ("text", "metadata")
+
+    def __init__(self, text: str, metadata: dict):
+        self.text = text
+        self.metadata = metadata
+
+
+class PayloadStore:
+    """
+    In-memory, ID-indexed copy of every chunk payload in the collection.
+
+    Loaded once at startup (from Qdrant or from the mmap export). Hydrating
+    search hits is then one dict lookup per hit: no I/O, and the metadata
+    dicts are built at load time rather than per request. Repeated string
+    values (titles, authors) are interned so each is stored once.
+    """
+
+    def __init__(self, chunks: dict, collection_name: str = config.QDRANT_COLLECTION):
+        self._chunks = chunks
+        self.collection_name = collection_name
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    @staticmethod
+    def _chunk(point_id, payload: dict, collection_name: str) -> _Chunk:
+        metadata = {
+            k: sys.intern(v) if isinstance(v, str) else v
+            for k, v in payload.items()
+            if k != "document"
+        }
+        metadata["_id"] = point_id
+        metadata["_collection_name"] = collection_name
+        return _Chunk(payload.get("document", ""), metadata)
+
+    @classmethod
+    def from_qdrant(
+        cls, client: qdrant_client.QdrantClient, batch_size: int = 1024
+    ) -> PayloadStore:
+        chunks = {}
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=config.QDRANT_COLLECTION,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False,
+            )
+            for p in points:
+                chunks[p.id] = cls._chunk(p.id, p.payload or {}, config.QDRANT_COLLECTION)
+            if offset is None:
+                break
+        return cls(chunks)
+
+    @classmethod
+    def from_mmap(cls, index: MmapIndex) -> PayloadStore:
+        collection = index.meta.get("collection", config.QDRANT_COLLECTION)
+        chunks = {
+            point_id: cls._chunk(point_id, index.payload(row), collection)
+            for row, point_id in enumerate(index.ids)
+        }
+        return cls(chunks, collection)
+
+    def documents(self, ids) -> TypingList[Document]:
+        """Documents for known point IDs (unknown IDs are skipped)."""
+        out: TypingList[Document] = []
+        for point_id in ids:
+            chunk = self._chunks.get(point_id)
+            if chunk is not None:
+                out.append(Document(page_content=chunk.text, metadata=chunk.metadata))
+        return out
+
+    def hydrate(self, docs: TypingList[Document]) -> TypingList[Document]:
+        """Same output as `enrich_with_payload`, without the Qdrant round trip."""
+        out: TypingList[Document] = []
+        for d in docs:
+            chunk = self._chunks.get(d.metadata.get("_id"))
+            if chunk is None:
+                out.append(d)
+            else:
+                out.append(Document(page_content=chunk.text, metadata=chunk.metadata))
+        return out
+
+
+def get_payload_store(
+    client: qdrant_client.QdrantClient | None = None,
+    index: MmapIndex | None = None,
+) -> PayloadStore:
+    """Load the payload store from the mmap export if given, else from Qdrant."""
+    if index is not None:
+        return PayloadStore.from_mmap(index)
+    if client is None:
+        client = get_qdrant_client()
+    return PayloadStore.from_qdrant(client)
+
+
 def enrich_with_payload(
     client: qdrant_client.QdrantClient,
     docs: TypingList[Document],
@@ -0,0 +1,232 @@
+# src/feminism_rag/semantic_cache.py
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import List as TypingList
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    """One cached answer plus the Qdrant point IDs it was grounded on."""
+
+    question: str
+    answer: str
+    doc_ids: TypingList[int | str]  # Qdrant point IDs (ints or UUID strings)
+    created_at: float
+
+
+class SemanticCache:
+    """
+    Answer cache keyed on normalized question embeddings.
+
+    A lookup is a hit when the best cosine similarity against stored questions
+    clears `threshold`. Entries live in fixed slots of a preallocated
+    (max_entries x dim) float32 matrix, so the memory cap is known up front;
+    eviction is LRU, and entries older than `ttl_s` never hit.
+
+    Stores are persisted at most once per `save_delay_s` (one background
+    write covers every store in the window; 0 writes on each store), and
+    pending changes are flushed at interpreter exit.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None,
+        threshold: float,
+        max_entries: int,
+        ttl_s: float,
+        save_delay_s: float = 0.0,
+    ):
+        self.path = Path(path) if path else None
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.save_delay_s = save_delay_s
+        self.hits = 0
+        self.misses = 0
+
+        self._vectors: np.ndarray | None = None  # allocated on first store/load
+        self._entries: TypingList[CacheEntry | None] = [None] * max_entries
+        self._lru: OrderedDict[int, None] = OrderedDict()  # slot -> None, oldest first
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # serializes writers; lookups never wait on disk
+        self._dirty = False
+        self._save_timer: threading.Timer | None = None
+
+        if self.path is not None:
+            if self.path.exists():
+                self.load()
+            atexit.register(self.flush)
+
+    # ---- lookup / store ----
+    def lookup(self, embedding: TypingList[float]) -> CacheEntry | None:
+        """Return the closest live entry above threshold, counting hit/miss."""
+        query = _normalize(embedding)
+        with self._lock:
+            entry = self._best_match(query)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def store(
+        self,
+        question: str,
+        embedding: TypingList[float],
+        answer: str,
+        doc_ids: TypingList[int | str],
+    ) -> None:
+        """
+        Insert an answer (evicting the LRU entry if full) and schedule a
+        save. Persistence errors are logged, never raised: the answer is
+        cached in memory either way.
+        """
+        vector = _normalize(embedding)
+        with self._lock:
+            self._insert(
+                vector,
+                CacheEntry(
+                    question=question,
+                    answer=answer,
+                    doc_ids=list(doc_ids),
+                    created_at=time.time(),
+                ),
+            )
+            self._dirty = True
+            if self.path is None or self._save_timer is not None:
+                return
+            if self.save_delay_s > 0:
+                self._save_timer = threading.Timer(self.save_delay_s, self._save_quietly)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+                return
+        self._save_quietly()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._lru),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+        }
+
+    # ---- persistence ----
+    def save(self) -> None:
+        """Atomically write live entries (LRU order) to `self.path` as .npz."""
+        with self._save_lock:
+            with self._lock:
+                self._save_timer = None
+                self._dirty = False
+                slots = list(self._lru)
+                if self._vectors is None or not slots:
+                    return
+                vectors = self._vectors[slots].copy()
+                entries = [asdict(self._entries[s]) for s in slots]
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # A temp file of our own in the target directory, so os.replace stays atomic.
+            with tempfile.NamedTemporaryFile(
+                dir=self.path.parent, prefix=self.path.stem, suffix=".tmp.npz", delete=False
+            ) as tmp:
+                try:
+                    np.savez(tmp, vectors=vectors, entries=np.array(json.dumps(entries)))
+                except BaseException:
+                    tmp.close()
+                    os.unlink(tmp.name)
+                    raise
+            try:
+                os.replace(tmp.name, self.path)
+            except BaseException:
+                os.unlink(tmp.name)
+                raise
+
+    def flush(self) -> None:
+        """Write pending stores now (cancelling the scheduled save)."""
+        with self._lock:
+            timer, self._save_timer = self._save_timer, None
+            dirty = self._dirty
+        if timer is not None:
+            timer.cancel()
+        if dirty and self.path is not None:
+            self._save_quietly()
+
+    def _save_quietly(self) -> None:
+        try:
+            self.save()
+        except Exception:
+            with self._lock:
+                self._dirty = True  # retried by the next store or flush
+            logger.exception("semantic cache: saving %s failed", self.path)
+
+    def load(self) -> None:
+        """Restore entries saved by `save`; expired ones are dropped."""
+        with np.load(self.path, allow_pickle=False) as data:
+            vectors = data["vectors"]
+            entries = json.loads(str(data["entries"]))
+
+        now = time.time()
+        with self._lock:
+            for vector, raw in zip(vectors, entries):
+                entry = CacheEntry(**raw)
+                if now - entry.created_at <= self.ttl_s:
+                    self._insert(vector, entry)
+
+    # ---- internals (caller holds the lock) ----
+    def _best_match(self, query: np.ndarray) -> CacheEntry | None:
+        if self._vectors is None or not self._lru:
+            return None
+
+        slots = np.fromiter(self._lru, dtype=np.int64, count=len(self._lru))
+        sims = self._vectors[slots] @ query
+        best = int(np.argmax(sims))
+        if sims[best] < self.threshold:
+            return None
+
+        slot = int(slots[best])
+        entry = self._entries[slot]
+        if time.time() - entry.created_at > self.ttl_s:
+            self._evict(slot)
+            return None
+        self._lru.move_to_end(slot)
+        return entry
+
+    def _insert(self, vector: np.ndarray, entry: CacheEntry) -> None:
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+        if len(self._lru) < self.max_entries:
+            slot = next(i for i, e in enumerate(self._entries) if e is None)
+        else:
+            slot = next(iter(self._lru))
+            self._evict(slot)
+
+        self._vectors[slot] = vector
+        self._entries[slot] = entry
+        self._lru[slot] = None
+
+    def _evict(self, slot: int) -> None:
+        self._lru.pop(slot, None)
+        self._entries[slot] = None
+
+
+def _normalize(embedding) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
@@ -0,0 +1,155 @@
+# src/feminism_rag/singleflight.py
+"""
+In-flight request coalescing ("single-flight").
+
+Concurrent callers asking for the same key share one execution: the first
+caller (the leader) starts the work, later callers (followers) wait for it
+and all of them get its result or its exception. Unlike a result cache,
+nothing is kept once the work finishes — the next request starts afresh.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import threading
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable, List as TypingList
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_SPACE = re.compile(r"\s+")
+_EDGE_PUNCT = " \t\n?!.,;:\"'`"
+
+
+def normalize_question(question: str) -> str:
+    """Key for "the same question": case, spacing and edge punctuation ignored."""
+    return _SPACE.sub(" ", question.casefold()).strip(_EDGE_PUNCT)
+
+
+class SingleFlight:
+    """
+    One shared execution per key among concurrent callers.
+
+    `do` (async) and `do_sync` (threads) keep separate in-flight tables, so a
+    sync and an async caller never wait on each other. `join` hands back the
+    shared object itself (e.g. a `SharedStream`) instead of awaiting it.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.leaders = 0
+        self.followers = 0
+        self._inflight: dict = {}       # async side: key -> Task / SharedStream
+        self._sync_inflight: dict = {}  # sync side: key -> Future
+        self._lock = threading.Lock()
+
+    def _forget(self, key: Hashable, shared: Any) -> None:
+        if self._inflight.get(key) is shared:
+            del self._inflight[key]
+
+    def join(self, key: Hashable, start: Callable[[], Any]) -> Any:
+        """
+        The in-flight object for `key`, created with `start()` if there is
+        none. It must offer `add_done_callback` (asyncio Tasks do).
+        """
+        shared = self._inflight.get(key)
+        if shared is None:
+            self.leaders += 1
+            metrics.flight(self.name, leader=True)
+            shared = start()
+            self._inflight[key] = shared
+            shared.add_done_callback(lambda _, key=key, shared=shared: self._forget(key, shared))
+        else:
+            self._joined()
+        return shared
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self.join(key, lambda: asyncio.ensure_future(fn()))
+        # A cancelled caller must not cancel the work others are waiting on.
+        return await asyncio.shield(task)
+
+    def do_sync(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._sync_inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._sync_inflight[key] = Future()
+                self.leaders += 1
+                metrics.flight(self.name, leader=True)
+            else:
+                self._joined()
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._sync_inflight[key]
+
+    def _joined(self) -> None:
+        self.followers += 1
+        metrics.flight(self.name, leader=False)
+        logger.info("single-flight %s: joined an in-flight run; %s", self.name, self.stats())
+
+    def stats(self) -> dict:
+        total = self.leaders + self.followers
+        return {
+            "executions": self.leaders,
+            "deduplicated": self.followers,
+            "in_flight": len(self._inflight) + len(self._sync_inflight),
+            "dedup_rate": self.followers / total if total else 0.0,
+        }
+
+
+class SharedStream:
+    """
+    Runs one async iterator in a background task and lets any number of
+    consumers replay it from the start, then follow it live.
+    """
+
+    def __init__(self, source: AsyncIterator[Any]):
+        self.items: TypingList[Any] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self._changed = asyncio.Condition()
+        self._task = asyncio.ensure_future(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator[Any]) -> None:
+        try:
+            async for item in source:
+                async with self._changed:
+                    self.items.append(item)
+                    self._changed.notify_all()
+        except BaseException as e:
+            self.error = e
+        finally:
+            async with self._changed:
+                self.done = True
+                self._changed.notify_all()
+
+    def add_done_callback(self, callback: Callable[[Any], None]) -> None:
+        self._task.add_done_callback(lambda _: callback(self))
+
+    async def replay(self) -> AsyncIterator[Any]:
+        i = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.items) > i or self.done)
+                batch = self.items[i:]
+                finished = self.done
+            for item in batch:
+                yield item
+            i += len(batch)
+            if finished and i >= len(self.items):
+                break
+        if self.error is not None:
+            raise self.error
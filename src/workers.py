@@ -0,0 +1,450 @@
+# src/feminism_rag/workers.py
+"""
+RAG worker processes behind the Discord front end.
+
+With RAG_WORKERS = N > 0 the bot process only talks to Discord: each
+question goes over a multiprocessing pipe to one of N spawned workers, and
+each worker loads the retriever, reranker and LLM client once and runs the
+usual async pipeline (`aanswer` / `AnswerStream`) for many questions at a
+time. Workers don't share a GIL or torch thread pool with the gateway loop
+or with each other.
+
+Dispatch is least-loaded (fewest outstanding questions, then lowest recent
+latency) among healthy workers; a question identical to one already in
+flight goes to the same worker so single-flight still coalesces it. The
+pool pings every worker each RAG_WORKER_HEALTH_INTERVAL_S; one that doesn't
+answer within RAG_WORKER_HEALTH_TIMEOUT_S is skipped until it does, and one
+that exits fails its outstanding questions and is restarted.
+
+Wire format, (kind, request_id, payload) tuples:
+
+    front -> worker   ask (question, stream) | hydrate doc_ids | cancel | ping | stop
+    worker -> front   ready {pid, warmup} | delta text | done result
+                      | error message | pong {running, llm_in_flight, ...}
+                      (hydrate is answered with done [Document, ...])
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List as TypingList
+
+from . import config, metrics
+from .singleflight import normalize_question
+
+logger = logging.getLogger(__name__)
+
+# Result keys sent back to the front end (the rest is per-request scratch state).
+RESULT_KEYS = ("question", "context", "scores", "answer", "degradations", "prompt_tokens_saved")
+
+_LATENCY_EWMA_ALPHA = 0.2
+
+
+class WorkerError(RuntimeError):
+    """A worker failed the question, or exited while it was in flight."""
+
+
+# ---- Worker process ----
+def _portable(result: dict) -> dict:
+    return {key: result[key] for key in RESULT_KEYS if key in result}
+
+
+def _worker_main(
+    index: int, conn, overrides: dict, initializer: Callable[[], None] | None
+) -> None:
+    logging.basicConfig(
+        level=logging.INFO, format=f"%(asctime)s worker-{index} %(name)s %(levelname)s %(message)s"
+    )
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    # One cache file per worker: they would otherwise overwrite each other's saves.
+    if config.SEMANTIC_CACHE_PATH:
+        path = Path(config.SEMANTIC_CACHE_PATH)
+        config.SEMANTIC_CACHE_PATH = str(path.with_name(f"{path.stem}.w{index}{path.suffix}"))
+    if initializer is not None:
+        initializer()
+    try:
+        asyncio.run(_serve(index, conn))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _serve(index: int, conn) -> None:
+    from .generate import AnswerStream, aanswer, dedup_stats, hydrate_ids, pipeline
+
+    loop = asyncio.get_running_loop()
+    if config.METRICS_ENABLED:
+        metrics.start_server(port=config.METRICS_PORT + 1 + index)
+    warmup = await loop.run_in_executor(None, pipeline.warmup)
+    # Only one worker keeps the Ollama model resident; they share the server.
+    if index == 0 and pipeline.heartbeat is not None:
+        pipeline.heartbeat.start()
+    conn.send(("ready", None, {"pid": os.getpid(), "warmup": warmup}))
+
+    running: Dict[int, asyncio.Task] = {}
+
+    async def handle(request_id: int, question: str, stream: bool) -> None:
+        try:
+            if stream:
+                answer = AnswerStream(question)
+                async for delta in answer.deltas():
+                    conn.send(("delta", request_id, delta))
+                result = answer.result
+            else:
+                result = await aanswer(question)
+            conn.send(("done", request_id, _portable(result)))
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.exception("question %d failed", request_id)
+            conn.send(("error", request_id, f"{type(e).__name__}: {e}"))
+        finally:
+            running.pop(request_id, None)
+
+    while True:
+        try:
+            kind, request_id, payload = await loop.run_in_executor(None, conn.recv)
+        except (EOFError, OSError):
+            break
+        if kind == "ask":
+            question, stream = payload
+            running[request_id] = asyncio.ensure_future(handle(request_id, question, stream))
+        elif kind == "hydrate":
+            try:
+                docs = await loop.run_in_executor(pipeline.retrieval_executor, hydrate_ids, payload)
+                conn.send(("done", request_id, docs))
+            except Exception as e:
+                conn.send(("error", request_id, f"{type(e).__name__}: {e}"))
+        elif kind == "cancel":
+            task = running.get(request_id)
+            if task is not None:
+                task.cancel()
+        elif kind == "ping":
+            conn.send(
+                (
+                    "pong",
+                    request_id,
+                    {
+                        "running": len(running),
+                        "llm_in_flight": pipeline.generator.in_flight,
+                        "llm_waiting": pipeline.generator.waiting,
+                        "dedup": dedup_stats(),
+                    },
+                )
+            )
+        elif kind == "stop":
+            break
+    for task in list(running.values()):
+        task.cancel()
+    if pipeline.heartbeat is not None:
+        pipeline.heartbeat.stop()
+
+
+# ---- Front end ----
+@dataclass
+class _Request:
+    id: int
+    key: str
+    worker: "_Worker"
+    started: float
+    events: asyncio.Queue = field(default_factory=asyncio.Queue)
+    finished: bool = False
+
+
+@dataclass
+class _Worker:
+    index: int
+    process: Any = None
+    conn: Any = None
+    pid: int | None = None
+    ready: asyncio.Future | None = None
+    alive: bool = False
+    healthy: bool = False
+    outstanding: int = 0
+    completed: int = 0
+    errors: int = 0
+    restarts: int = 0
+    latency_ms: float = 0.0  # EWMA of completed questions
+    last_pong: float = 0.0
+    reported: dict = field(default_factory=dict)
+
+    def stats(self) -> dict:
+        return {
+            "worker": self.index,
+            "pid": self.pid,
+            "alive": self.alive,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "completed": self.completed,
+            "errors": self.errors,
+            "restarts": self.restarts,
+            "latency_ms": round(self.latency_ms, 1),
+            **self.reported,
+        }
+
+
+class WorkerPool:
+    """
+    N RAG worker processes with least-loaded dispatch.
+
+    `overrides` are config attributes set in each worker before the pipeline
+    loads (spawned workers re-read config.py, not the parent's runtime
+    changes); `initializer` is a picklable callable run there right after.
+    """
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        overrides: dict | None = None,
+        initializer: Callable[[], None] | None = None,
+    ):
+        self.size = workers if workers is not None else config.RAG_WORKERS
+        self.overrides = dict(overrides or {})
+        backend = self.overrides.get("RETRIEVER_BACKEND", config.RETRIEVER_BACKEND)
+        if self.size > 1 and backend == "qdrant":
+            raise ValueError(
+                "RAG_WORKERS > 1 needs RETRIEVER_BACKEND = 'mmap': "
+                "local-mode Qdrant can only be opened by one process"
+            )
+        self.initializer = initializer
+        self.workers = [_Worker(i) for i in range(self.size)]
+        self._ctx = mp.get_context("spawn")
+        self._ids = itertools.count()
+        self._requests: Dict[int, _Request] = {}
+        self._affinity: Dict[str, _Request] = {}  # normalized question -> in-flight request
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._health_task: asyncio.Task | None = None
+        self._stopping = False
+
+    # -- lifecycle --
+    async def start(self) -> None:
+        """Spawn every worker and wait until all have warmed up."""
+        self._loop = asyncio.get_running_loop()
+        for worker in self.workers:
+            self._spawn(worker)
+        await asyncio.wait_for(
+            asyncio.gather(*(w.ready for w in self.workers)), config.RAG_WORKER_START_TIMEOUT_S
+        )
+        self._health_task = asyncio.ensure_future(self._health_loop())
+        logger.info("rag workers ready: %s", [w.pid for w in self.workers])
+
+    def _spawn(self, worker: _Worker) -> None:
+        parent, child = self._ctx.Pipe(duplex=True)
+        worker.process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker.index, child, self.overrides, self.initializer),
+            name=f"rag-worker-{worker.index}",
+            daemon=True,
+        )
+        worker.process.start()
+        child.close()
+        worker.conn = parent
+        worker.ready = self._loop.create_future()
+        worker.alive = True
+        worker.healthy = False
+        threading.Thread(
+            target=self._read, args=(worker, parent), name=f"rag-worker-{worker.index}-reader",
+            daemon=True,
+        ).start()
+
+    def _read(self, worker: _Worker, conn) -> None:
+        """Reader thread: hand every message from one worker to the event loop."""
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            self._loop.call_soon_threadsafe(self._on_message, worker, message)
+        try:
+            self._loop.call_soon_threadsafe(self._on_exit, worker, conn)
+        except RuntimeError:  # event loop already closed: the pool is gone
+            pass
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        self._stopping = True
+        if self._health_task is not None:
+            self._health_task.cancel()
+        for worker in self.workers:
+            self._send(worker, ("stop", None, None))
+        deadline = time.monotonic() + timeout
+        for worker in self.workers:
+            await asyncio.to_thread(worker.process.join, max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+    # -- messages --
+    def _send(self, worker: _Worker, message: tuple) -> bool:
+        try:
+            worker.conn.send(message)
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def _on_message(self, worker: _Worker, message: tuple) -> None:
+        kind, request_id, payload = message
+        if kind == "ready":
+            worker.pid = payload["pid"]
+            worker.healthy = True
+            worker.last_pong = time.monotonic()
+            logger.info("rag worker %d (pid %d) warm: %s", worker.index, worker.pid, payload["warmup"])
+            if not worker.ready.done():
+                worker.ready.set_result(worker)
+            return
+        if kind == "pong":
+            if not worker.healthy:
+                logger.info("rag worker %d healthy again", worker.index)
+            worker.healthy = True
+            worker.last_pong = time.monotonic()
+            worker.reported = payload
+            return
+        request = self._requests.get(request_id)
+        if request is None:  # cancelled by the caller meanwhile
+            return
+        if kind == "done":
+            worker.completed += 1
+            elapsed_ms = (time.monotonic() - request.started) * 1000
+            worker.latency_ms += _LATENCY_EWMA_ALPHA * (elapsed_ms - worker.latency_ms)
+        elif kind == "error":
+            worker.errors += 1
+        request.events.put_nowait((kind, payload))
+
+    def _on_exit(self, worker: _Worker, conn) -> None:
+        if conn is not worker.conn:  # an old pipe after a restart
+            return
+        worker.alive = worker.healthy = False
+        if worker.ready is not None and not worker.ready.done():
+            worker.ready.set_exception(WorkerError(f"rag worker {worker.index} exited during start-up"))
+        for request in [r for r in self._requests.values() if r.worker is worker]:
+            request.events.put_nowait(("error", f"rag worker {worker.index} exited"))
+        if self._stopping or self._health_task is None:  # stopping, or failed start-up
+            return
+        worker.restarts += 1
+        delay = min(30.0, 2.0 ** min(worker.restarts - 1, 5))  # back off a crash loop
+        logger.error(
+            "rag worker %d (pid %s) exited; restarting in %.0fs", worker.index, worker.pid, delay
+        )
+        self._loop.call_later(delay, self._respawn, worker)
+
+    def _respawn(self, worker: _Worker) -> None:
+        if not self._stopping:
+            self._spawn(worker)
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(config.RAG_WORKER_HEALTH_INTERVAL_S)
+            now = time.monotonic()
+            for worker in self.workers:
+                if not worker.alive:
+                    continue
+                if worker.healthy and now - worker.last_pong > config.RAG_WORKER_HEALTH_TIMEOUT_S:
+                    worker.healthy = False
+                    logger.warning(
+                        "rag worker %d unresponsive for %.0fs; not dispatching to it",
+                        worker.index, now - worker.last_pong,
+                    )
+                self._send(worker, ("ping", None, None))
+            logger.debug("rag workers: %s", self.stats())
+
+    # -- dispatch --
+    def _pick(self, key: str) -> _Worker:
+        joined = self._affinity.get(key)
+        if joined is not None and joined.worker.healthy:
+            return joined.worker
+        candidates = [w for w in self.workers if w.healthy] or [w for w in self.workers if w.alive]
+        if not candidates:
+            raise WorkerError("no rag workers available")
+        return min(candidates, key=lambda w: (w.outstanding, w.latency_ms))
+
+    def _submit(self, kind: str, payload: Any, key: str = "") -> _Request:
+        worker = self._pick(key)
+        request = _Request(next(self._ids), key, worker, time.monotonic())
+        self._requests[request.id] = request
+        if key:
+            self._affinity.setdefault(key, request)
+        worker.outstanding += 1
+        if not self._send(worker, (kind, request.id, payload)):
+            request.events.put_nowait(("error", f"rag worker {worker.index} is not reachable"))
+        return request
+
+    def _finish(self, request: _Request) -> None:
+        if request.id not in self._requests:
+            return
+        del self._requests[request.id]
+        if self._affinity.get(request.key) is request:
+            del self._affinity[request.key]
+        request.worker.outstanding -= 1
+        if not request.finished:  # caller gave up: stop the work in the worker
+            self._send(request.worker, ("cancel", request.id, None))
+
+    async def _next(self, request: _Request) -> tuple:
+        """The next ("delta" | "done", payload) for `request`; raises on "error"."""
+        kind, payload = await request.events.get()
+        if kind != "delta":
+            request.finished = True
+        if kind == "error":
+            raise WorkerError(payload)
+        return kind, payload
+
+    def _ask(self, question: str, stream: bool) -> _Request:
+        return self._submit("ask", (question, stream), key=normalize_question(question))
+
+    async def _result(self, request: _Request) -> Any:
+        try:
+            while True:
+                kind, payload = await self._next(request)
+                if kind == "done":
+                    return payload
+        finally:
+            self._finish(request)
+
+    async def aanswer(self, question: str) -> dict:
+        """Same contract as `generate.aanswer`, answered by a worker."""
+        return await self._result(self._ask(question, stream=False))
+
+    async def hydrate_ids(self, doc_ids: TypingList[int | str]) -> list:
+        """Same contract as `generate.hydrate_ids`, from a worker's payload store."""
+        return await self._result(self._submit("hydrate", list(doc_ids)))
+
+    def stream(self, question: str) -> "RemoteAnswerStream":
+        """Same contract as `generate.AnswerStream`, answered by a worker."""
+        return RemoteAnswerStream(self, question)
+
+    # -- stats --
+    @property
+    def outstanding(self) -> int:
+        return sum(w.outstanding for w in self.workers)
+
+    @property
+    def healthy(self) -> int:
+        return sum(w.healthy for w in self.workers)
+
+    def stats(self) -> TypingList[dict]:
+        return [w.stats() for w in self.workers]
+
+
+class RemoteAnswerStream:
+    """`AnswerStream` look-alike: `deltas()` then `result`, run in a worker."""
+
+    def __init__(self, pool: WorkerPool, question: str):
+        self.pool = pool
+        self.question = question
+        self.result: dict = {}
+
+    async def deltas(self) -> AsyncIterator[str]:
+        request = self.pool._ask(self.question, stream=True)
+        try:
+            while True:
+                kind, payload = await self.pool._next(request)
+                if kind == "done":
+                    self.result = payload
+                    return
+                yield payload
+        finally:
+            self.pool._finish(request)
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from src.discord_bot import CURSOR, DISCORD_MAX_CHARS, StreamingReply
+
+
+class FakeMessage:
+    def __init__(self, channel, content):
+        self.channel = channel
+        self.content = content
+
+    async def edit(self, content):
+        self.content = content
+
+    async def delete(self):
+        self.channel.remove(self)
+
+
+class FakeCtx:
+    def __init__(self):
+        self.channel = []  # messages still visible, in order
+
+    async def send(self, content):
+        msg = FakeMessage(self.channel, content)
+        self.channel.append(msg)
+        return msg
+
+
+def _stream(deltas, fail=None):
+    async def run():
+        ctx = FakeCtx()
+        reply = StreamingReply(ctx, interval_s=0.0)  # render on every delta
+        await reply.start()
+        for delta in deltas:
+            await reply.append(delta)
+            assert all(m.content and m.content != CURSOR for m in ctx.channel)
+        if fail is None:
+            await reply.finish()
+        else:
+            await reply.fail(fail)
+        return reply, ctx.channel
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("end", range(DISCORD_MAX_CHARS - 3, DISCORD_MAX_CHARS + 3))
+def test_stream_across_page_boundary_leaves_no_cursor_message(end):
+    body_len = end - len(StreamingReply.PREFIX)
+    reply, channel = _stream(["x"] * body_len)
+
+    assert "".join(m.content for m in channel) == reply.text
+    assert all(0 < len(m.content) <= DISCORD_MAX_CHARS for m in channel)
+    assert not any(CURSOR in m.content for m in channel)
+    assert channel == reply.messages
+
+
+@pytest.mark.parametrize("text_len, pages", [(DISCORD_MAX_CHARS - 1, 1), (DISCORD_MAX_CHARS, 2)])
+def test_cursor_rides_on_the_last_page_while_streaming(text_len, pages):
+    async def run():
+        ctx = FakeCtx()
+        reply = StreamingReply(ctx, interval_s=0.0)
+        await reply.start()
+        await reply.append("x" * (text_len - len(StreamingReply.PREFIX)))
+        return ctx.channel
+
+    channel = asyncio.run(run())
+    assert len(channel) == pages
+    assert channel[-1].content.endswith(CURSOR) and channel[-1].content != CURSOR
+    assert all(len(m.content) <= DISCORD_MAX_CHARS for m in channel)
+
+
+def test_fail_replaces_placeholder_with_error():
+    reply, channel = _stream([], fail=RuntimeError("boom"))
+    assert [m.content for m in channel] == ["backend error: boom"]
+
+
+def test_fail_keeps_partial_answer_and_drops_cursor():
+    reply, channel = _stream(["partial answer"], fail=RuntimeError("boom"))
+    assert len(channel) == 1
+    assert channel[0].content.startswith(StreamingReply.PREFIX + "partial answer")
+    assert "backend error: boom" in channel[0].content
+    assert CURSOR not in channel[0].content